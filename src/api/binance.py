@@ -1,18 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
-import glob
 import json
 import os
+import sqlite3
 import zipfile
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from io import BytesIO
 from xml.etree import ElementTree
 
 import aiohttp
 import pandas as pd
-import requests
-from tqdm import tqdm
 
 from api.http_client import get_json_data
 from constants.logger import logger
@@ -43,15 +41,25 @@ class BinanceClient(object):
             "sec-fetch-dest": "empty",
             "accept-language": "en",
         }
-        main_page_response = requests.get(
-            "https://www.binance.com/", headers=self.headers
-        )
-        self.cookies = main_page_response.cookies
+        # The cookies of the main page are requested once, on the first request
+        self.cookies = None
+        self.cookies_lock = asyncio.Lock()
+
+    async def get_cookies(self):
+        async with self.cookies_lock:
+            if self.cookies is None:
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(
+                        "https://www.binance.com/", headers=self.headers
+                    ) as response:
+                        self.cookies = response.cookies
+        return self.cookies
 
     async def get_funding_rate_history(self, symbol: str, rows: int = 100) -> dict:
         # https://www.binance.com/en/futures/funding-history/perpetual/funding-fee-history
         data = {"symbol": symbol, "page": 1, "rows": rows}  # can do 10_000 max
         url = "https://www.binance.com/bapi/futures/v1/public/future/common/get-funding-rate-history"
+        await self.get_cookies()
 
         async with aiohttp.ClientSession() as session:
             async with session.post(
@@ -64,7 +72,7 @@ class BinanceClient(object):
 
     async def fund_rating(self, symbol: str, rows: int = 100) -> pd.DataFrame:
         response = await self.get_funding_rate_history(symbol, rows)
-        df = pd.DataFrame(response["data"])
+        df = pd.DataFrame(response.get("data") or [])
 
         if df.empty:
             logger.warn(f"No data found for {symbol}")
@@ -76,6 +84,10 @@ class BinanceClient(object):
         return df
 
 
+# Shared client, so the cookies are only requested once
+binance_client = BinanceClient()
+
+
 # Use in loop: funding
 async def get_funding_rate() -> tuple[pd.DataFrame, datetime.timedelta]:
     # Get the JSON data from the Binance API
@@ -187,18 +199,58 @@ async def get_gainers_losers():
 
 
 # For loop: liquidations
+LIQUIDATIONS_DB = "data/liquidations.db"
+S3_NAMESPACE = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+
+def connect_liquidations_db() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(LIQUIDATIONS_DB), exist_ok=True)
+    cnx = sqlite3.connect(LIQUIDATIONS_DB)
+
+    # The summary per file counted the liquidations that are in two files twice,
+    # so it is replaced by the rows and the files are downloaded again
+    if cnx.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'liquidation_summary'"
+    ).fetchone():
+        cnx.execute("DROP TABLE liquidation_summary")
+        cnx.execute("DROP TABLE IF EXISTS liquidation_files")
+
+    cnx.execute("""
+        CREATE TABLE IF NOT EXISTS liquidations (
+            symbol TEXT,
+            market TEXT,
+            date TEXT,
+            time INTEGER,
+            side TEXT,
+            quantity REAL,
+            average_price REAL,
+            PRIMARY KEY (symbol, market, time, side, quantity, average_price)
+        )
+        """)
+    cnx.execute("""
+        CREATE TABLE IF NOT EXISTS liquidation_files (
+            symbol TEXT,
+            market TEXT,
+            file_date TEXT,
+            PRIMARY KEY (symbol, market, file_date)
+        )
+        """)
+    return cnx
 
 
-def get_existing_files() -> list[str]:
-    # TODO: make this async
-    response = requests.get(
-        "https://s3-ap-northeast-1.amazonaws.com/data.binance.vision?delimiter=/&prefix=data/futures/um/daily/liquidationSnapshot/BTCUSDT/"
+async def get_existing_files(symbol: str = "BTCUSDT", market: str = "um") -> list[str]:
+    response = await get_json_data(
+        f"https://s3-ap-northeast-1.amazonaws.com/data.binance.vision?delimiter=/&prefix=data/futures/{market}/daily/liquidationSnapshot/{symbol}/",
+        text=True,
     )
-    tree = ElementTree.fromstring(response.content)
+    if not response:
+        return []
+
+    tree = ElementTree.fromstring(response)
 
     files = []
-    for content in tree.findall("{http://s3.amazonaws.com/doc/2006-03-01/}Contents"):
-        key = content.find("{http://s3.amazonaws.com/doc/2006-03-01/}Key").text
+    for content in tree.findall(f"{S3_NAMESPACE}Contents"):
+        key = content.find(f"{S3_NAMESPACE}Key").text
         if key.endswith(".zip"):
             files.append(key)
 
@@ -209,171 +261,175 @@ def extract_date_from_filename(filename: str) -> str:
     return filename.split("liquidationSnapshot-")[-1].split(".")[0]
 
 
-def get_local_dates(base_path: str, symbol: str, market: str):
-    path_pattern = os.path.join(base_path, symbol, market, "*.csv")
-    local_files = glob.glob(path_pattern)
-    local_dates = {
-        extract_date_from_filename(os.path.basename(file)) for file in local_files
-    }
-    return local_dates
+def get_ingested_dates(symbol: str, market: str) -> set[str]:
+    with connect_liquidations_db() as cnx:
+        rows = cnx.execute(
+            "SELECT file_date FROM liquidation_files WHERE symbol = ? AND market = ?",
+            (symbol, market),
+        ).fetchall()
+    cnx.close()
+    return {row[0] for row in rows}
 
 
-def download_and_extract_zip(
-    symbol: str, date: datetime, market: str = "cm", base_extract_to="./data"
-):
+def read_day(content: bytes) -> pd.DataFrame:
     """
-    Downloads a ZIP file from the given URL and extracts its contents to a subdirectory named after the symbol.
+    Reads the liquidations of one downloaded ZIP file.
 
-    Args:
-    symbol (str): The symbol to download data for.
-    date (datetime): The date for the data.
-    market (str): The market type. Defaults to "cm".
-    base_extract_to (str): The base directory to extract the contents to. Defaults to "./data".
+    Parameters
+    ----------
+    content : bytes
+        The ZIP file containing the liquidation snapshot CSV.
 
-    Returns:
-    None
+    Returns
+    -------
+    pd.DataFrame
+        The columns date, time, side, quantity and average_price.
     """
-    # Ensure the base_extract_to directory exists
-    os.makedirs(base_extract_to, exist_ok=True)
+    with zipfile.ZipFile(BytesIO(content)) as zip_ref:
+        df = pd.concat(
+            [pd.read_csv(zip_ref.open(name)) for name in zip_ref.namelist()],
+            ignore_index=True,
+        )
+
+    df = df.drop_duplicates()
+    df["date"] = pd.to_datetime(df["time"], unit="ms").dt.strftime("%Y-%m-%d")
+
+    return df[["date", "time", "side", "original_quantity", "average_price"]].rename(
+        columns={"original_quantity": "quantity"}
+    )
 
-    # Create a subdirectory for the symbol
-    extract_to = os.path.join(base_extract_to, symbol)
-    os.makedirs(extract_to, exist_ok=True)
 
-    # Subdirectory for the market
-    extract_to = os.path.join(extract_to, market)
-    os.makedirs(extract_to, exist_ok=True)
+def save_day(symbol: str, market: str, file_date: str, rows: pd.DataFrame) -> None:
+    with connect_liquidations_db() as cnx:
+        # A file can contain liquidations of the next day, which are also in the next file
+        cnx.executemany(
+            "INSERT OR IGNORE INTO liquidations VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    symbol,
+                    market,
+                    row.date,
+                    int(row.time),
+                    row.side,
+                    float(row.quantity),
+                    float(row.average_price),
+                )
+                for row in rows.itertuples(index=False)
+            ],
+        )
+        cnx.execute(
+            "INSERT OR IGNORE INTO liquidation_files VALUES (?, ?, ?)",
+            (symbol, market, file_date),
+        )
+    cnx.close()
+
+
+async def ingest_day(
+    session: aiohttp.ClientSession, symbol: str, market: str, file_date: str
+) -> bool:
+    """
+    Downloads the liquidations of one day and adds them to the database.
 
-    date_str = date.strftime("%Y-%m-%d")
-    url = f"https://data.binance.vision/data/futures/{market}/daily/liquidationSnapshot/{symbol}/{symbol}-liquidationSnapshot-{date_str}.zip"
+    Returns
+    -------
+    bool
+        True if the day was added.
+    """
+    url = f"https://data.binance.vision/data/futures/{market}/daily/liquidationSnapshot/{symbol}/{symbol}-liquidationSnapshot-{file_date}.zip"
 
     try:
-        # Step 1: Download the ZIP file
-        response = requests.get(url)
-        response.raise_for_status()  # Ensure the request was successful
-
-        # Step 2: Extract the contents of the ZIP file
-        with zipfile.ZipFile(BytesIO(response.content)) as zip_ref:
-            zip_ref.extractall(extract_to)
-    except requests.RequestException as e:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            content = await response.read()
+
+        rows = await asyncio.to_thread(read_day, content)
+        await asyncio.to_thread(save_day, symbol, market, file_date, rows)
+        return True
+    except aiohttp.ClientError as e:
         logger.error(f"Failed to download {url}: {e}")
     except zipfile.BadZipFile as e:
         logger.error(f"Failed to extract {url}: {e}")
+    return False
 
 
-def get_new_data(
-    symbol: str, market: str = "cm", base_extract_to: str = "./data"
-) -> set[str]:
-    existing_files = get_existing_files()
+async def get_new_data(symbol: str = "BTCUSDT", market: str = "um") -> set[str]:
+    """
+    Adds the days that are available on Binance but not in the database yet.
+
+    Parameters
+    ----------
+    symbol : str, optional
+        The symbol, by default "BTCUSDT".
+    market : str, optional
+        The market, "um" or "cm", by default "um".
+
+    Returns
+    -------
+    set[str]
+        The dates that were added.
+    """
+    existing_files = await get_existing_files(symbol, market)
     existing_dates = {extract_date_from_filename(file) for file in existing_files}
+    missing_dates = sorted(existing_dates - get_ingested_dates(symbol, market))
 
-    local_dates = get_local_dates(base_extract_to, symbol, market)
-    missing_dates = existing_dates - local_dates
-
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = [
-            executor.submit(
-                download_and_extract_zip,
-                symbol,
-                datetime.strptime(date, "%Y-%m-%d"),
-                market,
-                base_extract_to,
-            )
-            for date in missing_dates
-        ]
-        if futures:
-            for future in tqdm(
-                as_completed(futures), total=len(futures), desc="Downloading files"
-            ):
-                try:
-                    future.result()
-                except Exception as e:
-                    logger.error(f"Error occurred: {e}")
-
-    return missing_dates
-
-
-def convert_timestamp_to_date(timestamp):
-    return datetime.datetime.utcfromtimestamp(timestamp / 1000).strftime("%Y-%m-%d")
-
-
-def summarize_liquidations(coin="BTCUSDT", market="um"):
-    file_pattern = f"data/{coin}/{market}/*.csv"
-    # Read all CSV files matching the pattern
-    all_files = glob.glob(file_pattern)
-
-    df_list = []
-    for file in all_files:
-        df = pd.read_csv(file)
-        df_list.append(df)
-
-    # Concatenate all DataFrames into a single DataFrame
-    all_data = pd.concat(df_list, ignore_index=True)
-
-    # Remove duplicate rows
-    all_data.drop_duplicates(inplace=True)
-
-    # Convert the 'time' column to date
-    all_data["date"] = all_data["time"].apply(convert_timestamp_to_date)
-
-    # Calculate total volume in USD
-    all_data["volume"] = all_data["original_quantity"] * all_data["average_price"]
-
-    # Summarize the data
-    summary = (
-        all_data.groupby(["date", "side"])
-        .agg(
-            total_volume=("volume", "sum"),
-            total_liquidations=("original_quantity", "sum"),  # used for avg price
-        )
-        .reset_index()
-    )
+    if not missing_dates:
+        return set()
 
-    summary["average_price"] = summary["total_volume"] / summary["total_liquidations"]
+    semaphore = asyncio.Semaphore(10)
 
-    # Pivot the summary to have separate columns for buy and sell sides
-    pivot_summary = summary.pivot(
-        index="date", columns="side", values=["total_volume", "average_price"]
-    ).fillna(0)
-    pivot_summary.columns = [
-        "_".join(col).strip() for col in pivot_summary.columns.values
-    ]
-    pivot_summary = pivot_summary.rename(
-        columns={
-            "total_volume_BUY": "Buy Volume (USD)",
-            "total_volume_SELL": "Sell Volume (USD)",
-            "average_price_BUY": "Average Buy Price",
-            "average_price_SELL": "Average Sell Price",
-        }
-    )
+    async with aiohttp.ClientSession() as session:
 
-    # Calculate overall average price
-    pivot_summary["Average Price"] = (
-        pivot_summary["Average Buy Price"] * pivot_summary["Buy Volume (USD)"]
-        + pivot_summary["Average Sell Price"] * pivot_summary["Sell Volume (USD)"]
-    ) / (pivot_summary["Buy Volume (USD)"] + pivot_summary["Sell Volume (USD)"])
+        async def ingest(file_date: str) -> bool:
+            async with semaphore:
+                return await ingest_day(session, symbol, market, file_date)
 
-    # Drop individual average price columns if only overall average price is needed
-    pivot_summary.drop(
-        columns=["Average Buy Price", "Average Sell Price"], inplace=True
-    )
+        results = await asyncio.gather(*(ingest(date) for date in missing_dates))
 
-    # Rename columns as required
-    pivot_summary.rename(
-        columns={
-            "Buy Volume (USD)": "Shorts",
-            "Sell Volume (USD)": "Longs",
-            "Average Price": "price",
-        },
-        inplace=True,
-    )
+    return {date for date, added in zip(missing_dates, results) if added}
+
+
+def load_liquidation_summary(
+    symbol: str = "BTCUSDT", market: str = "um"
+) -> pd.DataFrame:
+    """
+    Loads the daily liquidations, summed per date and side in the database.
+
+    Returns
+    -------
+    pd.DataFrame
+        Indexed by date, with the columns Shorts, Longs (in USD) and price.
+    """
+    with connect_liquidations_db() as cnx:
+        df = pd.read_sql_query(
+            """
+            SELECT date, side, SUM(quantity * average_price) AS volume, SUM(quantity) AS quantity
+            FROM liquidations WHERE symbol = ? AND market = ?
+            GROUP BY date, side
+            """,
+            cnx,
+            params=(symbol, market),
+        )
+    cnx.close()
+
+    if df.empty:
+        return df
+
+    summary = df.pivot(index="date", columns="side", values=["volume", "quantity"])
+    summary = summary.fillna(0)
+
+    # The average price of each side, weighted by the volume of that side
+    volume = summary["volume"]
+    side_price = (volume / summary["quantity"]).fillna(0)
 
-    # Convert the index to datetime and set it as index
-    pivot_summary["date"] = pd.to_datetime(pivot_summary.index)
-    pivot_summary = pivot_summary.set_index("date")
+    # Shorts are liquidated by buying, longs by selling
+    result = pd.DataFrame(
+        {
+            "Shorts": summary["volume"].get("BUY", 0),
+            "Longs": summary["volume"].get("SELL", 0),
+            "price": (side_price * volume).sum(axis=1) / volume.sum(axis=1),
+        }
+    )
+    result.index = pd.to_datetime(result.index)
+    result.index.name = "date"
 
-    # Save it locally
-    os.makedirs("data/summary", exist_ok=True)
-    os.makedirs(f"data/summary/{coin}", exist_ok=True)
-    os.makedirs(f"data/summary/{coin}/{market}", exist_ok=True)
-    pivot_summary.to_csv(f"data/summary/{coin}/{market}/liquidation_summary.csv")
+    return result
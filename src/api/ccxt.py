@@ -1,42 +1,53 @@
 from __future__ import annotations
 
 import datetime
-import time
+from functools import cache
 
-import ccxt
+import ccxt.async_support as ccxt
 import pandas as pd
 from dateutil.parser import parse
 
-# Save the exchanges that are useful
-exchanges_with_ohlcv = []
 
-for exchange_id in ccxt.exchanges:
-    exchange = getattr(ccxt, exchange_id)()
-    if exchange.has["fetchOHLCV"]:
-        exchanges_with_ohlcv.append(exchange_id)
+@cache
+def get_exchanges_with_ohlcv() -> list:
+    """
+    Returns the exchanges that support fetching OHLCV data.
+    This creates an instance of every exchange, so it is only done once and only when needed.
+
+    Returns
+    -------
+    list
+        The ids of the exchanges, for instance "binance".
+    """
+    return [
+        exchange_id
+        for exchange_id in ccxt.exchanges
+        if getattr(ccxt, exchange_id)().has["fetchOHLCV"]
+    ]
 
 
-def fetch_data(
+async def fetch_data(
     exchange: str = "binance",
     since=None,
     limit: int = None,
+    symbol: str = "BTC/USDT",
+    timeframe: str = "1d",
 ) -> pd.DataFrame:
     """
     Pandas DataFrame with the latest OHLCV data from specified exchange.
 
     Parameters
     --------------
-    exchange : string, check the exchange_list to see the supported exchanges. For instance "binance".
+    exchange : string, check get_exchanges_with_ohlcv() to see the supported exchanges. For instance "binance".
     since: integer, UTC timestamp in milliseconds. Default is None, which means will not take the start date into account.
     The behavior of this parameter depends on the exchange.
     limit : integer, the amount of rows that should be returned. For instance 100, default is None, which means 500 rows.
+    symbol : string, the symbol to get the data of. Default is "BTC/USDT".
+    timeframe : string, the timeframe of the candles. Default is "1d".
 
     All the timeframe options are: '1m', '3m', '5m', '15m', '30m', '1h', '2h', '4h', '6h', '8h', '12h', '1d', '3d', '1w', '1M'
     """
 
-    timeframe: str = "1d"
-    symbol: str = "BTC/USDT"
-
     # If it is a string, convert it to a datetime object
     if isinstance(since, str):
         since = parse(since)
@@ -47,43 +58,45 @@ def fetch_data(
     # Always convert to lowercase
     exchange = exchange.lower()
 
-    if exchange not in exchanges_with_ohlcv:
+    if exchange not in ccxt.exchanges:
         raise ValueError(
-            f"{exchange} is not a supported exchange. Please use one of the following: {exchanges_with_ohlcv}"
+            f"{exchange} is not a supported exchange. Please use one of the following: {get_exchanges_with_ohlcv()}"
         )
 
-    exchange = getattr(ccxt, exchange)()
-
-    # Convert ms to seconds, so we can use time.sleep() for multiple calls
-    rate_limit = exchange.rateLimit / 1000
+    # The async exchange throttles the calls itself, so the event loop is not blocked
+    exchange = getattr(ccxt, exchange)({"enableRateLimit": True})
 
-    # Get data
-    data = exchange.fetch_ohlcv(symbol, timeframe, since, limit)
+    try:
+        if not exchange.has["fetchOHLCV"]:
+            raise ValueError(
+                f"{exchange.id} is not a supported exchange. Please use one of the following: {get_exchanges_with_ohlcv()}"
+            )
 
-    while len(data) < limit:
-        # If the data is less than the limit, we need to make multiple calls
-        # Shift the since date to the last date of the data
-        since = data[-1][0] + 86400000
+        # Get data
+        data = await exchange.fetch_ohlcv(symbol, timeframe, since, limit)
 
-        # Sleep to prevent rate limit errors
-        time.sleep(rate_limit)
+        while data and limit is not None and len(data) < limit:
+            # If the data is less than the limit, we need to make multiple calls
+            # Shift the since date to the candle after the last one
+            since = data[-1][0] + exchange.parse_timeframe(timeframe) * 1000
 
-        # Get the remaining data
-        new_data = exchange.fetch_ohlcv(symbol, timeframe, since, limit - len(data))
-        data += new_data
+            # Get the remaining data
+            new_data = await exchange.fetch_ohlcv(
+                symbol, timeframe, since, limit - len(data)
+            )
+            data += new_data
 
-        if len(new_data) == 0:
-            break
+            if len(new_data) == 0:
+                break
+    finally:
+        await exchange.close()
 
     df = pd.DataFrame(
         data, columns=["Timestamp", "open", "high", "low", "close", "volume"]
     )
 
     # Convert Timestamp to date
-    df.Timestamp = (
-        df.Timestamp / 1000
-    )  # Timestamp is 1000 times bigger than it should be in this case
-    df["Date"] = pd.to_datetime(df.Timestamp, unit="s")
+    df["Date"] = pd.to_datetime(df["Timestamp"], unit="ms")
 
     # The default values are string, so convert these to numeric values
     df["Value"] = pd.to_numeric(df["close"])
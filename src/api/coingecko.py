@@ -33,13 +33,117 @@ async def get_coin_by_id(id: str) -> dict:
     return data
 
 
-async def get_coins_markets(currency: str = "usd") -> list:
+async def get_coins_markets(
+    currency: str = "usd", page: int = 1, per_page: int = 100
+) -> list:
     data = await get_json_data(
-        f"https://api.coingecko.com/api/v3/coins/markets?vs_currency={currency}"
+        f"https://api.coingecko.com/api/v3/coins/markets?vs_currency={currency}&page={page}&per_page={per_page}"
     )
     return data
 
 
+async def get_coins_markets_by_ids(ids: list, currency: str = "usd") -> list:
+    """
+    Gets the market data of many coins at once, using one request per 250 ids.
+
+    Parameters
+    ----------
+    ids : list
+        The CoinGecko ids of the coins, e.g. ["bitcoin", "ethereum"].
+    currency : str, optional
+        The currency of the prices, by default "usd".
+
+    Returns
+    -------
+    list
+        The market data of the coins that were found.
+    """
+    markets = []
+    for i in range(0, len(ids), 250):
+        data = await get_json_data(
+            f"https://api.coingecko.com/api/v3/coins/markets?vs_currency={currency}&ids={','.join(ids[i : i + 250])}&per_page=250"
+        )
+        if isinstance(data, dict) and rate_limit(data):
+            break
+        if isinstance(data, list):
+            markets += data
+    return markets
+
+
+async def get_market_cap_ranks(pages: int = 4) -> dict:
+    """
+    Gets the market cap rank of the largest coins, 250 coins per page.
+
+    Returns
+    -------
+    dict
+        The CoinGecko id as key and the market cap rank as value.
+    """
+    ranks = {}
+    for page in range(1, pages + 1):
+        data = await get_coins_markets("usd", page=page, per_page=250)
+        if not isinstance(data, list):
+            break
+        for coin in data:
+            if coin.get("market_cap_rank"):
+                ranks[coin["id"]] = coin["market_cap_rank"]
+    return ranks
+
+
+def build_cg_index(cg_db: pd.DataFrame, ranks: dict) -> dict:
+    """
+    Builds the lookup index of the CoinGecko coins list, so tickers can be resolved without requests.
+
+    Parameters
+    ----------
+    cg_db : pd.DataFrame
+        The coins list with the columns id, symbol and name.
+    ranks : dict
+        The market cap rank per id, coins without a rank are placed last.
+
+    Returns
+    -------
+    dict
+        For the keys symbol, id and name a dict of the value -> ids ranked by market cap.
+    """
+    index = {"symbol": {}, "id": {}, "name": {}}
+    if cg_db is None or cg_db.empty:
+        return index
+
+    coins = cg_db[["id", "symbol", "name"]].copy()
+    coins["rank"] = coins["id"].map(ranks).fillna(float("inf"))
+    coins["name"] = coins["name"].str.lower()
+    coins = coins.sort_values("rank")
+
+    for key in index:
+        index[key] = coins.groupby(key, sort=False)["id"].agg(list).to_dict()
+
+    return index
+
+
+def resolve_coin_ids(ticker: str) -> list:
+    """
+    Returns the CoinGecko ids that match the ticker on symbol, id or name, ranked by market cap.
+
+    Parameters
+    ----------
+    ticker : str
+        The ticker, id or name of the coin, e.g. BTC, bitcoin or Bitcoin.
+
+    Returns
+    -------
+    list
+        The matching ids, the first match of symbol, id and name is used.
+    """
+    index = util.vars.cg_index
+    return (
+        index["symbol"].get(ticker.upper())
+        or index["id"].get(ticker.lower())
+        or index["name"].get(ticker.lower())
+        or []
+    )
+
+
 async def get_exchange_tickers(exchange_id: str = "binance") -> dict:
     data = await get_json_data(
         f"https://api.coingecko.com/api/v3/exchanges/{exchange_id}/tickers"
@@ -78,39 +182,78 @@ def rate_limit(response: dict):
     return False
 
 
-async def get_crypto_info(ids):
-    if len(ids) > 1:
-        id = None
-        best_vol = 0
-        coin_dict = None
-        for symbol in ids.values:
-            # Catch potential errors
-            try:
-                coin_info = await get_coin_by_id(symbol)
-                if rate_limit(coin_info):
-                    return None, None
-
-                if "usd" in coin_info["market_data"]["total_volume"]:
-                    volume = coin_info["market_data"]["total_volume"]["usd"]
-                    if volume > best_vol:
-                        best_vol = volume
-                        id = symbol
-                        coin_dict = coin_info
-            except Exception as e:
-                logger.error(f"Error getting coin info for {symbol}, Error: {e}")
-                logger.error(f"Coin info: {coin_info}")
-                pass
+async def get_crypto_info(ids: list) -> tuple[Optional[dict], Optional[str]]:
+    """
+    Gets the market data of all candidate coins in one request and picks the one with the highest volume.
 
+    Parameters
+    ----------
+    ids : list
+        The CoinGecko ids of the coins that share a symbol or name.
+
+    Returns
+    -------
+    tuple[Optional[dict], Optional[str]]
+        The market data and the id of the coin, or None, None if nothing was found.
+    """
+    try:
+        markets = await get_coins_markets_by_ids(list(ids))
+    except Exception as e:
+        logger.error(f"Error getting coin info for {ids}, Error: {e}")
+        return None, None
+
+    if not markets:
+        return None, None
+
+    coin = max(markets, key=lambda c: c.get("total_volume") or 0)
+    return coin, coin["id"]
+
+
+def get_info_from_market(market: dict) -> tuple[float, float, Optional[float]]:
+    """
+    Returns the volume, price and 24h change of the market data of a coin.
+    """
+    if not market:
+        return 0, None, None
+
+    change = market.get("price_change_percentage_24h")
+    if isinstance(change, numbers.Number):
+        change = round(change, 2)
     else:
-        id = ids.values[0]
-        # Try in case the CoinGecko API does not work
-        try:
-            coin_dict = await get_coin_by_id(id)
-        except Exception as e:
-            logger.error(f"Error getting coin info for {id}, Error: {e}")
-            return None, None
+        change = None
+
+    return market.get("total_volume") or 0, market.get("current_price"), change
+
+
+async def get_exchanges_by_id(id: str) -> tuple[Optional[str], list]:
+    """
+    Gets the base symbol and the exchanges of a coin.
+    This requests all details of the coin, so it should only be used if the exchanges are needed.
+
+    Parameters
+    ----------
+    id : str
+        The CoinGecko id of the coin.
 
-    return coin_dict, id
+    Returns
+    -------
+    tuple[Optional[str], list]
+        The base symbol and the names of the exchanges, lowercase and without duplicates.
+    """
+    try:
+        coin_dict = await get_coin_by_id(id)
+    except Exception as e:
+        logger.error(f"Error getting coin info for {id}, Error: {e}")
+        return None, []
+
+    if not coin_dict or rate_limit(coin_dict):
+        return None, []
+
+    base, exchanges = get_coin_exchanges(coin_dict)
+
+    # remove duplicates and suffix 'exchange'
+    exchanges = list({x.lower().replace(" exchange", "") for x in exchanges})
+    return base, exchanges
 
 
 def get_coin_vol(coin_dict: dict) -> float:
@@ -188,17 +331,71 @@ def sanitize_currency_value(value: Union[str, float]) -> float:
 async def get_coin_info(
     ticker: str,
 ) -> Tuple[float, str, List[str], float, str, str]:
+    """
+    Gets the volume, website, exchanges, price, and change of the coin.
+
+    Parameters
+    ----------
+    ticker : str
+        The ticker of the coin.
+
+    Returns
+    -------
+    Tuple[float, str, List[str], float, str, str]
+        The volume, website, exchanges, price, change and base symbol.
+    """
+    return (await get_coin_data(ticker))[:6]
+
+
+async def get_coin_data(
+    ticker: str,
+) -> Tuple[float, str, List[str], float, str, str, Optional[str]]:
+    """
+    Gets the same information as get_coin_info() and the CoinGecko id of the coin.
+    The exchanges are not requested if the coin is in the CoinGecko index,
+    use get_exchanges_by_id() with the id if they are needed.
+
+    Parameters
+    ----------
+    ticker : str
+        The ticker of the coin.
+
+    Returns
+    -------
+    Tuple[float, str, List[str], float, str, str, Optional[str]]
+        The volume, website, exchanges, price, change, base symbol and CoinGecko id.
+        The id is None if the coin was not found on CoinGecko.
+    """
+    # Resolve the ticker locally, only search for it if it is not in the coins list
+    ids = resolve_coin_ids(ticker)
+    market, id = await get_crypto_info(ids[:25]) if ids else (None, None)
+
+    if market:
+        logger.debug(f"Found {ticker} in the CoinGecko index as {id}")
+        volume, price, change = get_info_from_market(market)
+        base = market.get("symbol", ticker).upper()
+
+        return (
+            volume,
+            f"https://coingecko.com/en/coins/{id}",
+            [],
+            price or 0.0,
+            format_change(change) if change else "N/A",
+            base,
+            id,
+        )
 
     data = await get_query_result(ticker)
 
     if rate_limit(data):
-        return 0.0, "", [], 0.0, "N/A", ""
+        return 0.0, "", [], 0.0, "N/A", "", None
 
     coins = data.get("coins", [])
     logger.debug(f"Found {len(coins)} coins for ticker: {ticker}")
 
     if coins:
         coin = coins[0]
+        id = coin.get("id")
         website = f"https://coingecko.com/en/coins/{coin.get('id')}"
         base = coin.get("symbol", ticker)
 
@@ -209,6 +406,7 @@ async def get_coin_info(
 
         exchanges = []
     else:
+        id = None
         base = ticker
         price, change, volume, exchange, website = await tv.get_tv_data(
             ticker, "crypto"
@@ -223,6 +421,7 @@ async def get_coin_info(
         price,
         format_change(change) if change else "N/A",
         base,
+        id,
     )
 
 
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import random
 import re
@@ -288,6 +289,149 @@ class TV_data:
 
         return (0, None, 0, None, website)
 
+    async def get_tv_quotes(
+        self, symbols: List[str], asset: str, timeout: float = 10
+    ) -> dict:
+        """
+        Gets the current price, 24h change and volume of multiple symbols over one websocket.
+        The quotes that did not arrive before the timeout are returned as unavailable.
+
+        Parameters
+        ----------
+        symbols : List[str]
+            The tickers of the stocks / crypto, e.g. "AAPL" or "BTCUSDT".
+        asset : str
+            The type of asset, either "stock" or "crypto".
+        timeout : float, optional
+            The maximum number of seconds to wait for the quotes, by default 10.
+
+        Returns
+        -------
+        dict
+            The symbol as key and the same tuple as get_tv_data() as value.
+        """
+        website_suffix = "/?yahoo" if asset == "stock" else "/?coingecko"
+
+        # The TradingView symbol "exchange:symbol" of each requested symbol
+        tv_symbols = {}
+        results = {}
+        for symbol in symbols:
+            symbol_data = self.get_symbol_data(symbol, asset)
+            if symbol_data is None:
+                results[symbol] = (
+                    0,
+                    None,
+                    0,
+                    None,
+                    f"https://www.tradingview.com/symbols/{symbol}{website_suffix}",
+                )
+            else:
+                tv_symbols[f"{symbol_data[0]}:{symbol_data[2]}"] = symbol
+                results[symbol] = (
+                    0,
+                    None,
+                    0,
+                    None,
+                    f"https://www.tradingview.com/symbols/{symbol_data[2]}{website_suffix}",
+                )
+
+        if not tv_symbols:
+            return results
+
+        # The fields per symbol, updates can contain only some of them
+        fields = {tv_symbol: {} for tv_symbol in tv_symbols}
+        pending = set(tv_symbols)
+
+        async def collect(ws: aiohttp.ClientWebSocketResponse) -> None:
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.ERROR:
+                    logger.error("TradingView websocket Error")
+                    return
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+
+                for frame in re.split(r"~m~\d+~m~", msg.data):
+                    if frame.startswith("~h~"):
+                        # Answer the ping packet
+                        await ws.send_str(f"~m~{len(frame)}~m~{frame}")
+                        continue
+
+                    if not frame.startswith("{"):
+                        continue
+
+                    data = json.loads(frame)
+                    if data.get("m") != "qsd":
+                        continue
+
+                    quote = data["p"][1]
+                    tv_symbol = quote.get("n")
+                    if tv_symbol not in pending:
+                        continue
+
+                    if quote.get("s") != "ok":
+                        pending.discard(tv_symbol)
+                    else:
+                        fields[tv_symbol].update(quote.get("v", {}))
+                        if "lp" in fields[tv_symbol] and "ch" in fields[tv_symbol]:
+                            pending.discard(tv_symbol)
+
+                if not pending:
+                    return
+
+        async def fetch() -> None:
+            async with aiohttp.ClientSession() as session:
+                async with session.ws_connect(
+                    url="wss://data.tradingview.com/socket.io/websocket",
+                    headers={"Origin": "https://data.tradingview.com"},
+                ) as ws:
+                    # This is mandatory to get the data
+                    auth_str = "qs_" + "".join(
+                        random.choice(string.ascii_lowercase) for i in range(12)
+                    )
+
+                    await self.sendMessage(ws, "quote_create_session", [auth_str])
+                    await self.sendMessage(
+                        ws, "quote_set_fields", [auth_str, "ch", "lp", "volume"]
+                    )
+                    await self.sendMessage(
+                        ws, "quote_add_symbols", [auth_str, *tv_symbols]
+                    )
+
+                    await collect(ws)
+
+        try:
+            # The connection and the subscription count towards the timeout as well
+            await asyncio.wait_for(fetch(), timeout)
+
+        except asyncio.TimeoutError:
+            logger.warn(
+                f"TradingView quotes of {len(pending)} out of {len(tv_symbols)} symbols timed out"
+            )
+
+        except aiohttp.ClientConnectionError:
+            logger.error("Temporary TradingView websocket error")
+
+        except Exception:
+            logger.error(traceback.format_exc())
+
+        for tv_symbol, symbol in tv_symbols.items():
+            quote = fields[tv_symbol]
+            price = float(quote.get("lp") or 0)
+            if price == 0 or "ch" not in quote:
+                continue
+
+            volume = float(quote.get("volume") or 0)
+            results[symbol] = (
+                price,
+                round((float(quote["ch"]) / price) * 100, 2),
+                # Convert to USD volume if asset is crypto
+                price * volume if asset == "crypto" else volume,
+                tv_symbol.split(":")[0].lower(),
+                results[symbol][4],
+            )
+
+        return results
+
     def format_analysis(self, analysis: dict) -> str:
         """
         Simple helper function to format the TA data into one string.
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import csv
+import time
 from io import StringIO
 from typing import List, Optional
 
+import aiohttp
+
 from api.http_client import get_json_data
 from api.tradingview import tv
 from constants.logger import logger
@@ -120,12 +124,17 @@ def add_afterhours_data(
         logger.error(f"Error in adding after hours data: {e}")
 
 
-async def yf_info(ticker: str, do_format_change: bool = True):
-    # This can be blocking
+async def chart_quote(ticker: str) -> Optional[tuple[float, list, list]]:
+    """
+    Gets the quote of a single ticker using the chart endpoint.
+
+    Returns
+    -------
+    Optional[tuple[float, list, list]]
+        The volume, prices and unformatted changes or None if there is no data.
+    """
     try:
-        # No results when asynchronous=True
         logger.debug(f"Getting Yahoo Finance data for {ticker}")
-        # stock_info = Ticker(ticker, asynchronous=False).price
         data = await get_stock_details(ticker)  # could also use ohlcv function
         if data["chart"]["result"] is None:
             return None
@@ -140,34 +149,240 @@ async def yf_info(ticker: str, do_format_change: bool = True):
     prices = []
     changes = []
 
-    # Helper function to format and append price data
-    def append_price_data(price_key: str, prev_close_key: str):
-        price = stock_info.get(price_key)
-        # Could also use chartPreviousClose
-        prev_close = stock_info.get(prev_close_key, price)
+    price = stock_info.get("regularMarketPrice")
+    # Could also use chartPreviousClose
+    prev_close = stock_info.get("previousClose", price)
 
+    if price and price != 0:
+        prices.append(price)
         # Calculate percentage change
-        change = (
-            (price - prev_close) / prev_close * 100 if price and prev_close else None
-        )
+        changes.append((price - prev_close) / prev_close * 100 if prev_close else None)
+
+    add_afterhours_data(data, False, prices, changes)
+
+    return stock_info.get("regularMarketVolume", 0), prices, changes
+
+
+def parse_quote(quote: dict) -> Optional[tuple[float, list, list]]:
+    """
+    Converts a result of the quote endpoint to the same format as chart_quote().
+    """
+    price = quote.get("regularMarketPrice")
+    if not price:
+        return None
+
+    prev_close = quote.get("regularMarketPreviousClose", price)
+    prices = [price]
+    changes = [quote.get("regularMarketChangePercent")]
+
+    if afterHours():
+        # The price of the current extended session, compared to the last close
+        ah_price = quote.get("postMarketPrice") or quote.get("preMarketPrice")
+        if ah_price and prev_close:
+            prices.append(ah_price)
+            changes.append((ah_price - prev_close) / prev_close * 100)
 
-        if do_format_change:
-            change = format_change(change)
-        if price and price != 0:
-            prices.append(price)
-            changes.append(change or "N/A")  # Handle None or missing change
+    return quote.get("regularMarketVolume", 0), prices, changes
 
-    append_price_data("regularMarketPrice", "previousClose")
-    add_afterhours_data(data, do_format_change, prices, changes)
+
+class QuoteBatcher:
+    """
+    Groups the tickers requested within a short window into one multi-symbol quote request.
+    Tickers that are missing in the response are requested using the chart endpoint.
+    The quote endpoint requires a crumb with its cookie, which is requested once and renewed
+    when Yahoo Finance rejects it.
+    The quotes are cached per market session, so the after-hours prices are refreshed
+    once the market opens or closes.
+    """
+
+    def __init__(
+        self, window: float = 0.1, max_symbols: int = 50, ttl: int = 60
+    ) -> None:
+        self.window = window
+        self.max_symbols = max_symbols
+        self.ttl = ttl
+        self.pending = {}
+        self.cache = {}
+        self.flush_task = None
+        # Kept so the running flushes are not garbage collected
+        self.flush_tasks = set()
+        self.cookies = None
+        self.crumb = None
+
+    async def refresh_crumb(self, session: aiohttp.ClientSession) -> None:
+        """
+        Requests the cookie and the crumb that belongs to it, which the quote endpoint requires.
+
+        Parameters
+        ----------
+        session : aiohttp.ClientSession
+            The session that stores the cookie.
+        """
+        self.cookies = None
+        self.crumb = None
+
+        # This page returns 404, but sets the cookie
+        async with session.get("https://fc.yahoo.com", allow_redirects=True):
+            pass
+
+        async with session.get(
+            "https://query1.finance.yahoo.com/v1/test/getcrumb"
+        ) as r:
+            crumb = await r.text()
+            if r.status != 200 or not crumb or "<" in crumb:
+                raise ValueError(f"no crumb received, status {r.status}")
+
+        self.cookies = {c.key: c.value for c in session.cookie_jar}
+        self.crumb = crumb
+
+    async def get_quotes(self, tickers: list) -> dict:
+        """
+        Requests the quotes of the tickers in one request.
+
+        Parameters
+        ----------
+        tickers : list
+            The tickers to request.
+
+        Returns
+        -------
+        dict
+            The parsed quote of each ticker that is in the response.
+        """
+        async with aiohttp.ClientSession(
+            headers=headers, cookies=self.cookies
+        ) as session:
+            for attempt in range(2):
+                if self.crumb is None:
+                    await self.refresh_crumb(session)
+
+                async with session.get(
+                    "https://query1.finance.yahoo.com/v7/finance/quote",
+                    params={"symbols": ",".join(tickers), "crumb": self.crumb},
+                ) as r:
+                    # The crumb expired, request a new one once
+                    if r.status in (401, 403) and attempt == 0:
+                        self.crumb = None
+                        continue
+                    r.raise_for_status()
+                    data = await r.json()
+                break
+
+        return {
+            quote.get("symbol"): parse_quote(quote)
+            for quote in data.get("quoteResponse", {}).get("result") or []
+        }
+
+    async def get(self, ticker: str) -> Optional[tuple[float, list, list]]:
+        """
+        Returns the volume, prices and unformatted changes of the ticker.
+
+        Parameters
+        ----------
+        ticker : str
+            The ticker of the stock, e.g. AAPL.
+
+        Returns
+        -------
+        Optional[tuple[float, list, list]]
+            The quote or None if Yahoo Finance has no data for this ticker.
+        """
+        key = (ticker, afterHours())
+        cached = self.cache.get(key)
+        if cached is not None:
+            if time.time() - cached[0] < self.ttl:
+                return cached[1]
+            del self.cache[key]
+
+        if ticker not in self.pending:
+            self.pending[ticker] = asyncio.get_running_loop().create_future()
+        future = self.pending[ticker]
+
+        if len(self.pending) >= self.max_symbols:
+            self.start(self.flush())
+        elif self.flush_task is None:
+            self.flush_task = self.start(self.flush_later())
+
+        return await future
+
+    def start(self, coro) -> asyncio.Task:
+        """
+        Runs the flush in the background and keeps a reference to it until it is done.
+        """
+        task = asyncio.create_task(coro)
+        self.flush_tasks.add(task)
+        task.add_done_callback(self.flush_tasks.discard)
+        return task
+
+    def evict(self) -> None:
+        """
+        Removes the expired quotes from the cache.
+        """
+        now = time.time()
+        for key in [k for k, (t, _) in self.cache.items() if now - t >= self.ttl]:
+            del self.cache[key]
+
+    async def flush_later(self) -> None:
+        await asyncio.sleep(self.window)
+        self.flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Requests the pending tickers and fans the results out to the waiters.
+        """
+        pending, self.pending = self.pending, {}
+        if not pending:
+            return
+
+        tickers = list(pending.keys())
+        quotes = {}
+
+        try:
+            quotes = await self.get_quotes(tickers)
+        except Exception as e:
+            logger.error(f"Error in getting Yahoo Finance quotes for {tickers}: {e}")
+
+        # Use the chart endpoint for the tickers the batch request missed
+        missing = [t for t in tickers if quotes.get(t) is None]
+        if missing:
+            logger.warn(
+                f"Yahoo Finance batch quote missed {len(missing)} of {len(tickers)} tickers, using the chart endpoint for {missing}"
+            )
+        results = await asyncio.gather(*(chart_quote(t) for t in missing))
+        quotes.update(zip(missing, results))
+
+        self.evict()
+        session = afterHours()
+        for ticker, future in pending.items():
+            quote = quotes.get(ticker)
+            if quote is not None:
+                self.cache[(ticker, session)] = (time.time(), quote)
+            if not future.done():
+                future.set_result(quote)
+
+
+quote_batcher = QuoteBatcher()
+
+
+async def yf_info(ticker: str, do_format_change: bool = True):
+    quote = await quote_batcher.get(ticker)
+    if quote is None:
+        return None
+
+    volume, prices, changes = quote
+
+    if do_format_change:
+        # Handle None or missing change
+        changes = [format_change(c) if c is not None else "N/A" for c in changes]
+    else:
+        changes = [c if c is not None else "N/A" for c in changes]
 
     # Calculate volume
-    volume: float = (
-        stock_info.get("regularMarketVolume", 0) * prices[-1] if prices else 0
-    )
+    volume: float = volume * prices[-1] if prices else 0
 
     # Prepare return values
     url: str = f"https://finance.yahoo.com/quote/{ticker}"
-    # exchange: str = stock_info.get("fullExchangeName", [])
 
     return volume, url, [], prices, changes if changes else ["N/A"], ticker
 
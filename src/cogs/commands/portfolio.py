@@ -10,11 +10,10 @@ from discord.ext import commands
 from discord.ui import Select, View
 
 import util.vars
-from cogs.loops.assets import Assets
-from cogs.loops.trades import Trades
 from constants.logger import logger
 from util.db import update_db
 from util.disc import log_command_usage
+from util.exchange_data import close_exchange
 
 
 class Portfolio(commands.Cog):
@@ -136,10 +135,15 @@ class Portfolio(commands.Cog):
             "Succesfully added your portfolio to the database!\n⚠️ Please ensure that you set the API for read-only access ⚠️"
         )
 
-        # Init Exchanges to start websockets
-        Trades(self.bot, new_data)
-        # Post the assets
-        Assets(self.bot, new_data)
+        # Start the websocket of this portfolio
+        trades = self.bot.get_cog("Trades")
+        if trades is not None:
+            await trades.add_stream(new_data.iloc[0])
+
+        # Sync and post the assets
+        assets = self.bot.get_cog("Assets")
+        if assets is not None:
+            await assets.assets()
 
     @portfolios.command(
         name="remove", description="Remove a portfolio from the database."
@@ -231,6 +235,7 @@ class PortfolioSelectView(View):
         super().__init__()
         self.ctx = ctx
         self.portfolio_db = portfolio_db
+        self.rows = portfolio_db[portfolio_db["id"] == ctx.author.id]
 
     @discord.ui.select(placeholder="Select the portfolio to remove")
     async def select_portfolio(self, select: Select, interaction: Interaction):
@@ -240,7 +245,16 @@ class PortfolioSelectView(View):
             )
 
         index = int(select.values[0])
-        self.portfolio_db.drop(self.portfolio_db.index[index], inplace=True)
+        row = self.rows.iloc[index]
+        util.vars.portfolio_db = self.portfolio_db.drop(index=row.name)
+        update_db(util.vars.portfolio_db, "portfolio")
+
+        # Stop the websocket and the exchange of this portfolio
+        trades = self.ctx.bot.get_cog("Trades")
+        if trades is not None:
+            await trades.remove_stream(row)
+        await close_exchange(row)
+
         await interaction.response.send_message(
             "Successfully removed the selected portfolio from the database!",
             ephemeral=True,
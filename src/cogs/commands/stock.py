@@ -10,7 +10,12 @@ from constants.config import config
 from constants.logger import logger
 from util.confirm_stock import confirm_stock
 from util.db import merge_and_update, update_db
-from util.disc import get_channel, log_command_usage
+from util.disc import (
+    add_asset_holder,
+    get_channel,
+    index_user_assets,
+    log_command_usage,
+)
 from util.trades_msg import trades_msg
 
 
@@ -178,6 +183,8 @@ class Stock(commands.Cog):
                 ] += amount
 
             self.update_assets_db(old_db)
+
+        add_asset_holder(ctx.author.id, ticker.upper())
         await ctx.respond("Succesfully added your stock to the database!")
 
         # Send message in trades channel
@@ -238,6 +245,7 @@ class Stock(commands.Cog):
             if not row.empty:
                 amount = old_db.loc[row, "owned"].values[0]
                 self.update_assets_db(old_db.drop(index=row))
+                index_user_assets(util.vars.assets_db, ctx.author.id)
                 await ctx.respond(
                     f"Succesfully removed all {ticker.upper()} from your owned stocks!"
                 )
@@ -263,6 +271,7 @@ class Stock(commands.Cog):
                 # if it is equal to or greater than the amount to remove, remove all
                 if float(amount) >= owned_now:
                     self.update_assets_db(old_db.drop(index=row.index))
+                    index_user_assets(util.vars.assets_db, ctx.author.id)
                     await ctx.respond(
                         f"Succesfully removed all {ticker.upper()} from your owned stocks!"
                     )
@@ -1,15 +1,20 @@
 ##> Imports
 # > Standard libraries
-from csv import writer
+from typing import Optional
 
 # > Discord dependencies
 import discord
 from discord.ext import commands
+from discord.ext.tasks import loop
 
 # > Local dependencies
 from constants.config import config
 from constants.logger import logger
 from util.disc import get_channel, get_webhook
+from util.message_cache import message_cache
+from util.sentiment_labels import label_store
+
+emoji_to_label = {"🐻": -1, "🐂": 1, "🦆": 0}
 
 
 class On_raw_reaction_add(commands.Cog):
@@ -21,6 +26,12 @@ class On_raw_reaction_add(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.channel = None
+        self.flush_labels.start()
+
+    def cog_unload(self) -> None:
+        self.flush_labels.cancel()
+        # Write the labels that are still buffered
+        label_store.flush_later()
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(
@@ -38,50 +49,71 @@ class On_raw_reaction_add(commands.Cog):
         -------
         None
         """
-        if self.channel is None:
-            self.channel = await get_channel(
-                self.bot, config["LISTENERS"]["ON_RAW_REACTION_ADD"]["CHANNEL"]
-            )
+        # Ignore private messages and the reactions added by the bot itself
+        if reaction.guild_id is None or reaction.user_id == self.bot.user.id:
+            return
 
-        # Ignore private messages
-        if reaction.guild_id is None:
+        emoji = str(reaction.emoji)
+        if emoji not in ["🐻", "🐂", "🦆", "💸", "❤️"]:
             return
 
         try:
-            # Load necessary variables
-            channel = self.bot.get_channel(reaction.channel_id)
-            try:
-                message = discord.utils.get(
-                    await channel.history(limit=100).flatten(), id=reaction.message_id
-                )
-            except Exception as e:
-                logger.error(f"Error getting channel.history for {channel}. Error: {e}")
+            message = await self.get_message(reaction)
+            if message is None:
                 return
 
-            if reaction.user_id != self.bot.user.id:
-                if (
-                    str(reaction.emoji) == "🐻"
-                    or str(reaction.emoji) == "🐂"
-                    or str(reaction.emoji) == "🦆"
-                ):
-                    await self.classify_reaction(reaction, message)
-                elif str(reaction.emoji) == "💸":
-                    # Check if user has the role or is an admin
-                    if config["LISTENERS"]["ON_RAW_REACTION_ADD"]["ROLE"] != "None":
-                        if (
-                            config["LISTENERS"]["ON_RAW_REACTION_ADD"]["ROLE"]
-                            in reaction.member.roles
-                            or reaction.member.guild_permissions.administrator
-                        ):
-                            await self.highlight(message, reaction.member)
-                    else:
+            if emoji in emoji_to_label:
+                await self.classify_reaction(reaction, message)
+            elif emoji == "💸":
+                # Check if user has the role or is an admin
+                if config["LISTENERS"]["ON_RAW_REACTION_ADD"]["ROLE"] != "None":
+                    if (
+                        config["LISTENERS"]["ON_RAW_REACTION_ADD"]["ROLE"]
+                        in reaction.member.roles
+                        or reaction.member.guild_permissions.administrator
+                    ):
                         await self.highlight(message, reaction.member)
-                elif str(reaction.emoji) == "❤️":
-                    await self.send_dm(message, reaction.member)
+                else:
+                    await self.highlight(message, reaction.member)
+            elif emoji == "❤️":
+                await self.send_dm(message, reaction.member)
 
         except commands.CommandError as e:
             logger.error(e)
 
+    async def get_message(
+        self, reaction: discord.RawReactionActionEvent
+    ) -> Optional[discord.Message]:
+        """
+        Gets the message that the reaction was added to.
+        Messages posted by the bot are cached, otherwise the message is fetched.
+
+        Parameters
+        ----------
+        reaction : discord.RawReactionActionEvent
+            The information about the reaction that was added.
+
+        Returns
+        -------
+        Optional[discord.Message]
+            The message or None if it could not be fetched.
+        """
+        message = message_cache.get(reaction.message_id)
+        if message is not None:
+            return message
+
+        channel = self.bot.get_channel(reaction.channel_id)
+        try:
+            message = await channel.fetch_message(reaction.message_id)
+        except Exception as e:
+            logger.error(
+                f"Error fetching message {reaction.message_id} in {channel}. Error: {e}"
+            )
+            return None
+
+        message_cache.add(message)
+        return message
+
     async def classify_reaction(
         self, reaction: discord.RawReactionActionEvent, message: discord.Message
     ) -> None:
@@ -100,20 +132,22 @@ class On_raw_reaction_add(commands.Cog):
         None
         """
 
-        with open("data/sentiment_data.csv", "a", newline="") as file:
-            writer_object = writer(file)
-            if str(reaction.emoji) == "🐻":
-                writer_object.writerow(
-                    [message.embeds[0].description.replace("\n", " "), -1]
-                )
-            elif str(reaction.emoji) == "🐂":
-                writer_object.writerow(
-                    [message.embeds[0].description.replace("\n", " "), 1]
-                )
-            elif str(reaction.emoji) == "🦆":
-                writer_object.writerow(
-                    [message.embeds[0].description.replace("\n", " "), 0]
-                )
+        if not message.embeds or not message.embeds[0].description:
+            return
+
+        label_store.add(
+            message.id,
+            reaction.user_id,
+            message.embeds[0].description.replace("\n", " "),
+            emoji_to_label[str(reaction.emoji)],
+        )
+
+    @loop(minutes=1)
+    async def flush_labels(self) -> None:
+        """
+        Writes the collected sentiment labels to the database.
+        """
+        await label_store.flush()
 
     async def highlight(self, message: discord.Message, user: discord.User) -> None:
         """
@@ -131,6 +165,11 @@ class On_raw_reaction_add(commands.Cog):
         None
         """
 
+        if self.channel is None:
+            self.channel = await get_channel(
+                self.bot, config["LISTENERS"]["ON_RAW_REACTION_ADD"]["CHANNEL"]
+            )
+
         # Get the old embed
         e = message.embeds[0]
 
@@ -149,7 +188,7 @@ class On_raw_reaction_add(commands.Cog):
             webhook = await get_webhook(self.channel)
 
             # Wait so we can use this message as reference
-            await webhook.send(
+            msg = await webhook.send(
                 embeds=image_e,
                 username="FinTwit",
                 wait=True,
@@ -157,7 +196,9 @@ class On_raw_reaction_add(commands.Cog):
             )
 
         else:
-            await self.channel.send(embed=e)
+            msg = await self.channel.send(embed=e)
+
+        message_cache.add(msg)
 
     async def send_dm(self, message: discord.Message, user: discord.User) -> None:
         """
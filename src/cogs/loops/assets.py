@@ -7,17 +7,36 @@ import discord
 import numpy as np
 import pandas as pd
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 import util.vars
 from api.coingecko import get_coin_info
 from api.yahoo import get_stock_info
 from constants.config import config
 from constants.logger import logger
+from util.dashboard import update_dashboard
 from util.db import update_db
-from util.disc import get_channel, get_guild, get_user, loop_error_catcher
-from util.exchange_data import get_data
-from util.formatting import format_change, format_embed_length
+from util.disc import (
+    get_channel,
+    get_guild,
+    get_user,
+    index_assets,
+    loop_error_catcher,
+)
+from util.exchange_data import close_exchanges, get_data
+from util.formatting import format_changes, format_embed_length
+from util.scheduler import NETWORK, scheduled
+
+assets_db_columns = {
+    "asset": str,
+    "buying_price": float,
+    "owned": float,
+    "exchange": str,
+    "id": np.int64,
+    "user": str,
+    "worth": float,
+    "price": float,
+    "change": float,
+}
 
 
 class Assets(commands.Cog):
@@ -30,6 +49,10 @@ class Assets(commands.Cog):
         self.bot = bot
         self.assets.start()
 
+    def cog_unload(self) -> None:
+        self.assets.cancel()
+        asyncio.create_task(close_exchanges())
+
     async def usd_value(self, asset: str, exchange: str) -> tuple[float, float]:
         """
         Get the USD value of an asset, based on the exchange.
@@ -62,7 +85,7 @@ class Assets(commands.Cog):
 
         return usd_val, change
 
-    @loop(hours=1)
+    @scheduled(hours=1, cost=NETWORK)
     @loop_error_catcher
     async def assets(self) -> None:
         """
@@ -78,18 +101,6 @@ class Assets(commands.Cog):
         -------
         None
         """
-        assets_db_columns = {
-            "asset": str,
-            "buying_price": float,
-            "owned": float,
-            "exchange": str,
-            "id": np.int64,
-            "user": str,
-            "worth": float,
-            "price": float,
-            "change": float,
-        }
-
         if util.vars.portfolio_db.empty:
             logger.warn("No portfolios in the database.")
             return
@@ -104,11 +115,22 @@ class Assets(commands.Cog):
             # Create a new database
             assets_db = pd.DataFrame(columns=list(assets_db_columns.keys()))
 
-        # Get the assets of each user
-        for _, row in util.vars.portfolio_db.iterrows():
-            # Add this data to the assets db
-            exch_data = await get_data(row)
-            assets_db = pd.concat([assets_db, exch_data], ignore_index=True)
+        # Get the assets of the users concurrently, bounded to not hit the rate limits
+        semaphore = asyncio.Semaphore(
+            config["LOOPS"]["ASSETS"].get("MAX_CONCURRENT_USERS", 5)
+        )
+
+        async def get_user_data(row: pd.Series) -> pd.DataFrame:
+            async with semaphore:
+                return await get_data(row)
+
+        results = await asyncio.gather(
+            *(get_user_data(row) for _, row in util.vars.portfolio_db.iterrows())
+        )
+
+        # Add this data to the assets db, skipping invalid keys and failed requests
+        exch_data = [df for df in results if isinstance(df, pd.DataFrame)]
+        assets_db = pd.concat([assets_db, *exch_data], ignore_index=True)
 
         # Ensure that the db knows the right types
         assets_db = assets_db.astype(assets_db_columns)
@@ -116,150 +138,113 @@ class Assets(commands.Cog):
         # Update the assets db
         update_db(assets_db, "assets")
         util.vars.assets_db = assets_db
+        index_assets(assets_db)
 
         # Post the assets
         await self.post_assets()
 
-    async def update_prices_and_changes(self, new_df: pd.DataFrame) -> pd.DataFrame:
+    async def update_prices_and_changes(self, assets_db: pd.DataFrame) -> pd.DataFrame:
         """
         Updates the prices and changes of the stock assets in the DataFrame.
+        Every ticker is only requested once, even if multiple users own it.
         """
-        # Filter DataFrame to only include rows where exchange is "stock"
-        stock_df = new_df[new_df["exchange"] == "stock"]
-
-        # Asynchronously get price and change for each asset
-        async def get_price_change(row):
-            price, change = await self.usd_value(row["asset"], row["exchange"])
-            return {
-                "price": 0 if price is None else round(price, 2),
-                "change": 0 if change is None else change,
-                "worth": (
-                    0
-                    if price in [None, np.nan]
-                    else round(price * float(row["owned"]), 2)
-                ),
-            }
+        stock_mask = assets_db["exchange"] == "stock"
+        tickers = assets_db.loc[stock_mask, "asset"].unique()
+
+        if len(tickers) == 0:
+            return assets_db
 
         # Using asyncio.gather to run all async operations concurrently
         results = await asyncio.gather(
-            *(get_price_change(row) for _, row in stock_df.iterrows())
+            *(self.usd_value(ticker, "stock") for ticker in tickers)
         )
+        quotes = pd.DataFrame(results, index=tickers, columns=["price", "change"])
+        quotes = quotes.apply(pd.to_numeric, errors="coerce").fillna(0)
 
         # Update the DataFrame with the results
-        for i, (index, row) in enumerate(stock_df.iterrows()):
-            new_df.at[index, "price"] = results[i]["price"]
-            new_df.at[index, "change"] = results[i]["change"]
-            new_df.at[index, "worth"] = results[i]["worth"]
+        stock_assets = assets_db.loc[stock_mask, "asset"]
+        assets_db.loc[stock_mask, "price"] = stock_assets.map(quotes["price"]).round(2)
+        assets_db.loc[stock_mask, "change"] = stock_assets.map(quotes["change"])
+        assets_db.loc[stock_mask, "worth"] = (
+            assets_db.loc[stock_mask, "price"] * assets_db.loc[stock_mask, "owned"]
+        ).round(2)
 
-        return new_df
+        return assets_db
 
-    async def format_exchange(
-        self,
-        exchange_df: pd.DataFrame,
-        exchange: str,
-        e: discord.Embed,
-    ) -> discord.Embed:
+    def format_assets(self, assets_db: pd.DataFrame) -> pd.DataFrame:
         """
-        Formats the embed used for updating user's assets.
+        Adds the formatted price and worth columns for all users at once.
 
         Parameters
         ----------
-        exchange_df : pd.DataFrame
-            The dataframe of assets owned by a user.
-        exchange : str
-            The exchange the assets are on, currently only 'binance' and 'kucoin' are supported.
-        e : discord.Embed
-            The embed to be formatted.
-        old_worth : str
-            The worth of the user's assets before the update.
-        old_assets : str
-            The assets of the user before the update.
+        assets_db : pd.DataFrame
+            The assets of all users, with the types of assets_db_columns.
 
         Returns
         -------
-        discord.Embed
-            The new embed.
+        pd.DataFrame
+            The assets sorted by worth, with the formatted price_change and worth columns.
         """
-
-        # Necessary to prevent panda warnings
-        new_df = exchange_df.copy()
-
-        # Add stock data to the DataFrame
-        stock_df = util.vars.assets_db[util.vars.assets_db["exchange"] == "stock"]
-        if not stock_df.empty:
-            new_df = await self.update_prices_and_changes(new_df)
-
-        # Remove everything after % in change
-        # new_df["change"] = new_df["change"].str.split("%").str[0]
-
-        # if change cannot be converted to float, set it to 0
-        new_df["change"] = new_df["change"].apply(
-            lambda x: 0 if not isinstance(x, float) else x
-        )
-
-        # Set the types (again)
-        new_df = new_df.astype(
-            {
-                "asset": str,
-                "buying_price": float,
-                "owned": float,
-                "exchange": str,
-                "id": np.int64,
-                "user": str,
-                "worth": float,
-                "price": float,
-                "change": float,  # Make sure this is not the formatted change
-            }
-        )
-
-        # Format the price change
-        new_df["change"] = new_df["change"].apply(lambda x: format_change(x))
+        assets_db["worth"] = assets_db["worth"].fillna(0)
 
         # Format price and change
-        new_df["price_change"] = (
+        assets_db["price_change"] = (
             "$"
-            + new_df["price"].astype(str)
+            + assets_db["price"].astype(str)
             + " ("
-            + new_df["change"].astype(str)
+            + format_changes(assets_db["change"])
             + ")"
         )
 
-        # Fill NaN values of worth
-        new_df["worth"] = new_df["worth"].fillna(0)
-
-        # Set buying price to float
-        new_df["buying_price"] = new_df["buying_price"].astype(float)
-
-        # Add worth_change column
-        new_df["worth_change"] = "?"
-
         # Calculate the worth_change percentage only where buying_price is not 0
-        mask = new_df["buying_price"] != 0
-        new_df.loc[mask, "worth_change"] = round(
-            ((new_df["price"] - new_df["buying_price"]) / new_df["buying_price"] * 100),
-            2,
-        )
-
-        # Apply format_change to worth_change
-        new_df.loc[mask, "worth_change"] = new_df.loc[mask, "worth_change"].apply(
-            lambda x: format_change(x)
+        known = assets_db["buying_price"] != 0
+        worth_change = (
+            (assets_db["price"] - assets_db["buying_price"])
+            / assets_db["buying_price"].where(known)
+            * 100
         )
+        assets_db["worth_change"] = format_changes(worth_change).where(known, "?")
 
         # Sort by usd value
-        new_df = new_df.sort_values(by=["worth"], ascending=False)
+        assets_db = assets_db.sort_values(by=["worth"], ascending=False)
 
-        new_df["worth"] = (
+        assets_db["worth"] = (
             "$"
-            + new_df["worth"].astype(str)
+            + assets_db["worth"].astype(str)
             + " ("
-            + new_df["worth_change"].astype(str)
+            + assets_db["worth_change"]
             + ")"
         )
 
+        return assets_db
+
+    def format_exchange(
+        self,
+        exchange_df: pd.DataFrame,
+        exchange: str,
+        e: discord.Embed,
+    ) -> discord.Embed:
+        """
+        Formats the embed used for updating user's assets.
+
+        Parameters
+        ----------
+        exchange_df : pd.DataFrame
+            The formatted assets owned by a user on this exchange, see format_assets().
+        exchange : str
+            The exchange the assets are on, currently only 'binance' and 'kucoin' are supported.
+        e : discord.Embed
+            The embed to be formatted.
+
+        Returns
+        -------
+        discord.Embed
+            The new embed.
+        """
         # Create the list of string values
-        assets = "\n".join(new_df["asset"].to_list())
-        prices = "\n".join(new_df["price_change"].to_list())
-        worth = "\n".join(new_df["worth"].to_list())
+        assets = "\n".join(exchange_df["asset"].to_list())
+        prices = "\n".join(exchange_df["price_change"].to_list())
+        worth = "\n".join(exchange_df["worth"].to_list())
 
         # Ensure that the length is not bigger than allowed
         assets, prices, worth = format_embed_length([assets, prices, worth])
@@ -283,42 +268,66 @@ class Assets(commands.Cog):
         -------
         None
         """
+        if util.vars.assets_db.empty:
+            return
 
-        # Use the user name as channel
-        for id in util.vars.assets_db["id"].unique():
-            # Get the assets of this user
-            user_assets = util.vars.assets_db.loc[util.vars.assets_db["id"] == id]
-
-            # Only post if there are assets
-            if not user_assets.empty:
-                # Get the Discord objects
-                channel = await self.get_user_channel(user_assets["user"].values[0])
-                disc_user = await self.get_user(user_assets)
-
-                e = discord.Embed(
-                    title="",
-                    description="",
-                    color=0x1DA1F2,
-                    timestamp=datetime.datetime.now(datetime.timezone.utc),
-                )
-
-                if disc_user:
-                    e.set_author(
-                        name=disc_user.name + "'s Assets",
-                        icon_url=disc_user.display_avatar.url,
+        # Set the types and format the assets of all users in one pass
+        assets_db = util.vars.assets_db.copy()
+        assets_db["change"] = pd.to_numeric(assets_db["change"], errors="coerce")
+        assets_db = assets_db.astype(assets_db_columns)
+        assets_db = await self.update_prices_and_changes(assets_db)
+        assets_db = self.format_assets(assets_db)
+
+        semaphore = asyncio.Semaphore(
+            config["LOOPS"]["ASSETS"].get("MAX_CONCURRENT_USERS", 5)
+        )
+
+        async def post(user_assets: pd.DataFrame) -> None:
+            async with semaphore:
+                try:
+                    await self.post_user_assets(user_assets)
+                except Exception as e:
+                    logger.error(
+                        f"Error posting assets of {user_assets['user'].values[0]}: {e}"
                     )
 
-                # Finally, format the embed before posting it
-                for exchange in ["Binance", "KuCoin", "Stock"]:
-                    exchange_df = user_assets.loc[
-                        user_assets["exchange"] == exchange.lower()
-                    ]
+        await asyncio.gather(
+            *(post(user_assets) for _, user_assets in assets_db.groupby("id"))
+        )
+
+    async def post_user_assets(self, user_assets: pd.DataFrame) -> None:
+        """
+        Posts the assets of a single user in their own channel.
+
+        Parameters
+        ----------
+        user_assets : pd.DataFrame
+            The formatted assets of this user, see format_assets().
+        """
+        # Get the Discord objects
+        channel = await self.get_user_channel(user_assets["user"].values[0])
+        disc_user = await self.get_user(user_assets)
+
+        e = discord.Embed(
+            title="",
+            description="",
+            color=0x1DA1F2,
+            timestamp=datetime.datetime.now(datetime.timezone.utc),
+        )
+
+        if disc_user:
+            e.set_author(
+                name=disc_user.name + "'s Assets",
+                icon_url=disc_user.display_avatar.url,
+            )
 
-                    if not exchange_df.empty:
-                        e = await self.format_exchange(exchange_df, exchange, e)
+        # Finally, format the embed before posting it
+        exchanges = dict(tuple(user_assets.groupby("exchange")))
+        for exchange in ["Binance", "KuCoin", "Stock"]:
+            if exchange.lower() in exchanges:
+                e = self.format_exchange(exchanges[exchange.lower()], exchange, e)
 
-                await channel.purge(limit=1)
-                await channel.send(embed=e)
+        await update_dashboard(channel, "assets", embed=e)
 
     async def get_user_channel(self, name: str) -> discord.TextChannel:
         """
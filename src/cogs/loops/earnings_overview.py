@@ -3,13 +3,13 @@ import datetime
 import discord
 import pandas as pd
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 from api.nasdaq import get_earnings_for_date
 from constants.config import config
 from constants.logger import logger
 from constants.sources import data_sources
 from util.disc import get_channel, get_tagged_users, loop_error_catcher
+from util.scheduler import NETWORK, scheduled
 
 
 class Earnings_Overview(commands.Cog):
@@ -80,7 +80,7 @@ class Earnings_Overview(commands.Cog):
             return True
         return False
 
-    @loop(hours=1)
+    @scheduled(hours=1, cost=NETWORK)
     @loop_error_catcher
     async def earnings(self) -> None:
         """
@@ -3,13 +3,14 @@ import datetime
 import discord
 import pandas as pd
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 from api.cryptocraft import get_crypto_calendar
 from api.investing import get_events
 from constants.config import config
 from constants.sources import data_sources
+from util.dashboard import update_dashboard
 from util.disc import get_channel, loop_error_catcher
+from util.scheduler import NETWORK, scheduled
 
 
 class Events(commands.Cog):
@@ -29,7 +30,7 @@ class Events(commands.Cog):
             self.crypto_channel = None
             self.post_crypto_events.start()
 
-    @loop(hours=6)
+    @scheduled(hours=6, cost=NETWORK)
     @loop_error_catcher
     async def post_events(self):
         """
@@ -97,11 +98,9 @@ class Events(commands.Cog):
             icon_url=data_sources["investing"]["icon"],
         )
 
-        # Remove the previous message
-        await self.stocks_channel.purge()
-        await self.stocks_channel.send(embed=e)
+        await update_dashboard(self.stocks_channel, "events", embed=e)
 
-    @loop(hours=24)
+    @scheduled(hours=24, cost=NETWORK)
     @loop_error_catcher
     async def post_crypto_events(self):
         if self.crypto_channel is None:
@@ -5,14 +5,15 @@ import discord
 
 # > 3rd party dependencies
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 from api.binance import get_funding_rate
 from constants.config import config
 
 # Local dependencies
 from constants.sources import data_sources
+from util.dashboard import update_dashboard
 from util.disc import get_channel, loop_error_catcher
+from util.scheduler import NETWORK, scheduled
 
 
 class Funding(commands.Cog):
@@ -26,7 +27,7 @@ class Funding(commands.Cog):
         self.channel = None
         self.funding.start()
 
-    @loop(hours=4)
+    @scheduled(hours=4, cost=NETWORK)
     @loop_error_catcher
     async def funding(self) -> None:
         """
@@ -73,8 +74,7 @@ class Funding(commands.Cog):
         )
 
         # Post the embed in the channel
-        await self.channel.purge(limit=1)
-        await self.channel.send(embed=e)
+        await update_dashboard(self.channel, "funding", embed=e)
 
 
 def setup(bot: commands.Bot) -> None:
@@ -1,27 +1,34 @@
+import asyncio
 import datetime
-import glob
 import os
+import sqlite3
+import time
+from io import BytesIO
 
 import discord
-import matplotlib.pyplot as plt
+import matplotlib.style
 import numpy as np
 import pandas as pd
 import seaborn as sns
 from discord.ext import commands
-from discord.ext.tasks import loop
+from matplotlib.figure import Figure
 from matplotlib.ticker import FuncFormatter
-from tqdm import tqdm
 
-from api.binance import BinanceClient
+from api.binance import binance_client
 from api.coingecko import get_top_vol_coins
 from constants.config import config
+from constants.logger import logger
 from constants.sources import data_sources
+from util.dashboard import update_dashboard
 from util.disc import get_channel, loop_error_catcher
+from util.render import figure_to_png, render_cache
+from util.scheduler import RENDER, scheduled
 
 FIGURE_SIZE = (20, 10)
 NUM_COINS = 30
 NUM_DAYS = 90
-FUNDING_DIR = "data/funding_rate"
+FUNDING_DB = "data/funding_rate.db"
+FUNDING_INTERVAL_HOURS = 4
 BACKGROUND_COLOR = "#0d1117"
 TEXT_COLOR = "#b9babc"
 
@@ -37,7 +44,7 @@ class Funding_heatmap(commands.Cog):
         self.channel = None
         self.post_heatmap.start()
 
-    @loop(hours=24)
+    @scheduled(hours=24, cost=RENDER)
     @loop_error_catcher
     async def post_heatmap(self):
         if self.channel is None:
@@ -48,22 +55,21 @@ class Funding_heatmap(commands.Cog):
             )
 
         # Load data
-        df = await load_funding_rate_data(
-            FUNDING_DIR,
-        )
+        df = await load_funding_rate_data(NUM_DAYS)
 
         # Prepare heatmap data
         heatmap_data = prepare_heatmap_data(df, NUM_DAYS)
 
         # Plot heatmap
-        plot_heatmap(heatmap_data)
+        png = await render_cache.render(
+            "funding_heatmap",
+            plot_heatmap,
+            heatmap_data,
+            dpi=config["LOOPS"]["FUNDING_HEATMAP"].get("DPI", 300),
+        )
 
         # Save plot
         file_name = "funding_rate.png"
-        file_path = os.path.join("temp", file_name)
-        plt.savefig(file_path, bbox_inches="tight", dpi=300)
-        plt.cla()
-        plt.close()
 
         e = discord.Embed(
             title="Funding Rate Heatmap",
@@ -72,65 +78,133 @@ class Funding_heatmap(commands.Cog):
             timestamp=datetime.datetime.now(datetime.timezone.utc),
             url="https://www.coinglass.com/FundingRateHeatMap",
         )
-        file = discord.File(file_path, filename=file_name)
+        file = discord.File(BytesIO(png), filename=file_name)
         e.set_image(url=f"attachment://{file_name}")
         e.set_footer(
             text="\u200b",
             icon_url=data_sources["coinglass"]["icon"],
         )
 
-        await self.channel.purge(limit=1)
-        await self.channel.send(file=file, embed=e)
+        await update_dashboard(self.channel, "funding_heatmap", embed=e, file=file)
 
-        # Delete temp file
-        os.remove(file_path)
 
+def connect_funding_db() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(FUNDING_DB), exist_ok=True)
+    cnx = sqlite3.connect(FUNDING_DB)
+    cnx.execute("""
+        CREATE TABLE IF NOT EXISTS funding_rate (
+            symbol TEXT,
+            calcTime INTEGER,
+            lastFundingRate REAL,
+            PRIMARY KEY (symbol, calcTime)
+        )
+        """)
+    return cnx
 
-async def get_all_funding_rates(NUM_COINS: int = 30):
-    # TODO: Check if there is new data and save it
-    b = BinanceClient()
-    symbols = await get_top_vol_coins(NUM_COINS)
 
-    os.makedirs("data/funding_rate", exist_ok=True)
+def get_latest_times(symbols: list) -> dict:
+    """
+    Returns the calcTime in ms of the newest stored funding rate per symbol.
+    """
+    with connect_funding_db() as cnx:
+        rows = cnx.execute(
+            f"SELECT symbol, MAX(calcTime) FROM funding_rate WHERE symbol IN ({','.join('?' * len(symbols))}) GROUP BY symbol",
+            symbols,
+        ).fetchall()
+    cnx.close()
+    return dict(rows)
+
+
+def save_funding_rates(df: pd.DataFrame) -> None:
+    with connect_funding_db() as cnx:
+        # The primary key ignores rows that are already stored
+        cnx.executemany(
+            "INSERT OR IGNORE INTO funding_rate VALUES (?, ?, ?)",
+            df[["symbol", "calcTime", "lastFundingRate"]].itertuples(index=False),
+        )
+    cnx.close()
 
-    for symbol in tqdm(symbols, desc="Processing symbols"):
-        # tqdm.write(f"Processing symbol: {symbol}")
-        df = await b.fund_rating(symbol, rows=10_000)
-        # Save the df in data/funding_rate/symbol.csv
-        if not df.empty:
-            df.to_csv(f"data/funding_rate/{symbol}.csv", index=False)
 
+async def update_funding_rate(symbol: str, latest: int = None) -> None:
+    """
+    Fetches the funding rates of the symbol that are newer than the latest stored rate.
+
+    Parameters
+    ----------
+    symbol : str
+        The symbol, e.g. BTCUSDT.
+    latest : int, optional
+        The calcTime in ms of the newest stored rate, by default None which fetches the full history.
+    """
+    if latest is None:
+        rows = 10_000
+    else:
+        hours = (time.time() * 1000 - latest) / (60 * 60 * 1000)
+        # Fundings happen every 8 hours at most, FUNDING_INTERVAL_HOURS for some symbols
+        rows = min(10_000, int(hours // FUNDING_INTERVAL_HOURS) + 10)
+        if hours < FUNDING_INTERVAL_HOURS:
+            return
+
+    df = await binance_client.fund_rating(symbol, rows=rows)
+    if df.empty:
+        return
 
-async def load_funding_rate_data(directory):
-    all_files = glob.glob(os.path.join(directory, "*.csv"))
+    df["calcTime"] = (df["calcTime"] - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)
+    df["lastFundingRate"] = pd.to_numeric(df["lastFundingRate"])
+    if latest is not None:
+        df = df[df["calcTime"] > latest]
 
-    if all_files == []:
-        await get_all_funding_rates()
-        all_files = glob.glob(os.path.join(directory, "*.csv"))
+    if not df.empty:
+        await asyncio.to_thread(save_funding_rates, df)
 
-    df_list = []
 
-    for file in all_files:
-        df = pd.read_csv(file, parse_dates=["calcTime"])
+async def load_funding_rate_data(num_days: int = NUM_DAYS) -> pd.DataFrame:
+    """
+    Brings the stored funding rates of the top volume coins up to date and loads the last num_days.
 
-        # Get the latest date of the data
-        latest_date = df["calcTime"].max()
+    Parameters
+    ----------
+    num_days : int, optional
+        The number of days to load, by default NUM_DAYS.
 
-        # If the data is older than 8 hours, fetch new data
-        if pd.Timestamp.now() - latest_date > pd.Timedelta(hours=12):
-            symbol = file.split("/")[-1].split(".")[0]
-            # Also remove any backslashes from the symbol
-            symbol = symbol.split("\\")[-1]
-            b = BinanceClient()
-            new_df = await b.fund_rating(symbol, rows=10_000)
-            if not new_df.empty:
-                new_df.to_csv(file, index=False)
-                df = pd.read_csv(file, parse_dates=["calcTime"])
+    Returns
+    -------
+    pd.DataFrame
+        The funding rates with the columns symbol, calcTime and lastFundingRate.
+    """
+    symbols = await get_top_vol_coins(NUM_COINS)
+    latest = await asyncio.to_thread(get_latest_times, symbols)
 
-        df_list.append(df)
+    # Update all symbols concurrently, using the shared client
+    semaphore = asyncio.Semaphore(5)
 
-    all_data = pd.concat(df_list, ignore_index=True)
-    return all_data
+    async def update(symbol: str) -> None:
+        async with semaphore:
+            try:
+                await update_funding_rate(symbol, latest.get(symbol))
+            except Exception as e:
+                logger.error(f"Error updating the funding rate of {symbol}: {e}")
+
+    await asyncio.gather(*(update(symbol) for symbol in symbols))
+
+    since = int((time.time() - num_days * 24 * 60 * 60) * 1000)
+    return await asyncio.to_thread(read_funding_rates, symbols, since)
+
+
+def read_funding_rates(symbols: list, since: int) -> pd.DataFrame:
+    """
+    Reads the stored funding rates of the symbols since the calcTime in ms.
+    """
+    with connect_funding_db() as cnx:
+        df = pd.read_sql_query(
+            f"SELECT symbol, calcTime, lastFundingRate FROM funding_rate WHERE calcTime >= ? AND symbol IN ({','.join('?' * len(symbols))})",
+            cnx,
+            params=[since, *symbols],
+        )
+    cnx.close()
+
+    df["calcTime"] = pd.to_datetime(df["calcTime"], unit="ms")
+    return df
 
 
 def prepare_heatmap_data(df, NUM_DAYS: int) -> pd.DataFrame:
@@ -154,13 +228,21 @@ def prepare_heatmap_data(df, NUM_DAYS: int) -> pd.DataFrame:
     return heatmap_data
 
 
-def plot_heatmap(data: pd.DataFrame):
-    # Set the style for a dark background
-    plt.style.use("dark_background")
-    sns.set_theme(style="darkgrid")
+def plot_heatmap(data: pd.DataFrame, dpi: int = 300) -> bytes:
+    """
+    Draws the funding rate heatmap, this is executed by the render pool.
+    """
+    # Use a dark background with the seaborn darkgrid theme, only for this figure
+    with matplotlib.style.context("dark_background"):
+        with sns.axes_style("darkgrid"), sns.plotting_context("notebook"):
+            fig = draw_heatmap(data)
+            return figure_to_png(fig, dpi)
+
 
+def draw_heatmap(data: pd.DataFrame) -> Figure:
     # Create a figure and axis with a dark background
-    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+    fig = Figure(figsize=FIGURE_SIZE)
+    ax = fig.subplots()
     fig.patch.set_facecolor(BACKGROUND_COLOR)  # Dark background color for the figure
     ax.set_facecolor(BACKGROUND_COLOR)  # Dark background color for the axes
 
@@ -196,7 +278,7 @@ def plot_heatmap(data: pd.DataFrame):
     ax.set_ylabel("")
 
     # Adjust layout to reduce empty space around the plot
-    plt.subplots_adjust(left=0.075, right=0.975, top=0.875, bottom=-0.15)
+    fig.subplots_adjust(left=0.075, right=0.975, top=0.875, bottom=-0.15)
 
     # Get the color bar and reposition it below the heatmap
     cbar = heatmap.collections[0].colorbar
@@ -235,11 +317,11 @@ def plot_heatmap(data: pd.DataFrame):
 
     cbar.ax.xaxis.set_major_formatter(FuncFormatter(percent_formatter))
 
-    plt.xticks(rotation=0)
-    plt.yticks(rotation=0)
+    ax.tick_params(axis="x", labelrotation=0)
+    ax.tick_params(axis="y", labelrotation=0)
 
     # Add the title in the top left corner
-    plt.text(
+    ax.text(
         -0.06,
         1.125,
         "Funding Rate Heatmap",
@@ -251,6 +333,8 @@ def plot_heatmap(data: pd.DataFrame):
         weight="bold",
     )
 
+    return fig
+
 
 def setup(bot: commands.Bot) -> None:
     bot.add_cog(Funding_heatmap(bot))
@@ -1,14 +1,15 @@
 import pandas as pd
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 from api.binance import get_gainers_losers
 from api.yahoo import get_gainers
 from constants.config import config
 from constants.logger import logger
 from util.afterhours import afterHours
+from util.dashboard import update_dashboard
 from util.disc import get_channel, loop_error_catcher
 from util.formatting import format_embed
+from util.scheduler import NETWORK, scheduled
 
 
 class Gainers(commands.Cog):
@@ -36,7 +37,7 @@ class Gainers(commands.Cog):
         ):
             self.crypto.start()
 
-    @loop(hours=1)
+    @scheduled(hours=1, cost=NETWORK)
     @loop_error_catcher
     async def crypto(self) -> None:
         """
@@ -62,8 +63,9 @@ class Gainers(commands.Cog):
                     config["LOOPS"]["GAINERS"]["CHANNEL"],
                     config["CATEGORIES"]["CRYPTO"],
                 )
-            await self.crypto_gainers_channel.purge(limit=1)
-            await self.crypto_gainers_channel.send(embed=e_gainers)
+            await update_dashboard(
+                self.crypto_gainers_channel, "gainers", embed=e_gainers
+            )
 
         if config["LOOPS"]["LOSERS"]["CRYPTO"]["ENABLED"]:
             if self.crypto_losers_channel is None:
@@ -72,10 +74,9 @@ class Gainers(commands.Cog):
                     config["LOOPS"]["LOSERS"]["CHANNEL"],
                     config["CATEGORIES"]["CRYPTO"],
                 )
-            await self.crypto_losers_channel.purge(limit=1)
-            await self.crypto_losers_channel.send(embed=e_losers)
+            await update_dashboard(self.crypto_losers_channel, "losers", embed=e_losers)
 
-    @loop(hours=1)
+    @scheduled(hours=1, cost=NETWORK)
     @loop_error_catcher
     async def stocks(self) -> None:
         """
@@ -99,8 +100,7 @@ class Gainers(commands.Cog):
         try:
             gainers = await get_gainers(count=10)
             e = await format_embed(pd.DataFrame(gainers), "Gainers", "yahoo")
-            await self.stocks_channel.purge(limit=1)
-            await self.stocks_channel.send(embed=e)
+            await update_dashboard(self.stocks_channel, "gainers", embed=e)
         except Exception as e:
             logger.error(f"Error posting stocks gainers: {e}")
 
@@ -3,7 +3,6 @@ import datetime
 import discord
 import pandas as pd
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 import util.vars
 from api.tradingview_ideas import scraper
@@ -11,6 +10,8 @@ from constants.config import config
 from constants.sources import data_sources
 from util.db import update_db
 from util.disc import get_channel, get_tagged_users, loop_error_catcher
+from util.message_cache import message_cache
+from util.scheduler import NETWORK, scheduled
 
 
 class TradingView_Ideas(commands.Cog):
@@ -133,7 +134,8 @@ class TradingView_Ideas(commands.Cog):
             elif type == "forex":
                 channel = self.forex_channel
 
-            await channel.send(content=get_tagged_users([row["Symbol"]]), embed=e)
+            msg = await channel.send(content=get_tagged_users([row["Symbol"]]), embed=e)
+            message_cache.add(msg)
 
             counter += 1
 
@@ -143,7 +145,7 @@ class TradingView_Ideas(commands.Cog):
         # Write to db
         update_db(util.vars.ideas_ids, "ideas_ids")
 
-    @loop(hours=24)
+    @scheduled(hours=24, cost=NETWORK)
     @loop_error_catcher
     async def crypto_ideas(self) -> None:
         """
@@ -163,7 +165,7 @@ class TradingView_Ideas(commands.Cog):
         df = await scraper("crypto")
         await self.send_embed(df, "crypto")
 
-    @loop(hours=24)
+    @scheduled(hours=24, cost=NETWORK)
     @loop_error_catcher
     async def stock_ideas(self) -> None:
         """
@@ -182,7 +184,7 @@ class TradingView_Ideas(commands.Cog):
         df = await scraper("stocks")
         await self.send_embed(df, "stocks")
 
-    @loop(hours=24)
+    @scheduled(hours=24, cost=NETWORK)
     @loop_error_catcher
     async def forex_ideas(self) -> None:
         """
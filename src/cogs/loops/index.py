@@ -1,20 +1,36 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
 
 import discord
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 from api.farside import get_etf_inflow
 from api.fear_greed import get_feargread
 from api.tradingview import tv
 from constants.config import config
+from constants.logger import logger
 from constants.sources import data_sources
 from constants.tradingview import crypto_indices, forex_indices, stock_indices
 from util.afterhours import afterHours
+from util.dashboard import update_dashboard
 from util.disc import get_channel, loop_error_catcher
 from util.formatting import human_format
+from util.scheduler import NETWORK, scheduled
+
+
+async def with_timeout(coro, timeout: float, name: str):
+    """
+    Awaits the coroutine within the timeout, returns None if it fails or takes too long.
+    """
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        logger.warn(f"Getting the {name} took longer than {timeout} seconds")
+    except Exception as e:
+        logger.error(f"Error getting the {name}: {e}")
+    return None
 
 
 async def create_embed(title: str, indices: list, data_type: str) -> discord.Embed:
@@ -25,10 +41,22 @@ async def create_embed(title: str, indices: list, data_type: str) -> discord.Emb
         timestamp=datetime.datetime.now(datetime.timezone.utc),
     )
 
+    # All data is requested at once, the parts that are not ready within the budget are left out
+    timeout = config["LOOPS"]["INDEX"].get("TIMEOUT", 20)
+    requests = [tv.get_tv_quotes(indices, data_type, timeout=timeout)]
+    if data_type == "crypto":
+        requests.append(with_timeout(get_feargread(), timeout, "Fear & Greed index"))
+        requests += [
+            with_timeout(get_etf_inflow(coin), timeout, f"{coin} ETF inflow")
+            for coin in ["BTC", "ETH"]
+        ]
+
+    quotes, *extra = await asyncio.gather(*requests)
+
     ticker, prices, changes = [], [], []
 
     for index in indices:
-        price, change, _, exchange, _ = await tv.get_tv_data(index, data_type)
+        price, change, _, exchange, _ = quotes[index]
 
         if price == 0:
             continue
@@ -52,7 +80,7 @@ async def create_embed(title: str, indices: list, data_type: str) -> discord.Emb
 
     # Handle special Fear & Greed index for crypto
     if data_type == "crypto":
-        fear_greed_data = await get_feargread()
+        fear_greed_data, *inflows = extra
         if fear_greed_data is not None:
             value, change = fear_greed_data
             ticker.append(
@@ -62,8 +90,9 @@ async def create_embed(title: str, indices: list, data_type: str) -> discord.Emb
             changes.append(change)
 
         # Add etf inflow
-        for coin in ["BTC", "ETH"]:
-            inflow = await get_etf_inflow(coin)
+        for coin, inflow in zip(["BTC", "ETH"], inflows):
+            if inflow is None:
+                continue
             ticker.append(f"{coin} ETF Inflow")
             prices.append(f"{inflow}M")
             changes.append("N/A")
@@ -101,7 +130,7 @@ class Index(commands.Cog):
             self.forex_indices = [sym.split(":")[1] for sym in forex_indices]
             self.stocks.start()
 
-    @loop(hours=1)
+    @scheduled(hours=1, cost=NETWORK)
     @loop_error_catcher
     async def crypto(self) -> None:
         """
@@ -120,10 +149,9 @@ class Index(commands.Cog):
             )
         e = await create_embed("Crypto Indices", self.crypto_indices, "crypto")
 
-        await self.crypto_channel.purge(limit=1)
-        await self.crypto_channel.send(embed=e)
+        await update_dashboard(self.crypto_channel, "index", embed=e)
 
-    @loop(hours=1)
+    @scheduled(hours=1, cost=NETWORK)
     @loop_error_catcher
     async def stocks(self) -> None:
         """
@@ -147,8 +175,7 @@ class Index(commands.Cog):
 
         stock_e = await create_embed("Stock & Forex Indices", indices, "stock")
 
-        await self.stocks_channel.purge(limit=1)
-        await self.stocks_channel.send(embed=stock_e)
+        await update_dashboard(self.stocks_channel, "index", embed=stock_e)
 
 
 def setup(bot: commands.Bot) -> None:
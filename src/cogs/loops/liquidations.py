@@ -1,20 +1,24 @@
-import os
+import asyncio
 from datetime import datetime, timedelta, timezone
+from io import BytesIO
 
 import discord
 import matplotlib.dates as mdates
-import matplotlib.pyplot as plt
 import pandas as pd
 from discord.ext import commands
-from discord.ext.tasks import loop
 from matplotlib import ticker
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
 
-from api.binance import get_new_data, summarize_liquidations
+from api.binance import get_new_data, load_liquidation_summary
 from constants.config import config
 from constants.logger import logger
 from constants.sources import data_sources
+from util.dashboard import update_dashboard
 from util.disc import get_channel, loop_error_catcher
 from util.formatting import human_format
+from util.render import figure_to_png, render_cache
+from util.scheduler import RENDER, scheduled
 
 BACKGROUND_COLOR = "#0d1117"
 FIGURE_SIZE = (15, 7)
@@ -32,7 +36,7 @@ class Liquidations(commands.Cog):
         self.channel = None
         self.post_liquidations.start()
 
-    @loop(hours=24)
+    @scheduled(hours=24, cost=RENDER)
     @loop_error_catcher
     async def post_liquidations(self):
         """
@@ -42,9 +46,11 @@ class Liquidations(commands.Cog):
             self.channel = await get_channel(
                 self.bot, config["LOOPS"]["LIQUIDATIONS"]["CHANNEL"]
             )
+        png = await liquidations_chart()
+        if png is None:
+            return
+
         file_name: str = "liquidations.png"
-        file_path = os.path.join("temp", file_name)
-        await liquidations_chart(file_name)
 
         e = discord.Embed(
             title="Total Liquidations",
@@ -53,51 +59,63 @@ class Liquidations(commands.Cog):
             timestamp=datetime.now(timezone.utc),
             url="https://www.coinglass.com/LiquidationData",
         )
-        file = discord.File(file_path, filename=file_name)
+        file = discord.File(BytesIO(png), filename=file_name)
         e.set_image(url=f"attachment://{file_name}")
         e.set_footer(
             text="\u200b",
             icon_url=data_sources["coinglass"]["icon"],
         )
 
-        await self.channel.purge(limit=1)
-        await self.channel.send(file=file, embed=e)
+        await update_dashboard(self.channel, "liquidations", embed=e, file=file)
 
-        # Delete yield.png
-        os.remove(file_path)
 
+async def liquidations_chart() -> bytes:
+    """
+    Updates the liquidation summary and renders the chart of it.
 
-async def liquidations_chart(file_name: str = "liquidations.png"):
+    Returns
+    -------
+    bytes
+        The chart as PNG, or None if there is no data.
+    """
     coin = "BTCUSDT"
     market = "um"
-    new_data = get_new_data(coin, market=market)
+    new_data = await get_new_data(coin, market=market)
     if new_data:
-        logger.info(f"Downloaded {len(new_data)} new files.")
-        # Recreate the summaryf
-        summarize_liquidations(coin=coin, market=market)
+        logger.info(f"Added {len(new_data)} new days of liquidations.")
+
     # Load the summary
-    df = pd.read_csv(
-        f"data/summary/{coin}/{market}/liquidation_summary.csv",
-        index_col=0,
-        parse_dates=True,
-    )
+    df = await asyncio.to_thread(load_liquidation_summary, coin, market)
 
     if df is None or df.empty:
-        return
+        return None
 
+    return await render_cache.render(
+        "liquidations",
+        plot_liquidations,
+        df,
+        dpi=config["LOOPS"]["LIQUIDATIONS"].get("DPI", 300),
+    )
+
+
+def plot_liquidations(df: pd.DataFrame, dpi: int = 300) -> bytes:
+    """
+    Draws the liquidations chart, this is executed by the render pool.
+    """
     df_price = df[["price"]].copy()
     df_without_price = df.drop("price", axis=1)
     df_without_price["Shorts"] = df_without_price["Shorts"] * -1
 
     # This plot has 2 axes
-    fig, ax1 = plt.subplots()
+    fig = Figure(figsize=FIGURE_SIZE)
+    ax1 = fig.subplots()
     fig.patch.set_facecolor(BACKGROUND_COLOR)
     ax1.set_facecolor(BACKGROUND_COLOR)
 
     ax2 = ax1.twinx()
 
-    plt.gca().xaxis.set_major_formatter(mdates.DateFormatter("%d %b"))
-    plt.gca().xaxis.set_major_locator(mdates.DayLocator(interval=14))
+    ax2.xaxis.set_major_formatter(mdates.DateFormatter("%d %b"))
+    ax2.xaxis.set_major_locator(mdates.DayLocator(interval=14))
 
     ax1.bar(
         df_without_price.index,
@@ -127,7 +145,7 @@ async def liquidations_chart(file_name: str = "liquidations.png"):
     add_legend(ax2)
 
     # Add gridlines
-    plt.grid(axis="y", color="grey", linestyle="-.", linewidth=0.5, alpha=0.5)
+    ax2.grid(axis="y", color="grey", linestyle="-.", linewidth=0.5, alpha=0.5)
 
     # Remove spines
     ax1.spines["top"].set_visible(False)
@@ -152,11 +170,8 @@ async def liquidations_chart(file_name: str = "liquidations.png"):
         right=df_without_price.index[-1] + timedelta(days=1),
     )
 
-    # Set correct size
-    fig.set_size_inches(FIGURE_SIZE)
-
     # Add the title in the top left corner
-    plt.text(
+    ax2.text(
         -0.025,
         1.125,
         "Total Liquidations Chart",
@@ -168,17 +183,13 @@ async def liquidations_chart(file_name: str = "liquidations.png"):
         weight="bold",
     )
 
-    # Convert to plot to a temporary image
-    file_path = os.path.join("temp", file_name)
-    plt.savefig(file_path, bbox_inches="tight", dpi=300)
-    plt.cla()
-    plt.close()
+    return figure_to_png(fig, dpi)
 
 
 def add_legend(ax):
     # Create custom legend handles with square markers, including BTC price
     legend_handles = [
-        plt.Line2D(
+        Line2D(
             [0],
             [0],
             marker="s",
@@ -208,7 +219,7 @@ def add_legend(ax):
         text.set_fontweight("bold")
 
     # Adjust layout to reduce empty space around the plot
-    plt.subplots_adjust(left=0.05, right=0.95, top=0.875, bottom=0.1)
+    ax.figure.subplots_adjust(left=0.05, right=0.95, top=0.875, bottom=0.1)
 
 
 def setup(bot: commands.Bot) -> None:
@@ -3,12 +3,12 @@ import datetime
 
 import discord
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 from api.http_client import get_json_data
 from constants.config import config
 from constants.sources import data_sources
 from util.disc import get_channel, loop_error_catcher
+from util.scheduler import NETWORK, scheduled
 
 
 class Exchange_Listings(commands.Cog):
@@ -121,7 +121,7 @@ class Exchange_Listings(commands.Cog):
         # Start after setting all the symbols
         self.new_listings.start()
 
-    @loop(hours=6)
+    @scheduled(hours=6, cost=NETWORK)
     @loop_error_catcher
     async def new_listings(self) -> None:
         """
@@ -1,6 +1,5 @@
 import pandas as pd
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 from api.yahoo import get_losers
 from constants.config import config
@@ -8,6 +7,7 @@ from constants.logger import logger
 from util.afterhours import afterHours
 from util.disc import get_channel, loop_error_catcher
 from util.formatting import format_embed
+from util.scheduler import NETWORK, scheduled
 
 
 class Losers(commands.Cog):
@@ -24,7 +24,7 @@ class Losers(commands.Cog):
             self.channel = None
             self.losers.start()
 
-    @loop(hours=2)
+    @scheduled(hours=2, cost=NETWORK)
     @loop_error_catcher
     async def losers(self) -> None:
         """
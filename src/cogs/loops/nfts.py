@@ -3,7 +3,6 @@ import datetime
 import discord
 import pandas as pd
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 from api.cmc import top_cmc, upcoming_cmc
 from api.coingecko import get_search_trending
@@ -14,8 +13,10 @@ from constants.logger import logger
 
 # > Local
 from constants.sources import data_sources
+from util.dashboard import update_dashboard
 from util.disc import get_channel, loop_error_catcher
 from util.formatting import format_change
+from util.scheduler import NETWORK, scheduled
 
 
 class NFTS(commands.Cog):
@@ -44,7 +45,7 @@ class NFTS(commands.Cog):
             self.trending_channel = None
             self.trending_nfts.start()
 
-    @loop(hours=1)
+    @scheduled(hours=1, cost=NETWORK)
     @loop_error_catcher
     async def top_nfts(self):
         if self.top_channel is None:
@@ -56,8 +57,6 @@ class NFTS(commands.Cog):
         opensea_top = await get_opensea()
         cmc_top = await top_cmc()
 
-        await self.top_channel.purge(limit=2)
-
         for df, name in [(opensea_top, "Opensea"), (cmc_top, "CoinMarketCap")]:
             if df.empty:
                 logger.warn("No top NFTs found for " + name)
@@ -104,9 +103,9 @@ class NFTS(commands.Cog):
             # Set empty text as footer, so we can see the icon
             e.set_footer(text="\u200b", icon_url=icon_url)
 
-            await self.top_channel.send(embed=e)
+            await update_dashboard(self.top_channel, f"top_{name.lower()}", embed=e)
 
-    @loop(hours=1)
+    @scheduled(hours=1, cost=NETWORK)
     @loop_error_catcher
     async def trending_nfts(self):
         if self.trending_channel is None:
@@ -115,8 +114,6 @@ class NFTS(commands.Cog):
                 config["LOOPS"]["TRENDING"]["CHANNEL"],
                 config["CATEGORIES"]["NFTS"],
             )
-        await self.trending_channel.purge(limit=2)
-
         await self.opensea_trending()
         await self.gc_trending()
 
@@ -156,7 +153,7 @@ class NFTS(commands.Cog):
             icon_url=data_sources["opensea"]["icon"],
         )
 
-        await self.trending_channel.send(embed=e)
+        await update_dashboard(self.trending_channel, "trending_opensea", embed=e)
 
     async def gc_trending(self):
         search_trending = await get_search_trending()
@@ -205,9 +202,9 @@ class NFTS(commands.Cog):
             icon_url=data_sources["coingecko"]["icon"],
         )
 
-        await self.trending_channel.send(embed=e)
+        await update_dashboard(self.trending_channel, "trending_coingecko", embed=e)
 
-    @loop(hours=1)
+    @scheduled(hours=1, cost=NETWORK)
     @loop_error_catcher
     async def upcoming_nfts(self):
         if self.upcoming_channel is None:
@@ -254,10 +251,9 @@ class NFTS(commands.Cog):
         )
         e.set_footer(text="\u200b", icon_url=data_sources["coinmarketcap"]["icon"])
 
-        await self.upcoming_channel.purge(limit=1)
-        await self.upcoming_channel.send(embed=e)
+        await update_dashboard(self.upcoming_channel, "upcoming", embed=e)
 
-    @loop(hours=1)
+    @scheduled(hours=1, cost=NETWORK)
     @loop_error_catcher
     async def top_p2e(self):
         if self.p2e_channel is None:
@@ -308,8 +304,7 @@ class NFTS(commands.Cog):
             icon_url=data_sources["playtoearn"]["icon"],
         )
 
-        await self.p2e_channel.purge(limit=1)
-        await self.p2e_channel.send(embed=e)
+        await update_dashboard(self.p2e_channel, "p2e", embed=e)
 
 
 def setup(bot: commands.Bot) -> None:
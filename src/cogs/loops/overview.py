@@ -3,14 +3,14 @@ from collections import Counter, defaultdict
 
 import discord
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 import util.vars
 from api.http_client import get_json_data
 from constants.config import config
-from constants.logger import logger
+from util.dashboard import update_dashboard
 from util.disc import get_channel, get_guild, loop_error_catcher
 from util.formatting import format_change
+from util.scheduler import LIGHT, scheduled
 
 text_to_emoji = defaultdict(lambda: "🦆", {"bear": "🐻", "bull": "🐂", "neutral": "🦆"})
 
@@ -43,7 +43,7 @@ class Overview(commands.Cog):
         else:
             self.do_crypto = False
 
-    @loop(minutes=5)
+    @scheduled(minutes=5, cost=LIGHT)
     @loop_error_catcher
     async def global_overview(self):
         if util.vars.tweets_db.empty:
@@ -75,7 +75,7 @@ class Overview(commands.Cog):
                     if global_mentions is not None:
                         self.global_crypto[ticker] = await count_tweets(ticker)
 
-    @loop(minutes=5)
+    @scheduled(minutes=5, cost=LIGHT)
     async def crypto_overview(self):
         if self.crypto_channel is None:
             self.crypto_channel = await get_channel(
@@ -86,7 +86,7 @@ class Overview(commands.Cog):
 
         await self.make_overview("crypto")
 
-    @loop(minutes=5)
+    @scheduled(minutes=5, cost=LIGHT)
     async def stocks_overview(self):
         if self.stocks_channel is None:
             self.stocks_channel = await get_channel(
@@ -178,18 +178,9 @@ class Overview(commands.Cog):
         )
 
         if category == "crypto":
-            # Delete previous message
-            try:
-                await self.crypto_channel.purge(limit=1)
-            except discord.errors.NotFound:
-                logger.warn("Could not delete previous crypto overview message.")
-            await self.crypto_channel.send(embed=e)
+            await update_dashboard(self.crypto_channel, "overview", embed=e)
         else:
-            try:
-                await self.stocks_channel.purge(limit=1)
-            except discord.errors.NotFound:
-                logger.warn("Could not delete previous stock overview message.")
-            await self.stocks_channel.send(embed=e)
+            await update_dashboard(self.stocks_channel, "overview", embed=e)
 
 
 def setup(bot: commands.Bot) -> None:
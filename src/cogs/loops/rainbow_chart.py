@@ -1,14 +1,16 @@
 import datetime
+import json
 import os
 from datetime import timedelta
+from io import BytesIO
 
 import discord
 import matplotlib.dates as mdates
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from discord.ext import commands
-from discord.ext.tasks import loop
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
 from matplotlib.ticker import FuncFormatter
 from scipy.optimize import curve_fit
 
@@ -16,7 +18,10 @@ from api.ccxt import fetch_data
 from constants.config import config
 from constants.logger import logger
 from constants.sources import data_sources
+from util.dashboard import update_dashboard
 from util.disc import get_channel, loop_error_catcher
+from util.render import figure_to_png, render_cache
+from util.scheduler import RENDER, scheduled
 
 # Define constants
 COLORS_LABELS = {
@@ -35,6 +40,12 @@ NUM_BANDS = 9
 FIGURE_SIZE = (15, 7)
 BACKGROUND_COLOR = "#0d1117"
 EXTEND_MONTHS = 9
+BTC_DATA = "data/bitcoin_data.csv"
+RAINBOW_FIT = "data/rainbow_fit.json"
+
+# The daily prices and the last fit, kept in memory between the runs
+btc_data = None
+fit = None
 
 
 class Rainbow_chart(commands.Cog):
@@ -48,7 +59,7 @@ class Rainbow_chart(commands.Cog):
         self.channel = None
         self.post_rainbow_chart.start()
 
-    @loop(hours=24)
+    @scheduled(hours=24, cost=RENDER)
     @loop_error_catcher
     async def post_rainbow_chart(self):
         if self.channel is None:
@@ -56,17 +67,19 @@ class Rainbow_chart(commands.Cog):
                 self.bot, config["LOOPS"]["RAINBOW_CHART"]["CHANNEL"]
             )
         # Load data
-        raw_data, popt = get_data("data/bitcoin_data.csv")
+        raw_data, popt = await get_data()
 
         # Create plot
-        create_plot(raw_data, popt)
+        png = await render_cache.render(
+            "rainbow_chart",
+            create_plot,
+            raw_data,
+            popt,
+            dpi=config["LOOPS"]["RAINBOW_CHART"].get("DPI", 300),
+        )
 
         # Save plot
         file_name = "rainbow_chart.png"
-        file_path = os.path.join("temp", file_name)
-        plt.savefig(file_path, bbox_inches="tight", dpi=300)
-        plt.cla()
-        plt.close()
 
         e = discord.Embed(
             title="Bitcoin Rainbow Price Chart",
@@ -75,18 +88,14 @@ class Rainbow_chart(commands.Cog):
             timestamp=datetime.datetime.now(datetime.timezone.utc),
             url="https://www.coinglass.com/pro/i/bitcoin-rainbow-chart",
         )
-        file = discord.File(file_path, filename=file_name)
+        file = discord.File(BytesIO(png), filename=file_name)
         e.set_image(url=f"attachment://{file_name}")
         e.set_footer(
             text="\u200b",
             icon_url=data_sources["coinglass"]["icon"],
         )
 
-        await self.channel.purge(limit=1)
-        await self.channel.send(file=file, embed=e)
-
-        # Delete temp file
-        os.remove(file_path)
+        await update_dashboard(self.channel, "rainbow_chart", embed=e, file=file)
 
 
 def log_func(x, a, b, c):
@@ -94,53 +103,101 @@ def log_func(x, a, b, c):
     return a * np.log(b + x) + c
 
 
-def get_data(file_path):
+async def get_data(file_path: str = BTC_DATA):
     """
-    Load and preprocess data from a CSV file.
+    Load the daily BTC prices and fit the logarithmic curve.
+    The prices are kept in memory and only the missing days are fetched and appended to the CSV file.
 
     Args:
         file_path (str): Path to the CSV file.
 
     Returns:
         pd.DataFrame: Processed data.
-        np.ndarray: Fitted Y data.
+        np.ndarray: Parameters of the fitted logarithmic curve.
     """
-    raw_data = pd.read_csv(file_path)
-    raw_data["Date"] = pd.to_datetime(raw_data["Date"])
+    global btc_data
+
+    if btc_data is None:
+        btc_data = pd.read_csv(file_path, parse_dates=["Date"])
 
     # Calculate the difference in days between the last date and today
-    diff_days = (pd.Timestamp.today() - raw_data["Date"].max()).days
+    today = pd.Timestamp.today().normalize()
+    last_date = btc_data["Date"].max()
+    diff_days = (today - last_date).days
 
     if diff_days > 1:
-        # logger.info(f"Rainbow chart data is {diff_days} days old. Fetching new price data from Binance ...")
-
-        # Get new data
-        # raw_data = pd.DataFrame(nasdaqdatalink.get("BCHAIN/MKPRU")).reset_index()
-        new_data = fetch_data(
-            since=raw_data["Date"].max(), limit=diff_days, exchange="binance"
+        logger.debug(
+            f"Rainbow chart data is {diff_days} days old. Fetching new price data from Binance ..."
+        )
+        new_data = await fetch_data(
+            since=last_date + timedelta(days=1), limit=diff_days, exchange="binance"
         )
 
-        # Append new data to the existing data
-        raw_data = pd.concat([raw_data, new_data])
+        # Only store the days that are closed, today is fetched again tomorrow
+        new_data = new_data[(new_data["Date"] > last_date) & (new_data["Date"] < today)]
+
+        if not new_data.empty:
+            btc_data = pd.concat([btc_data, new_data], ignore_index=True)
+            new_data.to_csv(
+                file_path, mode="a", header=False, index=False, date_format="%Y-%m-%d"
+            )
+
+    raw_data = btc_data[btc_data["Value"] > 0]
+
+    return raw_data, fit_curve(raw_data)
+
+
+def fit_curve(raw_data, file_path=RAINBOW_FIT):
+    """
+    Fit the logarithmic curve to the prices, starting from the previous fit.
+    The curve barely changes from one day to the next, so it converges in a few iterations.
+
+    Args:
+        raw_data (pd.DataFrame): Processed data.
+        file_path (str): Path to the JSON file with the previous fit.
 
-        # Save new data
-        raw_data.to_csv(file_path, index=False)
+    Returns:
+        np.ndarray: Parameters of the fitted logarithmic curve.
+    """
+    global fit
 
-    raw_data = raw_data[raw_data["Value"] > 0]
+    if fit is None and os.path.isfile(file_path):
+        with open(file_path, "r") as f:
+            fit = json.load(f)
+
+    # No new prices since the last fit
+    if fit is not None and fit["rows"] == len(raw_data):
+        return np.array(fit["popt"])
 
     # Prepare data for curve fitting
-    xdata = np.array([x + 1 for x in range(len(raw_data))])
-    ydata = np.log(raw_data["Value"])
+    xdata = np.arange(1, len(raw_data) + 1)
+    ydata = np.log(raw_data["Value"].to_numpy())
 
     # Fit the logarithmic curve
-    popt, _ = curve_fit(log_func, xdata, ydata)
+    popt, _ = curve_fit(log_func, xdata, ydata, p0=None if fit is None else fit["popt"])
+
+    fit = {"rows": len(raw_data), "popt": popt.tolist()}
+    with open(file_path, "w") as f:
+        json.dump(fit, f)
 
-    return raw_data, popt
+    return popt
 
 
-def create_plot(raw_data, popt):
+def create_plot(raw_data, popt, dpi=300) -> bytes:
+    """
+    Draws the rainbow chart, this is executed by the render pool.
+
+    Args:
+        raw_data (pd.DataFrame): Processed data.
+        popt (np.ndarray): Parameters of the fitted logarithmic curve.
+        dpi (int): Resolution of the image.
+
+    Returns:
+        bytes: The chart as PNG.
+    """
     # Create plot
-    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+    fig = Figure(figsize=FIGURE_SIZE)
+    ax = fig.subplots()
     fig.patch.set_facecolor(BACKGROUND_COLOR)
     ax.set_facecolor(BACKGROUND_COLOR)
 
@@ -156,6 +213,8 @@ def create_plot(raw_data, popt):
 
     add_legend(ax)
 
+    return figure_to_png(fig, dpi)
+
 
 def add_halving_lines(ax):
     """Add vertical lines for Bitcoin halving events."""
@@ -215,7 +274,7 @@ def plot_rainbow(ax, raw_data, popt, num_bands=NUM_BANDS, band_width=BAND_WIDTH)
             extended_dates, lower_bound, upper_bound, alpha=1, color=color, label=label
         )
         legend_handles.append(
-            plt.Line2D([0], [0], color=color, lw=4, label=label)
+            Line2D([0], [0], color=color, lw=4, label=label)
         )  # Changed to Line2D
     return legend_handles
 
@@ -278,13 +337,13 @@ def configure_plot(ax, raw_data):
     ax.xaxis.set_major_formatter(mdates.DateFormatter("%Y"))
 
     # Rotate and align the tick labels for better readability
-    plt.setp(ax.get_xticklabels(), rotation=0)
+    ax.tick_params(axis="x", labelrotation=0)
 
 
 def add_legend(ax):
     # Create custom legend handles with square markers, including BTC price
     legend_handles = [
-        plt.Line2D(
+        Line2D(
             [0],
             [0],
             marker="s",
@@ -294,7 +353,7 @@ def add_legend(ax):
             label="BTC price",
         )
     ] + [
-        plt.Line2D(
+        Line2D(
             [0],
             [0],
             marker="s",
@@ -324,7 +383,7 @@ def add_legend(ax):
         text.set_fontweight("bold")
 
     # Adjust layout to reduce empty space around the plot
-    plt.subplots_adjust(left=0.05, right=0.975, top=0.875, bottom=0.1)
+    ax.figure.subplots_adjust(left=0.05, right=0.975, top=0.875, bottom=0.1)
 
 
 def setup(bot: commands.Bot) -> None:
@@ -4,13 +4,14 @@ from datetime import datetime
 import asyncpraw
 from discord import Embed
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 from api.reddit import reddit_scraper
 from constants.config import config
 from constants.logger import logger
 from constants.sources import data_sources
 from util.disc import get_channel, get_webhook, loop_error_catcher
+from util.message_cache import message_cache
+from util.scheduler import NETWORK, scheduled
 
 
 class Reddit(commands.Cog):
@@ -81,7 +82,7 @@ class Reddit(commands.Cog):
         )
         await self.send_posts(posts, subreddit_name)
 
-    @loop(hours=12)
+    @scheduled(hours=12, cost=NETWORK)
     @loop_error_catcher
     async def wsb_scraper(self):
         """
@@ -89,7 +90,7 @@ class Reddit(commands.Cog):
         """
         await self.scrape_and_send_posts("WallStreetBets")
 
-    @loop(hours=12)
+    @scheduled(hours=12, cost=NETWORK)
     @loop_error_catcher
     async def cms_scraper(self):
         """
@@ -132,14 +133,16 @@ class Reddit(commands.Cog):
                 Embed(url=embed.url).set_image(url=img) for img in img_urls[1:10]
             ]
             webhook = await get_webhook(channel)
-            await webhook.send(
+            msg = await webhook.send(
                 embeds=image_embeds,
                 username="FinTwit",
                 wait=True,
                 avatar_url=self.bot.user.avatar.url,
             )
         else:
-            await channel.send(embed=embed)
+            msg = await channel.send(embed=embed)
+
+        message_cache.add(msg)
 
 
 def create_embed(submission, title: str, descr: str, img_urls: list) -> Embed:
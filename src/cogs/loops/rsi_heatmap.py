@@ -1,21 +1,33 @@
+import asyncio
 import datetime
 import os
+import sqlite3
+import time
+from io import BytesIO
 
 import discord
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from discord.ext import commands
-from discord.ext.tasks import loop
-from tradingview_ta import get_multiple_analysis
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
 
 from api.coingecko import get_top_vol_coins
 from constants.config import config
 from constants.logger import logger
 from constants.sources import data_sources
+from util.dashboard import update_dashboard
 from util.disc import get_channel, loop_error_catcher
+from util.indicators import indicator_engine
+from util.render import figure_to_png, render
+from util.scheduler import RENDER, scheduled
 
 FIGURE_SIZE = (12, 10)
+RSI_DB = "data/rsi_data.db"
+# The snapshots used to be appended to this file, they are imported once
+RSI_CSV = "data/rsi_data.csv"
+RSI_RETENTION_DAYS = 30
 BACKGROUND_COLOR = "#0d1117"
 RANGES = {
     "Overbought": (70, 100),
@@ -51,7 +63,11 @@ class RSI_heatmap(commands.Cog):
         self.channel = None
         self.post_rsi_heatmap.start()
 
-    @loop(hours=24)
+    def cog_unload(self) -> None:
+        self.post_rsi_heatmap.cancel()
+        asyncio.create_task(indicator_engine.close())
+
+    @scheduled(hours=24, cost=RENDER)
     @loop_error_catcher
     async def post_rsi_heatmap(self) -> None:
         # Get the channel
@@ -60,7 +76,15 @@ class RSI_heatmap(commands.Cog):
                 self.bot, config["LOOPS"]["RSI_HEATMAP"]["CHANNEL"]
             )
 
-        await plot_rsi_heatmap()
+        rsi_data, old_rsi_data = await get_rsi_heatmap_data(
+            time_frame=config["LOOPS"]["RSI_HEATMAP"].get("TIME_FRAME", "1d")
+        )
+        png = await render(
+            plot_rsi_heatmap,
+            rsi_data,
+            old_rsi_data,
+            dpi=config["LOOPS"]["RSI_HEATMAP"].get("DPI", 300),
+        )
 
         e = discord.Embed(
             title="Crypto Market RSI Heatmap",
@@ -71,18 +95,14 @@ class RSI_heatmap(commands.Cog):
         )
 
         file_name = "rsi_heatmap.png"
-        file_path = os.path.join("temp", file_name)
-        file = discord.File(file_path, filename=file_name)
+        file = discord.File(BytesIO(png), filename=file_name)
         e.set_image(url=f"attachment://{file_name}")
         e.set_footer(
             text="\u200b",
             icon_url=data_sources["coinglass"]["icon"],
         )
 
-        await self.channel.purge(limit=1)
-        await self.channel.send(file=file, embed=e)
-
-        os.remove(file_path)
+        await update_dashboard(self.channel, "rsi_heatmap", embed=e, file=file)
 
 
 def get_color_for_rsi(rsi_value: float) -> dict:
@@ -92,13 +112,29 @@ def get_color_for_rsi(rsi_value: float) -> dict:
     return None
 
 
-async def plot_rsi_heatmap(num_coins: int = 100, time_frame: str = "1d") -> None:
+async def get_rsi_heatmap_data(
+    num_coins: int = 100, time_frame: str = "1d"
+) -> tuple[dict, dict]:
+    """
+    Returns the current RSI of the top volume coins and their RSI of 24 hours ago.
+    The RSI is calculated locally for every timeframe, so a snapshot of each is stored.
+    """
     top_vol = await get_top_vol_coins(num_coins)
-    rsi_data = get_RSI(top_vol, time_frame=time_frame)
-    old_rsi_data = get_closest_to_24h(time_frame=time_frame)
+    await indicator_engine.update(top_vol)
+
+    for frame in indicator_engine.timeframes:
+        await asyncio.to_thread(save_RSI, get_RSI(top_vol, frame), frame)
+
+    rsi_data = get_RSI(top_vol, time_frame)
+    old_rsi_data = await asyncio.to_thread(get_closest_to_24h, time_frame)
 
-    # Drop entries where the RSI is None
-    rsi_data = {k: v for k, v in rsi_data.items() if v is not None}
+    return rsi_data, old_rsi_data
+
+
+def plot_rsi_heatmap(rsi_data: dict, old_rsi_data: dict, dpi: int = 300) -> bytes:
+    """
+    Draws the RSI heatmap, this is executed by the render pool.
+    """
 
     # Create lists of labels and RSI values
     rsi_symbols = list(rsi_data.keys())
@@ -108,7 +144,8 @@ async def plot_rsi_heatmap(num_coins: int = 100, time_frame: str = "1d") -> None
     average_rsi = np.mean(rsi_values)
 
     # Create the scatter plot
-    fig, ax = plt.subplots(figsize=FIGURE_SIZE)
+    fig = Figure(figsize=FIGURE_SIZE)
+    ax = fig.subplots()
 
     # Set the background color
     fig.patch.set_facecolor(BACKGROUND_COLOR)
@@ -210,7 +247,7 @@ async def plot_rsi_heatmap(num_coins: int = 100, time_frame: str = "1d") -> None
         spine.set_edgecolor(BACKGROUND_COLOR)
 
     # Add the title in the top left corner
-    plt.text(
+    ax.text(
         -0.025,
         1.125,
         "Crypto Market RSI Heatmap",
@@ -222,20 +259,16 @@ async def plot_rsi_heatmap(num_coins: int = 100, time_frame: str = "1d") -> None
         weight="bold",
     )
 
-    file_name = "rsi_heatmap.png"
-    file_path = os.path.join("temp", file_name)
-    plt.savefig(file_path, bbox_inches="tight", dpi=300)
-    plt.cla()
-    plt.close()
+    return figure_to_png(fig, dpi)
 
 
-def add_legend(ax: plt.Axes) -> None:
+def add_legend(ax: Axes) -> None:
     # Create custom legend handles with square markers, including BTC price
     adjusted_colors = list(COLORS_LABELS.values())
     # Change NEUTRAL color to grey
     adjusted_colors[2] = "#808080"
     legend_handles = [
-        plt.Line2D(
+        Line2D(
             [0],
             [0],
             marker="s",
@@ -266,83 +299,135 @@ def add_legend(ax: plt.Axes) -> None:
         text.set_fontweight("bold")
 
     # Adjust layout to reduce empty space around the plot
-    plt.subplots_adjust(left=0.05, right=0.95, top=0.875, bottom=0.1)
-
-
-def get_RSI(coins: list, exchange: str = "BINANCE", time_frame: str = "1d") -> dict:
-    # Format symbols exchange:symbol
-    symbols = [f"{exchange.upper()}:{symbol}" for symbol in coins]
-
-    analysis = get_multiple_analysis(
-        symbols=symbols, interval=time_frame, screener="crypto"
-    )
-
-    # For each symbol get the RSI
-    rsi_dict = {}
-    for symbol in symbols:
-        if analysis[symbol] is None:
-            continue
-        clean_symbol = symbol.replace(f"{exchange.upper()}:", "")
-        clean_symbol = clean_symbol.replace("USDT", "")
-        rsi_dict[clean_symbol] = analysis[symbol].indicators["RSI"]
-
-    # Save the RSI data to a CSV file
-    save_RSI(rsi_dict, time_frame)
-
-    return rsi_dict
-
-
-def get_closest_to_24h(
-    file_path: str = "data/rsi_data.csv", time_frame: str = "1d"
-) -> dict:
-    # Read the CSV file into a DataFrame
-    if not os.path.isfile(file_path):
-        logger.error(f"No data found in {file_path}")
-        return {}
-
-    df = pd.read_csv(file_path)
-
-    # Filter on the timeframe
-    df = df[df["Time Frame"] == time_frame]
-
-    # Convert the 'Date' column to datetime
-    df["Date"] = pd.to_datetime(df["Date"])
+    ax.figure.subplots_adjust(left=0.05, right=0.95, top=0.875, bottom=0.1)
+
+
+def connect_rsi_db() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(RSI_DB), exist_ok=True)
+    cnx = sqlite3.connect(RSI_DB)
+    new = not cnx.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rsi'"
+    ).fetchone()
+    # The primary key is also the index for the lookups by time frame and date
+    cnx.execute("""
+        CREATE TABLE IF NOT EXISTS rsi (
+            time_frame TEXT,
+            date INTEGER,
+            symbol TEXT,
+            rsi REAL,
+            PRIMARY KEY (time_frame, date, symbol)
+        )
+        """)
 
-    # Calculate the time difference from 24 hours ago
-    target_time = datetime.datetime.now() - datetime.timedelta(hours=24)
-    df["Time_Diff"] = abs(df["Date"] - target_time)
+    if new and os.path.isfile(RSI_CSV):
+        import_csv(cnx)
+    return cnx
 
-    # Find the minimum time difference
-    min_time_diff = df["Time_Diff"].min()
 
-    # Filter rows that have the minimum time difference
-    closest_rows = df[df["Time_Diff"] == min_time_diff]
+def import_csv(cnx: sqlite3.Connection) -> None:
+    """
+    Imports the snapshots of the old CSV file, so the first 24h comparison has history.
+    """
+    try:
+        df = pd.read_csv(RSI_CSV)
+        # The dates were saved in local time
+        df["Date"] = pd.to_datetime(df["Date"]).map(
+            lambda date: int(date.to_pydatetime().timestamp())
+        )
+        with cnx:
+            cnx.executemany(
+                "INSERT OR REPLACE INTO rsi VALUES (?, ?, ?, ?)",
+                df[["Time Frame", "Date", "Symbol", "RSI"]].itertuples(index=False),
+            )
+        logger.info(f"Imported {len(df)} RSI values from {RSI_CSV}")
+    except Exception as e:
+        logger.error(f"Error importing {RSI_CSV}: {e}")
 
-    # Convert the filtered rows to a dictionary with symbols as keys and RSI as values
-    result = closest_rows.set_index("Symbol")["RSI"].to_dict()
 
-    return result
+def get_RSI(coins: list, time_frame: str = "1d") -> dict:
+    """
+    Returns the RSI of the coins from the local indicator engine, without any requests.
+
+    Parameters
+    ----------
+    coins : list
+        The symbols of the coins, i.e. 'BTCUSDT'.
+    time_frame : str, optional
+        The time frame of the RSI, by default "1d".
+
+    Returns
+    -------
+    dict
+        The RSI per coin, without the USDT suffix. Coins without enough candles are left out.
+    """
+    rsi = indicator_engine.oscillators(time_frame)["rsi"].dropna()
 
+    return {
+        symbol.replace("USDT", ""): rsi[symbol] for symbol in coins if symbol in rsi
+    }
 
-def save_RSI(
-    rsi_dict: dict, time_frame: str, file_path: str = "data/rsi_data.csv"
-) -> None:
-    # Convert the RSI dictionary to a DataFrame
-    df = pd.DataFrame(list(rsi_dict.items()), columns=["Symbol", "RSI"])
 
-    # Add the current date to the DataFrame
-    df["Date"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    df["Time Frame"] = time_frame
+def get_closest_to_24h(time_frame: str = "1d") -> dict:
+    """
+    Returns the stored RSI values of the snapshot that is closest to 24 hours ago.
+    The nearest snapshot before and after that time are both found with the index.
+
+    Parameters
+    ----------
+    time_frame : str, optional
+        The time frame of the RSI, by default "1d".
+
+    Returns
+    -------
+    dict
+        The RSI per symbol, empty if there are no snapshots.
+    """
+    target = int(time.time()) - 24 * 60 * 60
+
+    with connect_rsi_db() as cnx:
+        before = cnx.execute(
+            "SELECT MAX(date) FROM rsi WHERE time_frame = ? AND date <= ?",
+            (time_frame, target),
+        ).fetchone()[0]
+        after = cnx.execute(
+            "SELECT MIN(date) FROM rsi WHERE time_frame = ? AND date >= ?",
+            (time_frame, target),
+        ).fetchone()[0]
+
+        dates = [date for date in (before, after) if date is not None]
+        rows = []
+        if dates:
+            closest = min(dates, key=lambda date: abs(date - target))
+            rows = cnx.execute(
+                "SELECT symbol, rsi FROM rsi WHERE time_frame = ? AND date = ?",
+                (time_frame, closest),
+            ).fetchall()
+    cnx.close()
+
+    if not rows:
+        logger.error(f"No RSI data found for time frame {time_frame}")
+
+    return dict(rows)
+
+
+def save_RSI(rsi_dict: dict, time_frame: str) -> None:
+    """
+    Stores a snapshot of the RSI values and removes the snapshots older than the retention.
+    """
+    now = int(time.time())
 
-    # Check if the file exists
-    if os.path.isfile(file_path):
-        # Append data to the existing CSV file
-        df.to_csv(file_path, mode="a", header=False, index=False)
-    else:
-        # Save the DataFrame to a new CSV file with header
-        df.to_csv(file_path, index=False)
+    with connect_rsi_db() as cnx:
+        cnx.executemany(
+            "INSERT OR REPLACE INTO rsi VALUES (?, ?, ?, ?)",
+            [(time_frame, now, symbol, rsi) for symbol, rsi in rsi_dict.items()],
+        )
+        cnx.execute(
+            "DELETE FROM rsi WHERE time_frame = ? AND date < ?",
+            (time_frame, now - RSI_RETENTION_DAYS * 24 * 60 * 60),
+        )
+    cnx.close()
 
-    logger.debug(f"RSI data saved to {file_path}")
+    logger.debug(f"RSI data saved to {RSI_DB}")
 
 
 def setup(bot: commands.Bot) -> None:
@@ -1,17 +1,20 @@
 import datetime
-import os
+from io import BytesIO
 
 import discord
 import matplotlib.colors as mcolors
-import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
 from discord.ext import commands
-from discord.ext.tasks import loop
+from matplotlib.figure import Figure
 
 from api.barchart import get_data
 from constants.config import config
 from constants.sources import data_sources
+from util.dashboard import update_dashboard
 from util.disc import get_channel, loop_error_catcher
+from util.render import figure_to_png, render_cache
+from util.scheduler import RENDER, scheduled
 
 
 class Sector_snapshot(commands.Cog):
@@ -25,7 +28,7 @@ class Sector_snapshot(commands.Cog):
         self.channel = None
         self.post_snapshot.start()
 
-    @loop(hours=12)
+    @scheduled(hours=12, cost=RENDER)
     @loop_error_catcher
     async def post_snapshot(self):
         if self.channel is None:
@@ -36,14 +39,15 @@ class Sector_snapshot(commands.Cog):
             )
 
         df = await get_data()
-        plot_data(df)
+        png = await render_cache.render(
+            "sector_snapshot",
+            plot_data,
+            df,
+            dpi=config["LOOPS"]["SECTOR_SNAPSHOT"].get("DPI", 300),
+        )
 
         # Save plot
         file_name = "sector_snap.png"
-        file_path = os.path.join("temp", file_name)
-        plt.savefig(file_path, bbox_inches="tight", dpi=300)
-        plt.cla()
-        plt.close()
 
         e = discord.Embed(
             title="Percentage Of Large Cap Stocks Above Their Moving Averages",
@@ -52,21 +56,20 @@ class Sector_snapshot(commands.Cog):
             timestamp=datetime.datetime.now(datetime.timezone.utc),
             url="https://www.barchart.com/stocks/market-performance",
         )
-        file = discord.File(file_path, filename=file_name)
+        file = discord.File(BytesIO(png), filename=file_name)
         e.set_image(url=f"attachment://{file_name}")
         e.set_footer(
             text="\u200b",
             icon_url=data_sources["barchart"]["icon"],
         )
 
-        await self.channel.purge(limit=1)
-        await self.channel.send(file=file, embed=e)
-
-        # Delete temp file
-        os.remove(file_path)
+        await update_dashboard(self.channel, "sector_snapshot", embed=e, file=file)
 
 
-def plot_data(df):
+def plot_data(df: pd.DataFrame, dpi: int = 300) -> bytes:
+    """
+    Draws the sector snapshot table, this is executed by the render pool.
+    """
     # Define custom colormap for each 10% increment
     colors = [
         (0, "#620101"),  # 0%
@@ -86,7 +89,7 @@ def plot_data(df):
     cmap = mcolors.LinearSegmentedColormap.from_list("custom_cmap", colors)
 
     # Normalize data to [0, 1] for color mapping
-    norm = plt.Normalize(0, 100)
+    norm = mcolors.Normalize(0, 100)
 
     # Apply custom colormap
     values = df.drop(columns="Name").values
@@ -99,7 +102,8 @@ def plot_data(df):
     colors = np.concatenate((name_colors, colors), axis=1)
 
     # Create the table
-    fig, ax = plt.subplots(figsize=(14, 6))
+    fig = Figure(figsize=(14, 6))
+    ax = fig.subplots()
 
     # Set the background color of the figure
     fig.patch.set_facecolor("#2e2e2e")
@@ -141,7 +145,7 @@ def plot_data(df):
     table.auto_set_font_size(False)
 
     # Add the title in the top left corner
-    plt.text(
+    ax.text(
         0.04,
         1.05,
         "Percentage Of Large Cap Stocks Above Their Moving Averages",
@@ -153,6 +157,8 @@ def plot_data(df):
         weight="bold",
     )
 
+    return figure_to_png(fig, dpi)
+
 
 def setup(bot: commands.Bot) -> None:
     bot.add_cog(Sector_snapshot(bot))
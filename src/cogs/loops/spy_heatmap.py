@@ -1,17 +1,21 @@
 import datetime
-import os
+from io import BytesIO
 
 import discord
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 from api.unusualwhales import get_spy_heatmap
 from constants.config import config
 from constants.sources import data_sources
 from util.afterhours import afterHours
+from util.dashboard import update_dashboard
 from util.disc import get_channel, loop_error_catcher
+from util.render import render_plotly
+from util.scheduler import RENDER, scheduled
+from util.treemap import treemap_figure
 
 
 class SPY_heatmap(commands.Cog):
@@ -25,7 +29,7 @@ class SPY_heatmap(commands.Cog):
         self.channel = None
         self.post_heatmap.start()
 
-    @loop(hours=2)
+    @scheduled(hours=2, cost=RENDER)
     @loop_error_catcher
     async def post_heatmap(self):
         if afterHours():
@@ -39,7 +43,11 @@ class SPY_heatmap(commands.Cog):
             )
 
         df = await get_spy_heatmap()
-        create_treemap(df)
+        png = await render_plotly(
+            create_treemap,
+            df,
+            tolerance=config["LOOPS"]["SPY_HEATMAP"].get("LAYOUT_TOLERANCE", 0),
+        )
 
         e = discord.Embed(
             title="The S&P 500 Heatmap",
@@ -50,32 +58,50 @@ class SPY_heatmap(commands.Cog):
         )
 
         file_name = "spy_heatmap.png"
-        file_path = os.path.join("temp", file_name)
-        file = discord.File(file_path, filename=file_name)
+        file = discord.File(BytesIO(png), filename=file_name)
         e.set_image(url=f"attachment://{file_name}")
         e.set_footer(
             text="\u200b",
             icon_url=data_sources["unusualwhales"]["icon"],
         )
 
-        await self.channel.purge(limit=1)
-        await self.channel.send(file=file, embed=e)
-
-        # Delete temp file
-        os.remove(file_path)
+        await update_dashboard(self.channel, "spy_heatmap", embed=e, file=file)
 
 
-def create_treemap(df: pd.DataFrame, save_img: bool = True) -> None:
+def create_treemap(df: pd.DataFrame, tolerance: float = 0) -> bytes:
     """
-    Creates a treemap of the S&P 500 heatmap data.
+    Creates a treemap of the S&P 500 heatmap data, this is executed by the plotly render worker.
 
     Parameters
     ----------
     df : pd.DataFrame
         The input DataFrame containing the S&P 500 heatmap data.
-    save_img : bool, optional
-        Saves the heatmap as a image, by default False
+    tolerance : float, optional
+        The maximum change in market cap to only update the colors of the previous treemap,
+        by default 0 which always builds a new treemap.
+
+    Returns
+    -------
+    bytes
+        The treemap as PNG.
     """
+    fig = treemap_figure(
+        "spy_heatmap",
+        df,
+        build_treemap,
+        path=[px.Constant("Sectors"), "sector", "industry", "ticker"],
+        values="marketcap",
+        color="percentage_change",
+        # The hover data, followed by the color
+        columns=["percentage_change", "ticker", "marketcap", "percentage_change"],
+        tolerance=tolerance,
+    )
+
+    # Increase the width and height for better quality
+    return fig.to_image(format="png", width=1920, height=1080)
+
+
+def build_treemap(df: pd.DataFrame) -> go.Figure:
 
     # Custom color scale
     color_scale = [
@@ -117,12 +143,7 @@ def create_treemap(df: pd.DataFrame, save_img: bool = True) -> None:
     # Disable the color bar
     fig.update(layout_coloraxis_showscale=False)
 
-    # Save the figure as an image
-    # Increase the width and height for better quality
-    if save_img:
-        fig.write_image(
-            file="temp/spy_heatmap.png", format="png", width=1920, height=1080
-        )
+    return fig
 
 
 def setup(bot: commands.Bot) -> None:
@@ -2,13 +2,14 @@ import datetime
 
 import discord
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 from api.nasdaq import get_halt_data
 from constants.config import config
 from constants.sources import data_sources
 from util.afterhours import afterHours
+from util.dashboard import update_dashboard
 from util.disc import get_channel, get_tagged_users, loop_error_catcher
+from util.scheduler import NETWORK, scheduled
 
 
 class StockHalts(commands.Cog):
@@ -22,7 +23,7 @@ class StockHalts(commands.Cog):
         self.channel = None
         self.halt_embed.start()
 
-    @loop(minutes=15)
+    @scheduled(minutes=15, cost=NETWORK, priority=0)
     @loop_error_catcher
     async def halt_embed(self):
         # Dont send if the market is closed
@@ -38,9 +39,6 @@ class StockHalts(commands.Cog):
         if df.empty:
             return
 
-        # Remove previous message first
-        await self.channel.purge(limit=1)
-
         # Create embed
         e = discord.Embed(
             title="Halted Stocks",
@@ -67,9 +65,17 @@ class StockHalts(commands.Cog):
             icon_url=data_sources["nasdaqtrader"]["icon"],
         )
 
-        tags = get_tagged_users(df["Issue Symbol"].to_list())
+        symbols = df["Issue Symbol"].to_list()
+        tags = get_tagged_users(symbols)
 
-        await self.channel.send(content=tags, embed=e)
+        # Send a new message if other users need to be tagged, edits do not notify them
+        await update_dashboard(
+            self.channel,
+            "halts",
+            embed=e,
+            content=tags,
+            notify=f"{sorted(tags.split())} {sorted(symbols)}" if tags else None,
+        )
 
 
 def setup(bot: commands.Bot) -> None:
@@ -2,12 +2,12 @@ import datetime
 
 import discord
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 from api.stocktwits import get_data
 from constants.config import config
 from constants.sources import data_sources
 from util.disc import get_channel, loop_error_catcher
+from util.scheduler import NETWORK, scheduled
 
 
 class StockTwits(commands.Cog):
@@ -21,7 +21,7 @@ class StockTwits(commands.Cog):
         self.channel = None
         self.stocktwits.start()
 
-    @loop(hours=6)
+    @scheduled(hours=6, cost=NETWORK)
     @loop_error_catcher
     async def stocktwits(self) -> None:
         """
@@ -8,7 +8,6 @@ from typing import List, Optional
 import aiohttp
 import discord
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 from api.timeline import get_tweet
 from api.twitter import parse_tweet
@@ -16,6 +15,8 @@ from constants.config import config
 from constants.logger import logger
 from models.chart import classify_img
 from util.disc import get_channel, get_tagged_users, get_webhook, loop_error_catcher
+from util.message_cache import message_cache
+from util.scheduler import NETWORK, scheduled
 from util.tweet_embed import make_tweet_embed
 
 
@@ -88,7 +89,7 @@ class Timeline(commands.Cog):
             self.bot, config["LOOPS"]["TIMELINE"]["UNKNOWN_CHARTS"]
         )
 
-    @loop(hours=1)
+    @scheduled(hours=1, cost=NETWORK)
     @loop_error_catcher
     async def all_txt_channels(self) -> None:
         """Gets all the text channels as Discord object and the names of the channels."""
@@ -129,7 +130,7 @@ class Timeline(commands.Cog):
         self.text_channels = text_channel_list
         self.text_channel_names = text_channel_names
 
-    @loop(minutes=5)
+    @scheduled(minutes=5, cost=NETWORK, priority=0)
     @loop_error_catcher
     async def get_latest_tweet(self) -> None:
         """Fetches the latest tweets."""
@@ -352,6 +353,9 @@ class Timeline(commands.Cog):
             # Do this for every message
             try:
                 for msg in msgs:
+                    # Remember the message for the reaction listener
+                    message_cache.add(msg)
+
                     # Post in highlight channel
                     await msg.add_reaction("💸")
                     # Send to user DM
@@ -1,12 +1,15 @@
 ##> Imports
 import asyncio
+import datetime
+import random
 
 import ccxt.pro as ccxt
 
+# > Discord dependencies
+import discord
+
 # > 3rd Party Dependencies
 import pandas as pd
-
-# > Discord dependencies
 from discord.ext import commands
 
 import util.vars
@@ -14,122 +17,244 @@ import util.vars
 # Local dependencies
 from constants.config import config
 from constants.logger import logger
-from util.db import get_db, update_db
+from util.db import update_db
 from util.disc import get_channel, get_user, loop_error_catcher
+from util.scheduler import LIGHT, scheduled
 from util.trades_msg import on_msg
 
+# Reconnect backoff in seconds, doubled after every failed attempt
+BACKOFF_START = 5
+BACKOFF_MAX = 15 * 60
 
-class Trades(commands.Cog):
+
+class TradeStream:
     """
-    This class contains the cog for posting new trades done by users.
-    It can be enabled / disabled in the config under ["LOOPS"]["TRADES"].
+    Watches the trades of a single portfolio using one ccxt.pro client.
+    If the connection fails it is closed and reconnected with a jittered backoff.
     """
 
     def __init__(
-        self, bot: commands.Bot, db: pd.DataFrame = get_db("portfolio")
+        self, row: pd.Series, user: discord.User, channel: discord.TextChannel
     ) -> None:
-        self.bot = bot
-        self.trades_channel = None
-        # Start getting trades
-        asyncio.create_task(self.trades(db))
+        self.row = row
+        self.user = user
+        self.channel = channel
+        self.exchange = None
+        self.task = None
+
+        # Health statistics
+        self.status = "starting"
+        self.started = datetime.datetime.now(datetime.timezone.utc)
+        self.messages = 0
+        self.reconnects = 0
+        self.last_message = None
+        self.lag = None
+        self.last_error = None
+
+    def create_exchange(self) -> ccxt.Exchange:
+        exchange_info = {"apiKey": self.row["key"], "secret": self.row["secret"]}
+
+        if self.row["exchange"] == "binance":
+            exchange = ccxt.binance(exchange_info)
+            exchange.options["recvWindow"] = 60000
+        else:
+            exchange_info["password"] = self.row["passphrase"]
+            exchange = ccxt.kucoin(exchange_info)
+
+        return exchange
+
+    async def run(self) -> None:
+        """
+        Keeps the websocket of this portfolio alive, only an invalid API key stops it.
+        """
+        attempt = 0
 
-    async def start_sockets(self, exchange, row, user) -> None:
         while True:
+            self.exchange = self.create_exchange()
             try:
-                msg = await exchange.watchMyTrades()
-                await on_msg(msg, exchange, self.trades_channel, row, user)
-            except ccxt.base.errors.AuthenticationError:
-                # Send message to user and delete from database
-                logger.error(row)
-                break
+                # Make sure that the API keys are valid
+                await self.exchange.fetch_balance()
+                self.status = "connected"
+
+                while True:
+                    msg = await self.exchange.watchMyTrades()
+                    attempt = 0
+                    self.record(msg)
+
+                    # A failing message should not restart the connection
+                    try:
+                        await on_msg(
+                            msg, self.exchange, self.channel, self.row, self.user
+                        )
+                    except Exception as e:
+                        logger.error(
+                            f"Error handling trade of {self.row['user']} on {self.exchange.id}: {e}"
+                        )
+
+            except ccxt.AuthenticationError:
+                self.status = "invalid API key"
+                raise
 
             except Exception as e:
-                # Maybe do: await exchange.close() and restart the socket
+                self.status = "reconnecting"
+                self.last_error = str(e)
                 logger.error(
-                    f"Error in trade websocket for {row['user']} and {exchange.id}: {e}"
+                    f"Error in trade websocket for {self.row['user']} and {self.row['exchange']}: {e}"
                 )
 
+            finally:
+                await self.exchange.close()
+
+            delay = min(BACKOFF_MAX, BACKOFF_START * 2**attempt)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            attempt += 1
+            self.reconnects += 1
+
+    def record(self, msg: list) -> None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        self.messages += 1
+        self.last_message = now
+
+        # The lag between the trade and receiving it
+        timestamp = msg[-1].get("timestamp") if msg else None
+        if timestamp:
+            self.lag = now.timestamp() - timestamp / 1000
+
+    def health(self) -> dict:
+        """
+        Returns the health statistics of this stream.
+
+        Returns
+        -------
+        dict
+            The status, number of messages, messages per hour, reconnects,
+            seconds since the last message and the lag of the last trade in seconds.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        hours = max((now - self.started).total_seconds() / 3600, 1 / 60)
+
+        return {
+            "user": self.row["user"],
+            "exchange": self.row["exchange"],
+            "status": self.status,
+            "messages": self.messages,
+            "rate": round(self.messages / hours, 2),
+            "reconnects": self.reconnects,
+            "idle": (
+                None
+                if self.last_message is None
+                else round((now - self.last_message).total_seconds())
+            ),
+            "lag": None if self.lag is None else round(self.lag, 2),
+            "last_error": self.last_error,
+        }
+
+
+class Trades(commands.Cog):
+    """
+    This class contains the cog for posting new trades done by users.
+    It can be enabled / disabled in the config under ["LOOPS"]["TRADES"].
+    """
+
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+        self.trades_channel = None
+
+        # One stream per (exchange, api key)
+        self.streams = {}
+
+        # Start getting trades
+        asyncio.create_task(self.trades())
+        self.log_health.start()
+
+    def cog_unload(self) -> None:
+        self.log_health.cancel()
+        for stream in self.streams.values():
+            stream.task.cancel()
+
     @loop_error_catcher
-    async def trades(self, db: pd.DataFrame) -> None:
+    async def trades(self) -> None:
         """
         Starts the websockets for each user in the database.
+        """
+        for _, row in util.vars.portfolio_db.iterrows():
+            await self.add_stream(row)
+
+    async def add_stream(self, row: pd.Series) -> None:
+        """
+        Starts watching the trades of this portfolio, if it is not watched yet.
 
         Parameters
         ----------
-        db : pd.DataFrame
-            The database containing all users.
+        row : pd.Series
+            The row of the portfolio db.
         """
+        key = (row["exchange"], row["key"])
+        if key in self.streams or row["exchange"] not in ["binance", "kucoin"]:
+            return
+
         if self.trades_channel is None:
             self.trades_channel = await get_channel(
                 self.bot, config["LOOPS"]["TRADES"]["CHANNEL"]
             )
 
-        tasks = []
-        exchanges = []
+        user = await get_user(self.bot, row["id"])
+        stream = TradeStream(row, user, self.trades_channel)
+        stream.task = asyncio.create_task(self.supervise(key, stream))
+        self.streams[key] = stream
+        logger.info(f"Started {row['exchange']} socket for {row['user']}")
 
-        if not db.empty:
-            # Divide per exchange
-            binance = db.loc[db["exchange"] == "binance"]
-            kucoin = db.loc[db["exchange"] == "kucoin"]
+    async def remove_stream(self, row: pd.Series) -> None:
+        """
+        Stops watching the trades of this portfolio.
 
-            if not binance.empty:
-                for i, row in binance.iterrows():
-                    # If using await, it will block other connections
-                    exchange = ccxt.binance(
-                        {"apiKey": row["key"], "secret": row["secret"]}
-                    )
-                    user = await get_user(self.bot, row["id"])
+        Parameters
+        ----------
+        row : pd.Series
+            The row of the portfolio db.
+        """
+        stream = self.streams.pop((row["exchange"], row["key"]), None)
+        if stream is not None:
+            stream.task.cancel()
+            logger.info(f"Stopped {row['exchange']} socket for {row['user']}")
 
-                    # Make sure that the API keys are valid
-                    try:
-                        exchange.fetch_balance()
-                    except Exception:
-                        # Send message to user and delete from database
-                        await user.send(
-                            "Your Binance API key is invalid, we have removed it from our database."
-                        )
+    async def supervise(self, key: tuple, stream: TradeStream) -> None:
+        try:
+            await stream.run()
+        except ccxt.AuthenticationError:
+            row = stream.row
+            logger.warn(f"Invalid {row['exchange']} API key for {row['user']}")
 
-                        # Get the portfolio
-                        util.vars.portfolio_db.drop(i, inplace=True)
-
-                        update_db(util.vars.portfolio_db, "portfolio")
-
-                        logger.debug(f"Removed Binance API key for {row['user']}")
-
-                    task = asyncio.create_task(self.start_sockets(exchange, row, user))
-                    tasks.append(task)
-                    exchanges.append(exchange)
-                    logger.info(f"Started Binance socket for {row['user']}")
-
-            if not kucoin.empty:
-                for _, row in kucoin.iterrows():
-                    exchange = ccxt.kucoin(
-                        {
-                            "apiKey": row["key"],
-                            "secret": row["secret"],
-                            "password": row["passphrase"],
-                        }
-                    )
-                    task = asyncio.create_task(
-                        self.start_sockets(
-                            exchange, row, await get_user(self.bot, row["id"])
-                        )
-                    )
-                    tasks.append(task)
-                    exchanges.append(exchange)
-                    logger.debug(f"Started KuCoin socket for {row['user']}")
-
-        # After 24 hours close the exchange and start again
-        await asyncio.sleep(24 * 60 * 60)
-
-        logger.debug("Stopping all sockets")
-        for task, exchange in zip(tasks, exchanges):
-            task.cancel()
-            await exchange.close()
-            await asyncio.sleep(10)
-
-            # Restart the socket
-            await self.trades(db)
+            # Send message to user and delete from database
+            if stream.user is not None:
+                await stream.user.send(
+                    f"Your {row['exchange'].capitalize()} API key is invalid, we have removed it from our database."
+                )
+
+            util.vars.portfolio_db = util.vars.portfolio_db[
+                ~(
+                    (util.vars.portfolio_db["exchange"] == row["exchange"])
+                    & (util.vars.portfolio_db["key"] == row["key"])
+                )
+            ]
+            update_db(util.vars.portfolio_db, "portfolio")
+        except asyncio.CancelledError:
+            pass
+        finally:
+            if self.streams.get(key) is stream:
+                self.streams.pop(key)
+
+    def health(self) -> list:
+        """
+        Returns the health statistics of all streams, see TradeStream.health().
+        """
+        return [stream.health() for stream in self.streams.values()]
+
+    @scheduled(hours=1, cost=LIGHT)
+    @loop_error_catcher
+    async def log_health(self) -> None:
+        for stats in self.health():
+            logger.info(f"Trade stream health: {stats}")
 
 
 def setup(bot: commands.Bot) -> None:
@@ -7,7 +7,6 @@ import pytz
 
 # > 3rd party dependencies
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 from api.cmc import trending
 from api.coingecko import get_top_categories, get_trending_coins
@@ -18,6 +17,7 @@ from constants.logger import logger
 # Local dependencies
 from constants.sources import data_sources
 from util.afterhours import afterHours
+from util.dashboard import update_dashboard
 from util.disc import get_channel, loop_error_catcher
 from util.formatting import (
     format_change,
@@ -25,6 +25,7 @@ from util.formatting import (
     format_embed_length,
     human_format,
 )
+from util.scheduler import NETWORK, scheduled
 
 
 class Trending(commands.Cog):
@@ -145,7 +146,7 @@ class Trending(commands.Cog):
         # Check if current time is within post-market hours
         return post_market_start <= current_time <= post_market_end
 
-    @loop(hours=1)
+    @scheduled(hours=1, cost=NETWORK)
     @loop_error_catcher
     async def premarket(self) -> None:
         if self.pre_market_channel is None:
@@ -167,11 +168,9 @@ class Trending(commands.Cog):
             df.head(20), "Most Active Pre-market Stocks", "tradingview-premarket"
         )
 
-        # Remove the previous message
-        await self.pre_market_channel.purge(limit=1)
-        await self.pre_market_channel.send(embed=pre_e)
+        await update_dashboard(self.pre_market_channel, "premarket", embed=pre_e)
 
-    @loop(hours=1)
+    @scheduled(hours=1, cost=NETWORK)
     @loop_error_catcher
     async def afterhours(self) -> None:
         if self.after_hours_channel is None:
@@ -196,11 +195,9 @@ class Trending(commands.Cog):
             df.head(20), "Most Active After Hours Stocks", "tradingview-afterhours"
         )
 
-        # Remove the previous message
-        await self.after_hours_channel.purge(limit=1)
-        await self.after_hours_channel.send(embed=ah_e)
+        await update_dashboard(self.after_hours_channel, "afterhours", embed=ah_e)
 
-    @loop(hours=12)
+    @scheduled(hours=12, cost=NETWORK)
     @loop_error_catcher
     async def crypto(self) -> None:
         """
@@ -227,11 +224,10 @@ class Trending(commands.Cog):
 
         cg_e = await format_embed(cg_df, "Trending On CoinGecko", "coingecko")
 
-        await self.crypto_channel.purge(limit=2)
-        await self.crypto_channel.send(embed=cg_e)
-        await self.crypto_channel.send(embed=cmc_e)
+        await update_dashboard(self.crypto_channel, "trending_coingecko", embed=cg_e)
+        await update_dashboard(self.crypto_channel, "trending_cmc", embed=cmc_e)
 
-    @loop(hours=1)
+    @scheduled(hours=1, cost=NETWORK)
     @loop_error_catcher
     async def crypto_categories(self) -> None:
         if self.crypto_categories_channel is None:
@@ -301,10 +297,9 @@ class Trending(commands.Cog):
         # Set empty text as footer, so we can see the icon
         e.set_footer(text="\u200b", icon_url=data_sources["coingecko"]["icon"])
 
-        await self.crypto_categories_channel.purge(limit=1)
-        await self.crypto_categories_channel.send(embed=e)
+        await update_dashboard(self.crypto_categories_channel, "categories", embed=e)
 
-    @loop(hours=1)
+    @scheduled(hours=1, cost=NETWORK)
     async def stocks(self) -> None:
         """
         Posts the most actively traded stocks in the trending stocks channel.
@@ -329,8 +324,7 @@ class Trending(commands.Cog):
             e = await format_embed(
                 pd.DataFrame(most_active), "Most Active Stocks", "yahoo"
             )
-            await self.stocks_channel.purge(limit=1)
-            await self.stocks_channel.send(embed=e)
+            await update_dashboard(self.stocks_channel, "trending", embed=e)
         except Exception as e:
             logger.error(f"Error getting most active stocks: {e}")
 
@@ -1,18 +1,38 @@
 import datetime
-import os
+from io import BytesIO
 
 import discord
-import matplotlib as mpl
-import matplotlib.pyplot as plt
+import matplotlib.style
 import numpy as np
 from discord.ext import commands
-from discord.ext.tasks import loop
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
 from scipy.interpolate import make_interp_spline
 
 from api.tradingview import tv
 from constants.config import config
 from constants.tradingview import EU_bonds, US_bonds
+from util.dashboard import update_dashboard
 from util.disc import get_channel, loop_error_catcher
+from util.render import figure_to_png, render
+from util.scheduler import RENDER, scheduled
+
+# The residual maturity in years of the bonds
+US_YEARS = np.array([0.08, 0.15, 0.25, 0.5, 1, 2, 3, 5, 7, 10, 20, 30])
+EU_YEARS = np.array([0.25, 0.5, 0.75, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 15, 20, 25, 30])
+
+# Applied on top of the dark background style
+YIELD_STYLE = {
+    "axes.spines.right": False,
+    "axes.spines.left": False,
+    "axes.spines.top": False,
+    "axes.spines.bottom": False,
+    "axes.edgecolor": "white",
+    "xtick.color": "white",
+    "ytick.color": "white",
+    "axes.labelcolor": "white",
+    "text.color": "white",
+}
 
 
 class Yield(commands.Cog):
@@ -26,7 +46,7 @@ class Yield(commands.Cog):
         self.channel = None
         self.post_curve.start()
 
-    @loop(hours=24)
+    @scheduled(hours=24, cost=RENDER)
     @loop_error_catcher
     async def post_curve(self) -> None:
         """
@@ -42,42 +62,17 @@ class Yield(commands.Cog):
                 self.bot, config["LOOPS"]["YIELD"]["CHANNEL"]
             )
 
-        plt.style.use("dark_background")  # Set the style first
+        us_yield, eu_yield = await self.get_yield()
 
-        mpl.rcParams["axes.spines.right"] = False
-        mpl.rcParams["axes.spines.left"] = False
-        mpl.rcParams["axes.spines.top"] = False
-        mpl.rcParams["axes.spines.bottom"] = False
-
-        mpl.rcParams["axes.edgecolor"] = "white"  # Set edge color to white
-        mpl.rcParams["xtick.color"] = "white"  # Set x tick color to white
-        mpl.rcParams["ytick.color"] = "white"  # Set y tick color to white
-        mpl.rcParams["axes.labelcolor"] = "white"  # Set label color to white
-        mpl.rcParams["text.color"] = "white"  # Set text color to white
-
-        await self.plot_US_yield()
-        await self.plot_EU_yield()
-
-        # Add gridlines
-        plt.grid(axis="y", color="grey", linewidth=0.5, alpha=0.5)
-        plt.tick_params(axis="y", which="both", left=False)
-
-        frame = plt.gca()
-        frame.axes.get_xaxis().set_major_formatter(lambda x, _: f"{int(x)}Y")
-
-        frame.axes.set_ylim(0)
-        frame.axes.get_yaxis().set_major_formatter(lambda x, _: f"{int(x)}%")
-
-        # Set plot parameters
-        plt.legend(loc="lower center", ncol=2)
-        plt.xlabel("Residual Maturity")
+        png = await render(
+            plot_yield_curves,
+            us_yield,
+            eu_yield,
+            dpi=config["LOOPS"]["YIELD"].get("DPI", 300),
+        )
 
         # Convert to plot to a temporary image
         file_name = "yield.png"
-        file_path = os.path.join("temp", file_name)
-        plt.savefig(file_path, bbox_inches="tight", dpi=300)
-        plt.cla()
-        plt.close()
 
         e = discord.Embed(
             title="US and EU Yield Curve Rates",
@@ -85,90 +80,116 @@ class Yield(commands.Cog):
             color=0x000000,
             timestamp=datetime.datetime.now(datetime.timezone.utc),
         )
-        file = discord.File(file_path, filename=file_name)
+        file = discord.File(BytesIO(png), filename=file_name)
         e.set_image(url=f"attachment://{file_name}")
 
-        await self.channel.purge(limit=1)
-        await self.channel.send(file=file, embed=e)
-
-        # Delete yield.png
-        os.remove(file_path)
+        await update_dashboard(self.channel, "yield", embed=e, file=file)
 
-    async def plot_US_yield(self) -> None:
+    async def get_yield(self) -> tuple:
         """
-        Gets the US yield curve data from TradingView and plots it.
+        Gets the yield of all US and EU bonds from TradingView with a single request.
+
+        Returns
+        -------
+        tuple
+            The percentages of the yield for each US and each EU bond, None if it is unavailable.
         """
+        us_bonds = [bond.split(":")[1] for bond in US_bonds]
+        eu_bonds = [bond.split(":")[1] for bond in EU_bonds]
 
-        years = np.array([0.08, 0.15, 0.25, 0.5, 1, 2, 3, 5, 7, 10, 20, 30])
-        yield_percentage = await self.get_yield(US_bonds)
+        quotes = await tv.get_tv_quotes(
+            us_bonds + eu_bonds,
+            "stock",
+            timeout=config["LOOPS"]["YIELD"].get("TIMEOUT", 20),
+        )
 
-        self.make_plot(years, yield_percentage, "c", "US")
+        def yield_percentage(bonds: list) -> list:
+            return [quotes[bond][0] or None for bond in bonds]
 
-    async def plot_EU_yield(self):
-        """
-        Gets the EU yield curve data from TradingView and plots it.
-        """
+        return yield_percentage(us_bonds), yield_percentage(eu_bonds)
 
-        years = np.array(
-            [0.25, 0.5, 0.75, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 15, 20, 25, 30]
-        )
-        yield_percentage = await self.get_yield(EU_bonds)
 
-        self.make_plot(years, yield_percentage, "r", "EU")
+def plot_yield_curves(us_yield: list, eu_yield: list, dpi: int = 300) -> bytes:
+    """
+    Draws the US and EU yield curve, this is executed by the render pool.
+
+    Parameters
+    ----------
+    us_yield : list
+        The yield percentage of each US bond.
+    eu_yield : list
+        The yield percentage of each EU bond.
+    dpi : int, optional
+        The resolution of the image, by default 300.
+
+    Returns
+    -------
+    bytes
+        The chart as PNG.
+    """
+    # Set the style only for this figure
+    with matplotlib.style.context(["dark_background", YIELD_STYLE]):
+        fig = Figure(figsize=(10, 5))
+        ax = fig.subplots()
 
-    async def get_yield(self, bonds: list) -> list:
-        """
-        For each bond in the given list, it gets the yield from TradingView.
+        make_plot(ax, US_YEARS, us_yield, "c", "US")
+        make_plot(ax, EU_YEARS, eu_yield, "r", "EU")
 
-        Parameters
-        ----------
-        bonds : list
-            The names of the bonds to get the yield from.
+        # Add gridlines
+        ax.grid(axis="y", color="grey", linewidth=0.5, alpha=0.5)
+        ax.tick_params(axis="y", which="both", left=False)
 
-        Returns
-        -------
-        list
-            The percentages of the yield for each bond.
-        """
+        ax.xaxis.set_major_formatter(lambda x, _: f"{int(x)}Y")
 
-        yield_percentage = []
-        for bond in bonds:
-            no_exch = bond.split(":")[1]
-            tv_data = await tv.get_tv_data(no_exch, "stock")
-            yield_percentage.append(tv_data[0])
+        ax.set_ylim(0)
+        ax.yaxis.set_major_formatter(lambda x, _: f"{int(x)}%")
 
-        return yield_percentage
+        # Set plot parameters
+        ax.legend(loc="lower center", ncol=2)
+        ax.set_xlabel("Residual Maturity")
 
-    def make_plot(
-        self, years: list, yield_percentage: list, color: str, label: str
-    ) -> None:
-        """
-        Makes a matplotlib plot of the yield curve.
-        Each dot is the yield for a specific bond.
-        Connects a spline through the dots to make a smooth curve.
-
-        Parameters
-        ----------
-        years : list
-            The years of the yield curve.
-        yield_percentage : list
-            The yield percentage for each year.
-        color : str
-            The color of the plotted line.
-        label : str
-            The label for the plotted line.
-        """
+        return figure_to_png(fig, dpi)
+
+
+def make_plot(
+    ax: Axes, years: np.ndarray, yield_percentage: list, color: str, label: str
+) -> None:
+    """
+    Makes a matplotlib plot of the yield curve.
+    Each dot is the yield for a specific bond.
+    Connects a spline through the dots to make a smooth curve.
+
+    Parameters
+    ----------
+    ax : Axes
+        The axes to plot on.
+    years : np.ndarray
+        The years of the yield curve.
+    yield_percentage : list
+        The yield percentage for each year, None if it is unavailable.
+    color : str
+        The color of the plotted line.
+    label : str
+        The label for the plotted line.
+    """
+    # Leave out the bonds that are unavailable
+    available = np.array([y is not None for y in yield_percentage], dtype=bool)
+    years = years[available]
+    yield_percentage = np.array(yield_percentage, dtype=object)[available].astype(float)
+
+    # A cubic spline needs at least 4 points
+    if len(years) < 4:
+        return
 
-        new_X = np.linspace(years.min(), years.max(), 500)
+    new_X = np.linspace(years.min(), years.max(), 500)
 
-        # Interpolation
-        spl = make_interp_spline(years, yield_percentage, k=3)
-        smooth = spl(new_X)
+    # Interpolation
+    spl = make_interp_spline(years, yield_percentage, k=3)
+    smooth = spl(new_X)
 
-        # Make the plot
-        plt.rcParams["figure.figsize"] = (10, 5)  # Set the figure size
-        plt.plot(new_X, smooth, color, label=label)
-        plt.plot(years, yield_percentage, f"{color}o")
+    # Make the plot
+    ax.plot(new_X, smooth, color, label=label)
+    ax.plot(years, yield_percentage, f"{color}o")
 
 
 def setup(bot: commands.Bot) -> None:
@@ -1,5 +1,9 @@
+import asyncio
+import importlib
 import os
 import sys
+import threading
+import time
 
 import discord
 from discord.ext import commands
@@ -14,21 +18,95 @@ from util.disc import get_guild, set_emoji
 
 bot = commands.Bot(intents=discord.Intents.all())
 
+# The slow imports of the cogs, these are imported in the background while the bot logs in
+PRELOAD_MODULES = [
+    "torch",
+    "transformers",
+    "timm",
+    "ccxt",
+    "ccxt.async_support",
+    "matplotlib.figure",
+    "seaborn",
+    "plotly.express",
+    "scipy.interpolate",
+    "scipy.optimize",
+]
+
+# The cog -> the seconds it took to load
+load_times = {}
+
+# on_ready is called again after a reconnect, the cogs should only be loaded once
+cogs_loaded = False
+
 
 @bot.event
 async def on_ready() -> None:
     """This gets logger.infoed on boot up"""
+    global cogs_loaded
+
+    guild = get_guild(bot)
+
+    if cogs_loaded:
+        logger.info(f"{bot.user} reconnected to {guild.name}")
+        return
+    cogs_loaded = True
+
+    # Wait for the slow dependencies off the event loop, so loading the cogs does not block the gateway
+    start = time.perf_counter()
+    if preloader.is_alive():
+        await asyncio.to_thread(preloader.join)
 
     # Load the loops and listeners
-    load_folder("loops")
-    load_folder("listeners")
+    for foldername in ["loops", "listeners"]:
+        load_folder(foldername)
+
+    log_load_times(time.perf_counter() - start)
 
-    guild = get_guild(bot)
     logger.info(f"{bot.user} is connected to {guild.name}")
 
     await set_emoji(guild)
 
 
+def preload_modules() -> None:
+    """
+    Imports the slow dependencies of the cogs, so they are cached by the time the cogs are loaded.
+    """
+    start = time.perf_counter()
+    for module in PRELOAD_MODULES:
+        module_start = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.debug(f"Could not preload {module}: {e}")
+            continue
+        logger.debug(f"Preloaded {module} in {time.perf_counter() - module_start:.2f}s")
+    logger.info(f"Preloaded the dependencies in {time.perf_counter() - start:.2f}s")
+
+
+# Started in __main__, the cogs are loaded once it is done
+preloader = threading.Thread(target=preload_modules, daemon=True)
+
+
+def log_load_times(total: float) -> None:
+    """
+    Logs the time it took to load each cog, slowest first.
+
+    Parameters
+    ----------
+    total: float
+        The number of seconds it took to load the loops and listeners.
+
+    Returns
+    -------
+    None
+    """
+    for cog, seconds in sorted(load_times.items(), key=lambda item: -item[1]):
+        logger.info(f"{cog}: {seconds:.2f}s")
+    logger.info(
+        f"Loaded {len(load_times)} cogs, the loops and listeners took {total:.2f}s"
+    )
+
+
 def is_cog_enabled(config_section, file):
     """
     Checks if a cog is enabled in the configuration.
@@ -70,7 +148,9 @@ def load_cog(filename, foldername):
     """
     try:
         logger.info(f"Loading: {filename}")
+        start = time.perf_counter()
         bot.load_extension(f"cogs.{foldername}.{filename[:-3]}")
+        load_times[f"{foldername}.{filename[:-3]}"] = time.perf_counter() - start
     except discord.ExtensionAlreadyLoaded:
         logger.debug(f"Extension already loaded: {filename}")
     except discord.ExtensionNotFound:
@@ -79,21 +159,20 @@ def load_cog(filename, foldername):
         logger.error(f"Failed to load cog {filename}: {e}", exc_info=True)
 
 
-def load_folder(foldername: str) -> None:
+def get_enabled_cogs(foldername: str) -> list:
     """
-    Loads all the cogs in the given folder.
-    Only loads the cogs if the config allows it.
+    Returns the cogs in the given folder that are enabled in the config.
 
     Parameters
     ----------
     foldername: str
-        The name of the folder to load the cogs from.
+        The name of the folder containing the cogs.
 
     Returns
     -------
-    None
+    list
+        The file names of the enabled cogs.
     """
-    logger.info(f"Loading cogs from folder: {foldername}")
     folder_config = config.get(foldername.upper(), {})
 
     debug_mode = False
@@ -131,10 +210,36 @@ def load_folder(foldername: str) -> None:
             if is_cog_enabled(folder_config, file)
         ]
 
-    # Load all enabled cogs
-    for filename in os.listdir(f"./src/cogs/{foldername}"):
-        if filename.endswith(".py") and filename in enabled_cogs:
-            load_cog(filename, foldername)
+    return [
+        filename
+        for filename in os.listdir(f"./src/cogs/{foldername}")
+        if filename.endswith(".py") and filename in enabled_cogs
+    ]
+
+
+def load_folder(foldername: str, filenames: list = None) -> None:
+    """
+    Loads all the cogs in the given folder.
+    Only loads the cogs if the config allows it.
+
+    Parameters
+    ----------
+    foldername: str
+        The name of the folder to load the cogs from.
+    filenames: list, optional
+        The cogs to load, by default the enabled cogs in the folder.
+
+    Returns
+    -------
+    None
+    """
+    logger.info(f"Loading cogs from folder: {foldername}")
+
+    if filenames is None:
+        filenames = get_enabled_cogs(foldername)
+
+    for filename in filenames:
+        load_cog(filename, foldername)
 
 
 def get_token():
@@ -169,6 +274,9 @@ if __name__ == "__main__":
 
     token = get_token()
 
+    # Import the slow dependencies while the commands are loaded and the bot logs in
+    preloader.start()
+
     # Load commands first
     load_folder("commands")
 
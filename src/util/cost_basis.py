@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+from typing import Optional
+
+import ccxt.async_support as ccxt
+
+from constants.logger import logger
+from constants.stable_coins import stables
+
+
+class CostBasisLedger:
+    """
+    Persistent ledger of the average buying price of each traded symbol per user.
+    The trade history is fetched incrementally, starting at the last known fill,
+    so lookups are served from local storage instead of fetching all closed orders.
+    Without a start time the exchanges only return the most recent fills, so a new entry
+    starts from the known holdings and buying price if there are any.
+    Fills are used instead of closed orders, because an order that was placed earlier
+    can still fill after a later order was synced.
+    """
+
+    def __init__(self, db_loc: str = "data/cost_basis.db") -> None:
+        self.db_loc = db_loc
+        self.entries = None
+        self.locks = {}
+
+    def connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.db_loc), exist_ok=True)
+        cnx = sqlite3.connect(self.db_loc)
+
+        # The ledger used to be built from closed orders, it is rebuilt from the fills
+        columns = [row[1] for row in cnx.execute("PRAGMA table_info(cost_basis)")]
+        if columns and "last_ids" not in columns:
+            cnx.execute("DROP TABLE cost_basis")
+
+        cnx.execute("""
+            CREATE TABLE IF NOT EXISTS cost_basis (
+                id INTEGER,
+                exchange TEXT,
+                symbol TEXT,
+                owned REAL,
+                avg_cost REAL,
+                since INTEGER,
+                last_ids TEXT,
+                PRIMARY KEY (id, exchange, symbol)
+            )
+            """)
+        return cnx
+
+    def load(self) -> dict:
+        if self.entries is None:
+            with self.connect() as cnx:
+                rows = cnx.execute("SELECT * FROM cost_basis").fetchall()
+            cnx.close()
+
+            self.entries = {
+                (user_id, exchange, symbol): {
+                    "owned": owned,
+                    "avg_cost": avg_cost,
+                    "since": since,
+                    "last_ids": set(last_ids.split(",")) if last_ids else set(),
+                }
+                for user_id, exchange, symbol, owned, avg_cost, since, last_ids in rows
+            }
+
+        return self.entries
+
+    def save(self, key: tuple, entry: dict) -> None:
+        with self.connect() as cnx:
+            cnx.execute(
+                "INSERT OR REPLACE INTO cost_basis VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    *key,
+                    entry["owned"],
+                    entry["avg_cost"],
+                    entry["since"],
+                    ",".join(sorted(entry["last_ids"])),
+                ),
+            )
+        cnx.close()
+
+    def lookup(self, user_id: int, exchange: str, symbol: str) -> Optional[float]:
+        """
+        Returns the average buying price from the ledger, without any requests.
+
+        Parameters
+        ----------
+        user_id : int
+            The Discord id of the user.
+        exchange : str
+            The id of the exchange, i.e. 'binance'.
+        symbol : str
+            The traded symbol, i.e. 'BTC/USDT'.
+
+        Returns
+        -------
+        Optional[float]
+            The average buying price, 0 if it is not known,
+            or None if this symbol has not been synced yet.
+        """
+        entry = self.load().get((int(user_id), exchange, symbol))
+        if entry is None:
+            return None
+        return entry["avg_cost"]
+
+    async def sync(
+        self,
+        exchange: ccxt.Exchange,
+        user_id: int,
+        symbol: str,
+        max_pages: int = 10,
+        seed: Optional[tuple[float, float]] = None,
+    ) -> float:
+        """
+        Fetches the fills since the last sync and updates the average buying price.
+
+        Parameters
+        ----------
+        exchange : ccxt.Exchange
+            The exchange of the user.
+        user_id : int
+            The Discord id of the user.
+        symbol : str
+            The traded symbol, i.e. 'BTC/USDT'.
+        max_pages : int, optional
+            The maximum number of requests per sync, the rest is fetched by the next sync, by default 10.
+        seed : Optional[tuple[float, float]], optional
+            The amount owned and the average buying price before the first sync, by default None.
+            A new entry starts with these and only applies the fills from now on.
+            Without a known buying price the recent fills of the exchange are used.
+
+        Returns
+        -------
+        float
+            The average buying price, 0 if it is not known.
+        """
+        if symbol.split("/")[0] in stables:
+            return 1
+
+        key = (int(user_id), exchange.id, symbol)
+        lock = self.locks.setdefault(key, asyncio.Lock())
+
+        async with lock:
+            entry = self.load().get(key)
+            if entry is None:
+                entry = {
+                    "owned": 0.0,
+                    "avg_cost": 0.0,
+                    "since": None,
+                    "last_ids": set(),
+                }
+                if seed is not None and seed[1] > 0:
+                    # The older fills are already included in the known buying price
+                    entry["owned"], entry["avg_cost"] = float(seed[0]), float(seed[1])
+                    entry["since"] = exchange.milliseconds()
+
+            since = entry["since"]
+            for _ in range(max_pages):
+                try:
+                    # Since is inclusive, the fills at that time that were applied are skipped by id
+                    trades = await exchange.fetchMyTrades(symbol, since=since)
+                except (ccxt.BadSymbol, ccxt.RequestTimeout):
+                    break
+                except Exception as e:
+                    logger.error(
+                        f"Error fetching trades of {symbol} on {exchange.id}: {e}"
+                    )
+                    break
+
+                new = [
+                    trade
+                    for trade in trades
+                    if trade["timestamp"] is not None
+                    and not (
+                        trade["timestamp"] == entry["since"]
+                        and str(trade["id"]) in entry["last_ids"]
+                    )
+                ]
+
+                if new:
+                    for trade in sorted(new, key=lambda t: t["timestamp"]):
+                        apply_trade(entry, trade)
+                    since = entry["since"]
+                elif trades and all(t["timestamp"] == since for t in trades):
+                    # The whole page was already applied, continue after this timestamp
+                    since += 1
+                else:
+                    break
+
+            self.entries[key] = entry
+            await asyncio.to_thread(self.save, key, entry)
+
+            return entry["avg_cost"]
+
+
+def apply_trade(entry: dict, trade: dict) -> None:
+    """
+    Applies a fill to the weighted average cost of the entry.
+    Buys move the average cost, sells only lower the owned amount.
+    """
+    # Remember the fills at the last timestamp, since the next sync fetches them again
+    if trade["timestamp"] != entry["since"]:
+        entry["since"] = trade["timestamp"]
+        entry["last_ids"] = set()
+    entry["last_ids"].add(str(trade["id"]))
+
+    amount = float(trade.get("amount") or 0)
+    price = float(trade.get("price") or 0)
+    if amount == 0 or price == 0:
+        return
+
+    if trade["side"] == "buy":
+        owned = entry["owned"] + amount
+        entry["avg_cost"] = (
+            entry["owned"] * entry["avg_cost"] + amount * price
+        ) / owned
+        entry["owned"] = owned
+    elif trade["side"] == "sell":
+        entry["owned"] -= amount
+        if entry["owned"] <= 0:
+            entry["owned"] = 0.0
+            entry["avg_cost"] = 0.0
+
+
+cost_basis = CostBasisLedger()
@@ -0,0 +1,225 @@
+import asyncio
+import hashlib
+import json
+from typing import List, Optional
+
+import discord
+import pandas as pd
+
+import util.vars
+from constants.logger import logger
+from util.db import update_db_rows
+
+# Dashboards in the same channel should not take over the same message
+adopt_lock = asyncio.Lock()
+
+
+def save_dashboard(key: tuple) -> None:
+    """
+    Writes the row of one dashboard to data/dashboards.db.
+
+    Parameters
+    ----------
+    key : tuple
+        The channel id and the name of the dashboard.
+    """
+    channel_id, dashboard = key
+    info = util.vars.dashboards[key]
+    db = pd.DataFrame(
+        [
+            {
+                "channel_id": channel_id,
+                "dashboard": dashboard,
+                "message_id": info["message_id"],
+                "hash": info["hash"],
+                "notify": info.get("notify"),
+            }
+        ]
+    )
+    update_db_rows(db, "dashboards", keys=["channel_id", "dashboard"])
+
+
+def same_embed(a: discord.Embed, b: discord.Embed) -> bool:
+    """
+    Checks if two embeds belong to the same dashboard, by their title and URL.
+    """
+    return bool(a.title or a.url) and a.title == b.title and a.url == b.url
+
+
+async def adopt_message(
+    channel: discord.TextChannel, embeds: List[discord.Embed]
+) -> Optional[int]:
+    """
+    Finds the last message of the bot in the channel with the same embed as the dashboard,
+    that does not belong to another dashboard. This is the message that was posted
+    before the dashboards were registered. A channel can hold multiple dashboards,
+    so a message is only adopted if its first embed has the same title and URL.
+
+    Parameters
+    ----------
+    channel : discord.TextChannel
+        The channel of the dashboard.
+    embeds : List[discord.Embed]
+        The new embeds of the dashboard.
+
+    Returns
+    -------
+    int, optional
+        The id of the message, None if the bot has no matching message in the channel.
+    """
+    if not embeds:
+        return None
+
+    claimed = {
+        info["message_id"]
+        for (channel_id, _), info in util.vars.dashboards.items()
+        if channel_id == channel.id
+    }
+
+    async for msg in channel.history(limit=10):
+        if (
+            msg.author.id == channel.guild.me.id
+            and msg.id not in claimed
+            and msg.embeds
+            and same_embed(msg.embeds[0], embeds[0])
+        ):
+            return msg.id
+
+    return None
+
+
+def embed_hash(
+    content: Optional[str],
+    embeds: List[discord.Embed],
+    file: Optional[discord.File] = None,
+) -> str:
+    """
+    Hashes the rendered message, the embed timestamp is ignored because it changes every run.
+
+    Parameters
+    ----------
+    content : str, optional
+        The text content of the message.
+    embeds : List[discord.Embed]
+        The embeds of the message.
+    file : discord.File, optional
+        The attached file, for instance a chart.
+
+    Returns
+    -------
+    str
+        The hex digest of the message.
+    """
+    h = hashlib.sha256(str(content).encode())
+
+    for e in embeds:
+        e_dict = e.to_dict()
+        e_dict.pop("timestamp", None)
+        h.update(json.dumps(e_dict, sort_keys=True, default=str).encode())
+
+    if file is not None:
+        h.update(file.fp.read())
+        file.reset()
+
+    return h.hexdigest()
+
+
+async def update_dashboard(
+    channel: discord.TextChannel,
+    dashboard: str,
+    embed: discord.Embed = None,
+    embeds: List[discord.Embed] = None,
+    content: str = None,
+    file: discord.File = None,
+    notify: str = None,
+) -> None:
+    """
+    Edits the dashboard message in the channel, instead of purging and sending a new one.
+    The edit is skipped if the message did not change and a new message is only sent
+    if the previous one can not be found. On the first run the last message of the bot
+    in the channel with the same embed is taken over, so the dashboard is not posted twice.
+    Discord does not notify the users that are tagged in an edited message, so if notify changes
+    the previous message is deleted and the dashboard is sent as a new message.
+
+    Parameters
+    ----------
+    channel : discord.TextChannel
+        The channel the dashboard is posted in.
+    dashboard : str
+        The name of the dashboard, a channel can hold multiple dashboards.
+    embed : discord.Embed, optional
+        The embed to post.
+    embeds : List[discord.Embed], optional
+        The embeds to post, used instead of embed.
+    content : str, optional
+        The text of the message, for instance tagged users.
+    file : discord.File, optional
+        The file to attach, for instance a chart.
+    notify : str, optional
+        What the tagged users are notified about, i.e. the tagged users and the halted stocks.
+        By default None, which never sends a new message to notify users.
+    """
+    if embeds is None:
+        embeds = [embed] if embed is not None else []
+
+    key = (channel.id, dashboard)
+    new_hash = embed_hash(content, embeds, file)
+    notify_hash = (
+        hashlib.sha256(notify.encode()).hexdigest() if notify is not None else None
+    )
+    stored = util.vars.dashboards.get(key)
+
+    if stored is None:
+        # Take over the message of the bot that is already in the channel, so it is not posted twice
+        async with adopt_lock:
+            message_id = await adopt_message(channel, embeds)
+            if message_id is not None:
+                stored = {"message_id": message_id, "hash": None, "notify": None}
+                util.vars.dashboards[key] = stored
+
+    if (
+        stored is not None
+        and notify_hash is not None
+        and stored.get("notify") != notify_hash
+    ):
+        # Send a new message, so the tagged users get a notification
+        try:
+            await channel.get_partial_message(stored["message_id"]).delete()
+        except discord.errors.NotFound:
+            pass
+        stored = None
+
+    if stored is not None:
+        if stored["hash"] == new_hash:
+            logger.debug(f"Dashboard {dashboard} in {channel.name} did not change")
+            if file is not None:
+                file.close()
+            return
+
+        fields = {"content": content, "embeds": embeds}
+        if file is not None:
+            # Replace the previous attachment
+            fields["file"] = file
+            fields["attachments"] = []
+
+        try:
+            await channel.get_partial_message(stored["message_id"]).edit(**fields)
+            stored["hash"] = new_hash
+            save_dashboard(key)
+            return
+        except discord.errors.NotFound:
+            logger.debug(
+                f"Dashboard {dashboard} in {channel.name} was removed, sending a new one"
+            )
+            if file is not None:
+                file.reset()
+
+    msg = await channel.send(content=content, embeds=embeds, file=file)
+    util.vars.dashboards[key] = {
+        "message_id": msg.id,
+        "hash": new_hash,
+        "notify": (
+            notify_hash if notify_hash is not None else (stored or {}).get("notify")
+        ),
+    }
+    save_dashboard(key)
@@ -3,6 +3,7 @@ import datetime
 import os
 import sqlite3
 from collections import defaultdict
+from typing import Optional
 
 import numpy as np
 import pandas as pd
@@ -10,11 +11,17 @@ from discord.ext import commands
 from discord.ext.tasks import loop
 
 import util.vars
-from api.coingecko import get_coins_list, rate_limit
+from api.coingecko import (
+    build_cg_index,
+    get_coins_list,
+    get_market_cap_ranks,
+    rate_limit,
+)
 from api.nasdaq import tickers_nasdaq
 from api.tradingview import get_tv_ticker_data
 from constants.logger import logger
 from constants.tradingview import all_forex_indices, crypto_indices, stock_indices
+from util.disc import index_assets
 
 # Convert emoji to text
 convert_emoji = defaultdict(
@@ -42,6 +49,7 @@ class DB(commands.Cog):
         self.set_ideas_ids_db()
         self.set_classified_tickers_db()
         self.set_options_db()
+        self.set_dashboards_db()
 
     def set_portfolio_db(self):
         util.vars.portfolio_db = get_db("portfolio")
@@ -52,6 +60,7 @@ class DB(commands.Cog):
         util.vars.assets_db = get_db("assets")
         if not util.vars.assets_db.empty:
             util.vars.assets_db["id"] = util.vars.assets_db["id"].astype(np.int64)
+        index_assets(util.vars.assets_db)
 
     def set_tweets_db(self):
         util.vars.tweets_db = get_db("tweets")
@@ -59,6 +68,16 @@ class DB(commands.Cog):
     def set_options_db(self):
         util.vars.options_db = get_db("options")
 
+    def set_dashboards_db(self):
+        dashboards_db = get_db("dashboards")
+        for row in dashboards_db.itertuples(index=False):
+            util.vars.dashboards[(int(row.channel_id), row.dashboard)] = {
+                "message_id": int(row.message_id),
+                "hash": row.hash,
+                # Older databases do not have this column
+                "notify": getattr(row, "notify", None),
+            }
+
     def set_reddit_ids_db(self):
         util.vars.reddit_ids = get_db("reddit_ids")
 
@@ -105,6 +124,9 @@ class DB(commands.Cog):
         # Set cg_coins
         util.vars.cg_db = cg_coins
 
+        # Index the coins on symbol, id and name, ranked by market cap
+        util.vars.cg_index = build_cg_index(cg_coins, await get_market_cap_ranks())
+
     @loop(hours=24)
     async def set_tv_db(self):
         """
@@ -306,3 +328,63 @@ def update_db(db: pd.DataFrame, database_name: str) -> None:
         logger.error(
             f"Error updating {database_name}.db: {e}.\nTried to update database:\n{db.to_string()}"
         )
+
+
+def update_db_rows(
+    db: pd.DataFrame, database_name: str, keys: list, removed: Optional[list] = None
+) -> None:
+    """
+    Update only the given rows of the database saved under data/database_name.db,
+    instead of rewriting the whole table.
+
+    Parameters
+    ----------
+    db : pd.DataFrame
+        The changed rows, these replace the rows with the same keys.
+    database_name : str
+        Name of the database to update.
+    keys : list
+        The columns that identify a row, i.e. ["id", "exchange", "asset"].
+    removed : list, optional
+        The key values of the rows that should be deleted, by default None.
+
+    Returns
+    -------
+    None
+    """
+    db_loc = f"data/{database_name}.db"
+    removed = removed or []
+
+    # Stored as strings, the same as update_db()
+    db = db.astype(str)
+    key_values = [tuple(str(v) for v in row) for row in db[keys].values] + [
+        tuple(str(v) for v in row) for row in removed
+    ]
+    where = " AND ".join(f"{key} = ?" for key in keys)
+
+    try:
+        with sqlite3.connect(db_loc) as cnx:
+            # The table does not exist yet on the first update
+            exists = cnx.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                (database_name,),
+            ).fetchone()
+            if exists:
+                # Add the columns that are new since the table was created
+                columns = {
+                    row[1] for row in cnx.execute(f"PRAGMA table_info({database_name})")
+                }
+                for column in db.columns.difference(list(columns)):
+                    cnx.execute(
+                        f'ALTER TABLE {database_name} ADD COLUMN "{column}" TEXT'
+                    )
+
+                cnx.executemany(
+                    f"DELETE FROM {database_name} WHERE {where}", key_values
+                )
+            db.to_sql(database_name, cnx, if_exists="append", index=False)
+        cnx.close()
+    except Exception as e:
+        logger.error(
+            f"Error updating rows of {database_name}.db: {e}.\nTried to update rows:\n{db.to_string()}"
+        )
@@ -4,6 +4,7 @@ from functools import wraps
 from typing import Optional
 
 import discord
+import pandas as pd
 from discord.ext import commands
 
 import util.vars
@@ -202,6 +203,113 @@ async def get_user(bot: commands.Bot, user_id: int) -> discord.User:
     return await bot.fetch_user(user_id)
 
 
+def add_asset_holder(user_id: int, asset: str) -> None:
+    """
+    Adds the user as a holder of the asset to the inverted assets index.
+
+    Parameters
+    ----------
+    user_id : int
+        The Discord id of the user.
+    asset : str
+        The ticker of the asset, i.e. 'BTC'.
+    """
+    user_id = int(user_id)
+    util.vars.asset_holders.setdefault(asset, set()).add(user_id)
+    util.vars.user_assets.setdefault(user_id, set()).add(asset)
+    util.vars.user_mentions[user_id] = f"<@!{user_id}>"
+
+
+def remove_asset_holder(user_id: int, asset: str) -> None:
+    """
+    Removes the user as a holder of the asset from the inverted assets index.
+
+    Parameters
+    ----------
+    user_id : int
+        The Discord id of the user.
+    asset : str
+        The ticker of the asset, i.e. 'BTC'.
+    """
+    user_id = int(user_id)
+    holders = util.vars.asset_holders.get(asset)
+    if holders is not None:
+        holders.discard(user_id)
+        if not holders:
+            del util.vars.asset_holders[asset]
+
+    assets = util.vars.user_assets.get(user_id)
+    if assets is not None:
+        assets.discard(asset)
+        if not assets:
+            del util.vars.user_assets[user_id]
+            util.vars.user_mentions.pop(user_id, None)
+
+
+def set_user_assets(user_id: int, assets) -> None:
+    """
+    Updates the inverted assets index with the current assets of a user.
+    Only the assets that were added or removed are changed.
+
+    Parameters
+    ----------
+    user_id : int
+        The Discord id of the user.
+    assets : iterable
+        All the assets that the user currently owns.
+    """
+    user_id = int(user_id)
+    new_assets = set(assets)
+    old_assets = util.vars.user_assets.get(user_id, set())
+
+    for asset in old_assets - new_assets:
+        remove_asset_holder(user_id, asset)
+    for asset in new_assets - old_assets:
+        add_asset_holder(user_id, asset)
+
+
+def index_assets(assets_db: pd.DataFrame) -> None:
+    """
+    Updates the inverted assets index for all users in the assets database.
+
+    Parameters
+    ----------
+    assets_db : pd.DataFrame
+        The assets database, with at least the columns id and asset.
+    """
+    new_assets = {}
+    if not assets_db.empty:
+        assets_db = assets_db.dropna(subset=["id"])
+        # The ids can be stored as str or int, group them as int so they are combined
+        for user_id, assets in assets_db.groupby(assets_db["id"].map(int))["asset"]:
+            new_assets[user_id] = set(assets)
+
+    for user_id in set(util.vars.user_assets) - set(new_assets):
+        set_user_assets(user_id, [])
+    for user_id, assets in new_assets.items():
+        set_user_assets(user_id, assets)
+
+
+def index_user_assets(assets_db: pd.DataFrame, user_id: int) -> None:
+    """
+    Updates the inverted assets index for one user, with all their rows in the assets database.
+    The user stays a holder of an asset that they still own on another exchange.
+
+    Parameters
+    ----------
+    assets_db : pd.DataFrame
+        The assets database, with at least the columns id and asset.
+    user_id : int
+        The Discord id of the user.
+    """
+    assets = []
+    if not assets_db.empty:
+        assets_db = assets_db.dropna(subset=["id"])
+        assets = assets_db.loc[assets_db["id"].map(int) == int(user_id), "asset"]
+
+    set_user_assets(user_id, assets)
+
+
 def get_tagged_users(tickers: list) -> Optional[str]:
     """
     Tags the users with the tickers in their portfolio that are mentioned in the message.
@@ -216,19 +324,13 @@ def get_tagged_users(tickers: list) -> Optional[str]:
     Optional[str]
         The message of the users that need to be tagged.
     """
+    unique_users = set()
+    for ticker in tickers:
+        unique_users.update(util.vars.asset_holders.get(ticker, ()))
 
-    # Get the stored db
-    if not util.vars.assets_db.empty:
-        matching_users = (
-            util.vars.assets_db[util.vars.assets_db["asset"].isin(tickers)]["id"]
-            .dropna()
-            .tolist()
-        )
-        unique_users = list(set(matching_users))
-
-        if unique_users:
-            # Make it one message for all the users
-            return " ".join([f"<@!{user}>" for user in unique_users])
+    if unique_users:
+        # Make it one message for all the users
+        return " ".join([util.vars.user_mentions[user] for user in unique_users])
 
 
 async def get_webhook(channel: discord.TextChannel) -> discord.Webhook:
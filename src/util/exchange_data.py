@@ -1,12 +1,45 @@
+import asyncio
+import time
+
 import ccxt.async_support as ccxt
 import numpy as np
 import pandas as pd
 
+import util.vars
 from constants.logger import logger
 from constants.stable_coins import stables
+from util.cost_basis import cost_basis
 
+# The exchange instances are reused across runs, keyed by (exchange, api key)
+exchanges = {}
+
+# Public exchange instances and their ticker snapshots, keyed by exchange id
+public_exchanges = {}
+snapshots = {}
+snapshot_locks = {}
+SNAPSHOT_TTL = 60
+
+
+def get_exchange(row) -> ccxt.Exchange:
+    """
+    Returns the exchange instance for the credentials in the portfolio row.
+    A new instance is only created the first time these credentials are used,
+    so the loaded markets and the connection are shared between runs.
+
+    Parameters
+    ----------
+    row : pd.Series
+        The row of the portfolio db with the exchange, key, secret and passphrase.
+
+    Returns
+    -------
+    ccxt.Exchange
+        The ccxt exchange instance.
+    """
+    key = (row["exchange"], row["key"])
+    if key in exchanges:
+        return exchanges[key]
 
-async def get_data(row) -> pd.DataFrame:
     exchange_info = {"apiKey": row["key"], "secret": row["secret"]}
 
     if row["exchange"] == "binance":
@@ -15,28 +48,71 @@ async def get_data(row) -> pd.DataFrame:
     elif row["exchange"] == "kucoin":
         exchange_info["password"] = row["passphrase"]
         exchange = ccxt.kucoin(exchange_info)
+    else:
+        raise ValueError(f"Unsupported exchange: {row['exchange']}")
+
+    exchanges[key] = exchange
+    return exchange
+
+
+async def close_exchange(row) -> None:
+    """
+    Closes and forgets the exchange instance of these credentials, for instance
+    when a user removes their portfolio.
+    """
+    exchange = exchanges.pop((row["exchange"], row["key"]), None)
+    if exchange is not None:
+        await exchange.close()
+
+
+async def close_exchanges() -> None:
+    """
+    Closes all pooled exchange instances.
+    """
+    for exchange in [*exchanges.values(), *public_exchanges.values()]:
+        await exchange.close()
+    exchanges.clear()
+    public_exchanges.clear()
+
+
+async def get_data(row) -> pd.DataFrame:
+    try:
+        exchange = get_exchange(row)
+    except ValueError as e:
+        logger.error(f"Error in get_data(). Error: {e}")
+        return
 
     try:
         balances = await get_balance(exchange)
 
         if balances == "invalid API key":
-            await exchange.close()
+            await close_exchange(row)
             return "invalid API key"
 
-        # Create a list of dictionaries
-        owned = []
+        # One request for the prices of all symbols on this exchange
+        prices = await get_usd_prices(exchange, list(balances.keys()))
 
+        # Only look up the buying price of the assets that are worth something
+        held = {}
         for symbol, amount in balances.items():
-            usd_val, percentage = await get_usd_price(exchange, symbol)
+            usd_val, percentage = prices.get(symbol, (0.0, 0.0))
             worth = amount * usd_val
+            if worth >= 5:
+                held[symbol] = (amount, usd_val, percentage, worth)
 
-            # Add price change
-
-            if worth < 5:
-                continue
+        buying_prices = await asyncio.gather(
+            *(
+                get_buying_price(exchange, symbol, row["id"], owned=amount)
+                for symbol, (amount, _, _, _) in held.items()
+            )
+        )
 
-            buying_price = await get_buying_price(exchange, symbol)
+        # Create a list of dictionaries
+        owned = []
 
+        for (symbol, (amount, usd_val, percentage, worth)), buying_price in zip(
+            held.items(), buying_prices
+        ):
             # If buying price is 0 then it is not known what the price was
             owned.append(
                 {
@@ -70,10 +146,8 @@ async def get_data(row) -> pd.DataFrame:
                 }
             )
 
-        await exchange.close()
         return df
     except Exception as e:
-        await exchange.close()
         logger.error(f"Error in get_data(). Error: {e}")
 
 
@@ -88,71 +162,161 @@ async def get_balance(exchange) -> dict:
         return {}
 
 
+async def get_market_snapshot(exchange_id: str) -> dict:
+    """
+    Returns the USD price and 24h change of every coin on the exchange.
+    The markets are loaded once and the tickers are fetched in a single request per
+    SNAPSHOT_TTL seconds, this snapshot is shared by all users of the exchange.
+
+    Parameters
+    ----------
+    exchange_id : str
+        The id of the exchange, i.e. 'binance'.
+
+    Returns
+    -------
+    dict
+        The base symbol as key and a tuple of (price, change) as value,
+        using the first stable coin of constants.stable_coins that it is paired with.
+    """
+    lock = snapshot_locks.setdefault(exchange_id, asyncio.Lock())
+
+    async with lock:
+        snapshot = snapshots.get(exchange_id)
+        if snapshot is not None and time.time() - snapshot["time"] < SNAPSHOT_TTL:
+            return snapshot["prices"]
+
+        if exchange_id not in public_exchanges:
+            public_exchanges[exchange_id] = getattr(ccxt, exchange_id)()
+        exchange = public_exchanges[exchange_id]
+
+        try:
+            # Only requests the markets the first time
+            await exchange.load_markets()
+            tickers = await exchange.fetchTickers()
+        except Exception as e:
+            logger.error(f"Error fetching tickers on {exchange_id}: {e}")
+            return {} if snapshot is None else snapshot["prices"]
+
+        # The lower the rank, the more preferred the stable coin
+        rank = {usd: i for i, usd in enumerate(stables)}
+        quote_rank = {}
+        prices = {}
+
+        for symbol, ticker in tickers.items():
+            # Skip derivatives, i.e. BTC/USDT:USDT
+            if ":" in symbol or "/" not in symbol:
+                continue
+
+            base, quote = symbol.split("/")
+            if quote not in rank or rank[quote] >= quote_rank.get(base, len(rank)):
+                continue
+
+            quote_rank[base] = rank[quote]
+            prices[base] = (
+                float(ticker.get("last") or 0),
+                float(ticker.get("percentage") or 0),
+            )
+
+        snapshots[exchange_id] = {"time": time.time(), "prices": prices}
+        return prices
+
+
 async def get_usd_price(exchange, symbol: str) -> tuple[float, float]:
     """
-    Returns the price of the symbol in USD.
-    Symbol must be in the format 'BTC/USDT'.
+    Returns the price of the symbol in USD and its 24h change.
+    Symbol must be the base currency, i.e. 'BTC'.
     """
     # Directly return for USDT or when symbol is a known stable coin
     if symbol == "USDT" or symbol in stables:
         return 1.0, 0.0
 
-    # Helper function to fetch price and change
-    async def fetch_price(symbol_pair: str):
-        try:
-            price = await exchange.fetchTicker(symbol_pair)
-            exchange_price = price.get("last", 0)
-            if exchange_price is None:
-                exchange_price = 0
-            exchange_price = float(exchange_price)
-            exchange_change = price.get("percentage", 0)
-            if exchange_change is None:
-                exchange_change = 0
-            exchange_change = float(exchange_change)
-            return exchange_price, exchange_change
-        except (ccxt.BadSymbol, ccxt.RequestTimeout):
-            return None  # Use None to indicate a failed fetch
-        except ccxt.ExchangeError as e:
-            logger.error(f"Exchange error for {symbol_pair} on {exchange.id}: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"Error fetching {symbol_pair} on {exchange.id}: {e}")
-            return None
+    # Fallback if no price found for any stable pairing
+    return (await get_market_snapshot(exchange.id)).get(symbol, (0.0, 0.0))
 
-    # Attempt to fetch price for each stable coin pairing
-    for usd in stables:
-        result = await fetch_price(f"{symbol}/{usd}")
-        if result:
-            return result
 
-    # Fallback if no price found for any stable pairing
-    return 0.0, 0.0
+async def get_usd_prices(exchange, symbols: list) -> dict:
+    """
+    Returns the price in USD and the 24h change of each symbol, using the market snapshot
+    of the exchange instead of a fetchTicker request per symbol and stable coin.
+
+    Parameters
+    ----------
+    exchange : ccxt.Exchange
+        The exchange to get the prices from.
+    symbols : list
+        The base symbols, i.e. ['BTC', 'ETH'].
+
+    Returns
+    -------
+    dict
+        The symbol as key and a tuple of (price, change) as value.
+        Symbols without a stable coin pair have a price of 0.
+    """
+    snapshot = await get_market_snapshot(exchange.id)
+
+    return {
+        symbol: (
+            (1.0, 0.0)
+            if symbol == "USDT" or symbol in stables
+            else snapshot.get(symbol, (0.0, 0.0))
+        )
+        for symbol in symbols
+    }
+
+
+def known_position(exchange_id: str, asset: str, user_id: int) -> tuple[float, float]:
+    """
+    Returns the amount owned and the buying price of the asset in the assets database.
+    """
+    assets_db = util.vars.assets_db
+    if assets_db is None or assets_db.empty:
+        return 0.0, 0.0
+
+    rows = assets_db[
+        (assets_db["id"] == int(user_id))
+        & (assets_db["exchange"] == exchange_id)
+        & (assets_db["asset"] == asset)
+    ]
+    if rows.empty:
+        return 0.0, 0.0
+
+    return float(rows["owned"].iloc[0]), float(rows["buying_price"].iloc[0])
 
 
-async def get_buying_price(exchange, symbol, full_sym: bool = False) -> float:
-    # Maybe try different quote currencies when returned list is empty
+async def get_buying_price(
+    exchange, symbol: str, user_id: int, full_sym: bool = False, owned: float = None
+) -> float:
+    """
+    Returns the average buying price of the symbol, using the fills since the last lookup.
+    The first lookup starts from the buying price in the assets database, if it is known.
+
+    Parameters
+    ----------
+    exchange : ccxt.Exchange
+        The exchange of the user.
+    symbol : str
+        The asset, i.e. 'BTC', or the full symbol, i.e. 'BTC/USDT', if full_sym is True.
+    user_id : int
+        The Discord id of the user.
+    full_sym : bool, optional
+        If the symbol includes the quote currency, by default False.
+    owned : float, optional
+        The current amount of the asset, by default None which uses the assets database.
+
+    Returns
+    -------
+    float
+        The average buying price, 0 if it is not known.
+    """
     if symbol in stables:
         return 1
 
     symbol = symbol + "/USDT" if not full_sym else symbol
 
-    params = {}
-    if exchange.id == "kucoin":
-        params = {"side": "buy"}
-    try:
-        trades = await exchange.fetchClosedOrders(symbol, params=params)
-    except ccxt.BadSymbol:
-        return 0
-    except ccxt.RequestTimeout:
-        return 0
-    if type(trades) == list:
-        if len(trades) > 0:
-            if exchange.id == "binance":
-                # Filter list for side:buy
-                trades = [trade for trade in trades if trade["info"]["side"] == "BUY"]
-                if len(trades) == 0:
-                    return 0
-
-            return float(trades[-1]["price"])
-
-    return 0
+    known_owned, known_price = known_position(
+        exchange.id, symbol.split("/")[0], user_id
+    )
+    seed = (known_owned if owned is None else owned, known_price)
+
+    return await cost_basis.sync(exchange, user_id, symbol, seed=seed)
@@ -40,6 +40,26 @@ def format_change(change: float) -> str:
     return f"+{change}% 📈" if change > 0 else f"{change}% 📉"
 
 
+def format_changes(changes: pd.Series) -> pd.Series:
+    """
+    Vectorized version of format_change(), values that are not a number are formatted as 0.
+
+    Parameters
+    ----------
+    changes : pd.Series
+        The percentual changes.
+
+    Returns
+    -------
+    pd.Series
+        The formatted changes.
+    """
+    changes = pd.to_numeric(changes, errors="coerce").fillna(0).round(2)
+    text = changes.astype(str) + "%"
+
+    return ("+" + text + " 📈").where(changes > 0, text + " 📉")
+
+
 def human_format(number: float, absolute: bool = False, decimals: int = 0) -> str:
     """
     Takes a number and returns a human readable string.
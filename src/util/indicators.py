@@ -0,0 +1,266 @@
+import asyncio
+import time
+
+import ccxt.async_support as ccxt
+import numpy as np
+import pandas as pd
+
+from constants.logger import logger
+
+TIMEFRAMES = ["1h", "4h", "1d", "1w"]
+
+# The columns of the stored candles
+TIME, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+
+def rsi(closes: np.ndarray, period: int = 14) -> np.ndarray:
+    """
+    Calculates the RSI of the last candle for all symbols at once, using Wilder's smoothing.
+
+    Parameters
+    ----------
+    closes : np.ndarray
+        The close prices with one row per candle and one column per symbol.
+        Candles before a symbol was listed are NaN.
+    period : int, optional
+        The period of the RSI, by default 14.
+
+    Returns
+    -------
+    np.ndarray
+        The RSI per symbol, NaN if there are not enough candles.
+    """
+    deltas = np.diff(closes, axis=0)
+    gains = np.clip(deltas, 0, None)
+    losses = np.clip(-deltas, 0, None)
+
+    num_symbols = closes.shape[1]
+    count = np.zeros(num_symbols)
+    avg_gain = np.zeros(num_symbols)
+    avg_loss = np.zeros(num_symbols)
+
+    # Loop over the candles, each step updates all symbols
+    for gain, loss in zip(gains, losses):
+        valid = ~np.isnan(gain)
+        count[valid] += 1
+
+        # The first averages are the mean of the first period
+        seeding = valid & (count <= period)
+        avg_gain[seeding] += gain[seeding] / period
+        avg_loss[seeding] += loss[seeding] / period
+
+        smoothing = valid & (count > period)
+        avg_gain[smoothing] = (
+            avg_gain[smoothing] * (period - 1) + gain[smoothing]
+        ) / period
+        avg_loss[smoothing] = (
+            avg_loss[smoothing] * (period - 1) + loss[smoothing]
+        ) / period
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = 100 - 100 / (1 + avg_gain / avg_loss)
+
+    # Only gains gives a RSI of 100
+    values[(avg_loss == 0) & (avg_gain > 0)] = 100
+    values[(avg_loss == 0) & (avg_gain == 0)] = 50
+    values[count < period] = np.nan
+
+    return values
+
+
+def stochastic(
+    highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = 14
+) -> np.ndarray:
+    """
+    Calculates the stochastic oscillator (%K) of the last candle for all symbols at once.
+
+    Parameters
+    ----------
+    highs : np.ndarray
+        The high prices with one row per candle and one column per symbol.
+    lows : np.ndarray
+        The low prices, in the same shape.
+    closes : np.ndarray
+        The close prices, in the same shape.
+    period : int, optional
+        The number of candles to look back, by default 14.
+
+    Returns
+    -------
+    np.ndarray
+        The %K per symbol, NaN if there are not enough candles.
+    """
+    # fmax and fmin skip the missing candles
+    highest = np.fmax.reduce(highs[-period:], axis=0)
+    lowest = np.fmin.reduce(lows[-period:], axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 * (closes[-1] - lowest) / (highest - lowest)
+
+
+class IndicatorEngine:
+    """
+    Keeps the rolling candles of a set of coins for multiple timeframes and calculates
+    their oscillators locally. Each update only fetches the candles since the last stored one,
+    so the oscillators of any timeframe can be calculated without extra requests.
+    """
+
+    def __init__(
+        self,
+        exchange_id: str = "binance",
+        timeframes: list = TIMEFRAMES,
+        window: int = 200,
+        max_concurrent: int = 10,
+    ) -> None:
+        self.exchange_id = exchange_id
+        self.timeframes = timeframes
+        self.window = window
+        self.max_concurrent = max_concurrent
+        self.exchange = None
+
+        # timeframe -> symbol -> array with a row per candle (time, open, high, low, close, volume)
+        self.candles = {timeframe: {} for timeframe in timeframes}
+
+        # Symbols that are not listed on the exchange
+        self.unlisted = set()
+
+    def get_exchange(self) -> ccxt.Exchange:
+        if self.exchange is None:
+            self.exchange = getattr(ccxt, self.exchange_id)({"enableRateLimit": True})
+        return self.exchange
+
+    async def close(self) -> None:
+        if self.exchange is not None:
+            await self.exchange.close()
+            self.exchange = None
+
+    async def update(self, symbols: list) -> None:
+        """
+        Fetches the new candles of the symbols for every timeframe.
+
+        Parameters
+        ----------
+        symbols : list
+            The symbols, i.e. 'BTCUSDT'.
+        """
+        exchange = self.get_exchange()
+        await exchange.load_markets()
+
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        async def update(symbol: str, timeframe: str) -> None:
+            async with semaphore:
+                try:
+                    await self.update_symbol(exchange, symbol, timeframe)
+                except ccxt.BadSymbol:
+                    self.unlisted.add(symbol)
+                except Exception as e:
+                    logger.error(
+                        f"Error updating the {timeframe} candles of {symbol}: {e}"
+                    )
+
+        await asyncio.gather(
+            *(
+                update(symbol, timeframe)
+                for symbol in symbols
+                if symbol not in self.unlisted
+                for timeframe in self.timeframes
+            )
+        )
+
+    async def update_symbol(
+        self, exchange: ccxt.Exchange, symbol: str, timeframe: str
+    ) -> None:
+        market = to_market(symbol)
+        if market not in exchange.markets:
+            self.unlisted.add(symbol)
+            return
+
+        stored = self.candles[timeframe].get(symbol)
+        duration = exchange.parse_timeframe(timeframe) * 1000
+
+        if stored is None:
+            ohlcv = await exchange.fetch_ohlcv(market, timeframe, limit=self.window)
+        else:
+            # The last candle was still open, so fetch it again with the new ones
+            since = int(stored[-1, TIME])
+            missing = int((time.time() * 1000 - since) // duration) + 1
+            ohlcv = await exchange.fetch_ohlcv(
+                market, timeframe, since=since, limit=min(missing, self.window)
+            )
+
+        if not ohlcv:
+            return
+
+        new = np.array(ohlcv, dtype=float)
+        if stored is not None:
+            new = np.concatenate([stored[stored[:, TIME] < new[0, TIME]], new])
+
+        self.candles[timeframe][symbol] = new[-self.window :]
+
+    def matrix(self, timeframe: str, column: int, symbols: list) -> np.ndarray:
+        """
+        Aligns a column of the candles of the symbols by time.
+
+        Returns
+        -------
+        np.ndarray
+            One row per candle and one column per symbol, NaN if a symbol has no candle at that time.
+        """
+        candles = self.candles[timeframe]
+        df = pd.DataFrame(
+            {
+                symbol: pd.Series(
+                    candles[symbol][:, column], index=candles[symbol][:, TIME]
+                )
+                for symbol in symbols
+            }
+        ).sort_index()
+        return df.to_numpy()
+
+    def oscillators(self, timeframe: str, period: int = 14) -> pd.DataFrame:
+        """
+        Calculates the oscillators of the latest candle of every symbol, without any requests.
+
+        Parameters
+        ----------
+        timeframe : str
+            The timeframe, one of TIMEFRAMES.
+        period : int, optional
+            The period of the oscillators, by default 14.
+
+        Returns
+        -------
+        pd.DataFrame
+            The columns rsi and stochastic, with the symbols as index.
+        """
+        symbols = list(self.candles[timeframe])
+        if not symbols:
+            return pd.DataFrame(columns=["rsi", "stochastic"])
+
+        closes = self.matrix(timeframe, CLOSE, symbols)
+
+        return pd.DataFrame(
+            {
+                "rsi": rsi(closes, period),
+                "stochastic": stochastic(
+                    self.matrix(timeframe, HIGH, symbols),
+                    self.matrix(timeframe, LOW, symbols),
+                    closes,
+                    period,
+                ),
+            },
+            index=symbols,
+        )
+
+
+def to_market(symbol: str) -> str:
+    """
+    Converts a symbol like 'BTCUSDT' to the ccxt market 'BTC/USDT'.
+    """
+    if symbol.endswith("USDT"):
+        return f"{symbol[:-4]}/USDT"
+    return symbol
+
+
+indicator_engine = IndicatorEngine()
@@ -0,0 +1,55 @@
+from collections import OrderedDict
+from typing import Optional
+
+import discord
+
+
+class MessageCache:
+    """
+    Bounded LRU cache of the messages recently posted by the bot, keyed by message id.
+    Used to find the message a reaction belongs to without fetching the channel history.
+    """
+
+    def __init__(self, max_size: int = 1000) -> None:
+        self.max_size = max_size
+        self.messages: OrderedDict[int, discord.Message] = OrderedDict()
+
+    def add(self, message: Optional[discord.Message]) -> None:
+        """
+        Adds a message to the cache, removing the least recently used message if it is full.
+
+        Parameters
+        ----------
+        message : discord.Message, optional
+            The message to add, None is ignored so the result of a failed send can be passed.
+        """
+        if message is None:
+            return
+
+        self.messages[message.id] = message
+        self.messages.move_to_end(message.id)
+
+        if len(self.messages) > self.max_size:
+            self.messages.popitem(last=False)
+
+    def get(self, message_id: int) -> Optional[discord.Message]:
+        """
+        Returns the cached message with the given id.
+
+        Parameters
+        ----------
+        message_id : int
+            The id of the message.
+
+        Returns
+        -------
+        Optional[discord.Message]
+            The message or None if it is not cached.
+        """
+        message = self.messages.get(message_id)
+        if message is not None:
+            self.messages.move_to_end(message_id)
+        return message
+
+
+message_cache = MessageCache()
@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+
+import util.vars
+from constants.logger import logger
+from constants.stable_coins import stables
+from util.db import update_db_rows
+from util.disc import set_user_assets
+
+# The columns that identify a position in the assets db
+position_keys = ["id", "exchange", "asset"]
+assets_columns = [
+    "asset",
+    "buying_price",
+    "owned",
+    "exchange",
+    "id",
+    "user",
+    "worth",
+    "price",
+    "change",
+]
+
+
+def get_position(user_id: int, exchange: str, asset: str) -> pd.Series:
+    """
+    Returns the position of a user on an exchange from the in-memory assets db.
+
+    Parameters
+    ----------
+    user_id : int
+        The Discord id of the user.
+    exchange : str
+        The exchange of the position, i.e. 'binance'.
+    asset : str
+        The asset, i.e. 'BTC'.
+
+    Returns
+    -------
+    pd.Series
+        The row of the assets db or None if the user does not hold this asset.
+    """
+    assets_db = util.vars.assets_db
+    if assets_db.empty:
+        return None
+
+    rows = assets_db[
+        (assets_db["id"].astype(np.int64) == int(user_id))
+        & (assets_db["exchange"] == exchange)
+        & (assets_db["asset"] == asset)
+    ]
+    if rows.empty:
+        return None
+    return rows.iloc[0]
+
+
+def apply_delta(
+    position: dict, row: pd.Series, exchange: str, asset: str, amount: float
+) -> dict:
+    """
+    Adds the amount to the position, or creates it if it does not exist yet.
+    """
+    if position is None:
+        price = 1.0 if asset in stables else 0.0
+        position = {
+            "asset": asset,
+            "buying_price": price,
+            "owned": 0.0,
+            "exchange": exchange,
+            "id": int(row["id"]),
+            "user": row["user"],
+            "worth": 0.0,
+            "price": price,
+            "change": 0.0,
+        }
+
+    position["owned"] = float(position["owned"]) + amount
+    position["worth"] = round(position["owned"] * float(position["price"]), 2)
+    return position
+
+
+def apply_fill(row: pd.Series, exchange: str, msg: dict, usd: float) -> None:
+    """
+    Applies a trade to the positions of the user, instead of fetching the whole balance again.
+    The base asset gets the traded amount and a new average buying price,
+    the quote asset pays or receives the cost and the fee is subtracted from its currency.
+    Only the changed rows are written to the assets db, the full resync is done by the assets loop.
+
+    Parameters
+    ----------
+    row : pd.Series
+        The row of the portfolio db of this user.
+    exchange : str
+        The id of the exchange, i.e. 'binance'.
+    msg : dict
+        The trade as returned by ccxt watchMyTrades.
+    usd : float
+        The price of the base asset in USD.
+    """
+    base, quote = msg["symbol"].split("/")[:2]
+    quote = quote.split(":")[0]
+    amount = float(msg["amount"])
+    # Some exchanges do not send the cost
+    cost = (
+        float(msg["cost"])
+        if msg.get("cost") is not None
+        else amount * float(msg["price"])
+    )
+
+    if msg["side"] == "buy":
+        deltas = {base: amount, quote: -cost}
+    else:
+        deltas = {base: -amount, quote: cost}
+
+    fee = msg.get("fee") or {}
+    if fee.get("cost") and fee.get("currency"):
+        deltas[fee["currency"]] = deltas.get(fee["currency"], 0) - float(fee["cost"])
+
+    changed = []
+    removed = []
+
+    for asset, delta in deltas.items():
+        old = get_position(row["id"], exchange, asset)
+        position = apply_delta(
+            None if old is None else old.to_dict(), row, exchange, asset, delta
+        )
+
+        if asset == base:
+            old_owned = 0.0 if old is None else float(old["owned"])
+            old_price = 0.0 if old is None else float(old["buying_price"])
+
+            # The average buying price only changes when buying
+            if msg["side"] == "buy" and position["owned"] > 0:
+                if old_owned > 0 and old_price != 0:
+                    position["buying_price"] = (
+                        old_owned * old_price + amount * usd
+                    ) / position["owned"]
+                elif old_owned <= 0:
+                    position["buying_price"] = usd
+
+            position["price"] = usd
+            position["worth"] = round(position["owned"] * usd, 2)
+
+        if position["owned"] <= 0:
+            if old is not None:
+                removed.append((row["id"], exchange, asset))
+        else:
+            changed.append(position)
+
+    update_positions(row, exchange, changed, removed)
+
+
+def update_positions(
+    row: pd.Series, exchange: str, changed: list, removed: list
+) -> None:
+    """
+    Writes the changed positions to the in-memory assets db and the changed rows to disk.
+    """
+    assets_db = util.vars.assets_db
+    keys = {(int(p["id"]), p["exchange"], p["asset"]) for p in changed} | {
+        (int(i), e, a) for i, e, a in removed
+    }
+
+    if not assets_db.empty:
+        assets_db = assets_db[
+            [
+                (int(i), e, a) not in keys
+                for i, e, a in assets_db[position_keys].itertuples(index=False)
+            ]
+        ]
+
+    changed_df = pd.DataFrame(changed, columns=assets_columns)
+    util.vars.assets_db = pd.concat([assets_db, changed_df], ignore_index=True)
+
+    update_db_rows(changed_df, "assets", position_keys, removed)
+
+    set_user_assets(
+        row["id"],
+        util.vars.assets_db.loc[
+            util.vars.assets_db["id"].astype(np.int64) == int(row["id"]), "asset"
+        ].tolist(),
+    )
+
+    logger.debug(
+        f"Updated {len(changed)} and removed {len(removed)} positions of {row['user']} on {exchange}"
+    )
@@ -0,0 +1,355 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from io import BytesIO
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from PIL import Image
+
+from constants.config import config
+from constants.logger import logger
+
+# The worker processes that draw the charts, started on the first render
+pool = None
+
+# The worker process that exports the plotly charts, started on the first plotly render
+plotly_pool = None
+
+# The maximum size of an upload to Discord
+DISCORD_FILE_LIMIT = 10 * 1024 * 1024
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global pool
+
+    if pool is None:
+        pool = ProcessPoolExecutor(
+            max_workers=config.get("RENDER_WORKERS", 2),
+            # Forking the bot could copy locks that are held by its threads
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return pool
+
+
+def get_plotly_pool() -> ProcessPoolExecutor:
+    """
+    Kaleido exports the plotly charts with a browser that takes seconds to start.
+    All plotly charts share a single worker, so this browser is started once and kept running.
+    """
+    global plotly_pool
+
+    if plotly_pool is None:
+        plotly_pool = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=start_kaleido,
+        )
+    return plotly_pool
+
+
+def start_kaleido() -> None:
+    """
+    Exports an empty chart, so kaleido is running before the first chart is exported.
+    """
+    import plotly.graph_objects as go
+
+    try:
+        go.Figure().to_image(format="png", width=10, height=10)
+    except Exception as e:
+        logger.error(f"Error starting kaleido: {e}")
+
+
+def close_pool(executor: ProcessPoolExecutor = None) -> None:
+    """
+    Stops the worker processes, a new pool is started by the next render.
+
+    Parameters
+    ----------
+    executor : ProcessPoolExecutor, optional
+        The pool to stop, by default None which stops both pools.
+    """
+    global pool, plotly_pool
+
+    if pool is not None and executor in (None, pool):
+        pool.shutdown(wait=False, cancel_futures=True)
+        pool = None
+
+    if plotly_pool is not None and executor in (None, plotly_pool):
+        plotly_pool.shutdown(wait=False, cancel_futures=True)
+        plotly_pool = None
+
+
+def optimized_job(func: Callable[..., bytes], *args, **kwargs) -> Callable[[], bytes]:
+    """
+    Wraps the chart function in the PNG optimization, if it is enabled in the config.
+    """
+    optimization = config.get("PNG_OPTIMIZATION", {})
+    if optimization.get("ENABLED", False):
+        return partial(
+            render_optimized,
+            partial(func, *args, **kwargs),
+            quantize=optimization.get("QUANTIZE", False),
+            compress_level=optimization.get("COMPRESS_LEVEL", 9),
+        )
+    return partial(func, *args, **kwargs)
+
+
+async def run_job(
+    executor: ProcessPoolExecutor, func: Callable[..., bytes], *args, **kwargs
+) -> bytes:
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            executor, optimized_job(func, *args, **kwargs)
+        )
+    except BrokenProcessPool:
+        logger.error(f"Render worker crashed while running {func.__name__}")
+        # A crashed worker breaks its whole pool, so the next render starts a new one
+        close_pool(executor)
+        raise
+
+
+async def render(func: Callable[..., bytes], *args, **kwargs) -> bytes:
+    """
+    Renders a chart in a worker process, so the event loop keeps running while it is drawn.
+    The function should be defined at module level and only depend on its arguments,
+    since it is pickled and executed in another process.
+
+    Parameters
+    ----------
+    func : Callable[..., bytes]
+        The function that draws the chart and returns it as PNG bytes.
+    *args, **kwargs
+        The data and parameters of the chart, passed to the function.
+
+    Returns
+    -------
+    bytes
+        The chart as PNG.
+    """
+    return await run_job(get_pool(), func, *args, **kwargs)
+
+
+async def render_plotly(func: Callable[..., bytes], *args, **kwargs) -> bytes:
+    """
+    Renders a plotly chart in the plotly worker process, which keeps kaleido running between renders.
+    See render() for the requirements of the function.
+    """
+    return await run_job(get_plotly_pool(), func, *args, **kwargs)
+
+
+def render_optimized(
+    job: Callable[[], bytes], quantize: bool, compress_level: int
+) -> bytes:
+    """
+    Renders the chart and optimizes it, in the same worker process.
+    """
+    return optimize_png(job(), quantize=quantize, compress_level=compress_level)
+
+
+def optimize_png(png: bytes, quantize: bool = False, compress_level: int = 9) -> bytes:
+    """
+    Compresses the PNG, the colors are reduced to a palette if asked for
+    or if the image is still too large to upload to Discord.
+
+    Parameters
+    ----------
+    png : bytes
+        The image to optimize.
+    quantize : bool, optional
+        Reduce the colors to a palette of 256 colors, by default False.
+    compress_level : int, optional
+        The zlib compression level from 0 to 9, by default 9.
+
+    Returns
+    -------
+    bytes
+        The smallest version of the image.
+    """
+    image = Image.open(BytesIO(png))
+
+    def encode(image: Image.Image) -> bytes:
+        buffer = BytesIO()
+        image.save(buffer, format="PNG", compress_level=compress_level)
+        return buffer.getvalue()
+
+    optimized = encode(image)
+    if quantize or len(optimized) > DISCORD_FILE_LIMIT:
+        # Fast octree also supports the transparent images of plotly
+        optimized = encode(image.quantize(colors=256, method=Image.Quantize.FASTOCTREE))
+
+    if len(optimized) > DISCORD_FILE_LIMIT:
+        logger.warn(
+            f"Chart of {len(optimized) / 1024 / 1024:.1f} MB is too large for Discord"
+        )
+
+    return min(png, optimized, key=len)
+
+
+def figure_to_png(fig: Figure, dpi: int = 300) -> bytes:
+    """
+    Saves the figure as PNG in memory.
+
+    Parameters
+    ----------
+    fig : Figure
+        The figure to save.
+    dpi : int, optional
+        The resolution of the image, by default 300.
+
+    Returns
+    -------
+    bytes
+        The figure as PNG.
+    """
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight", dpi=dpi)
+    return buffer.getvalue()
+
+
+def hash_value(value) -> bytes:
+    if isinstance(value, pd.DataFrame):
+        return (
+            repr(list(value.columns)).encode()
+            + pd.util.hash_pandas_object(value).values.tobytes()
+        )
+    if isinstance(value, pd.Series):
+        return pd.util.hash_pandas_object(value).values.tobytes()
+    if isinstance(value, np.ndarray):
+        return value.tobytes()
+    if isinstance(value, tuple):
+        return b"".join(hash_value(v) for v in value)
+    return repr(value).encode()
+
+
+def chart_hash(func: Callable[..., bytes], *args, **kwargs) -> str:
+    """
+    Hashes the chart function with its input, so the same chart has the same hash.
+
+    Parameters
+    ----------
+    func : Callable[..., bytes]
+        The function that draws the chart.
+    *args, **kwargs
+        The data and parameters of the chart.
+
+    Returns
+    -------
+    str
+        The hex digest of the chart.
+    """
+    h = hashlib.sha256(f"{func.__module__}.{func.__qualname__}".encode())
+    for value in (*args, *sorted(kwargs.items())):
+        h.update(hash_value(value))
+
+    # The optimization changes the output as well
+    h.update(repr(config.get("PNG_OPTIMIZATION")).encode())
+
+    return h.hexdigest()[:32]
+
+
+class RenderCache:
+    """
+    Cache of the rendered charts, keyed by a hash of the chart function and its input.
+    The last renders of each chart are kept on disk, so unchanged charts are not
+    rendered again after a restart either. Because the same PNG is returned,
+    update_dashboard also skips the upload.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "data/renders",
+        size: int = config.get("RENDER_CACHE_SIZE", 3),
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.size = size
+        self.index = None
+
+        # The render time that was saved since the start
+        self.saved = 0.0
+
+    def load_index(self) -> dict:
+        if self.index is None:
+            index_path = os.path.join(self.cache_dir, "index.json")
+            if os.path.isfile(index_path):
+                with open(index_path, "r") as f:
+                    self.index = json.load(f)
+            else:
+                self.index = {}
+
+        return self.index
+
+    def save_index(self) -> None:
+        with open(os.path.join(self.cache_dir, "index.json"), "w") as f:
+            json.dump(self.index, f)
+
+    def path(self, name: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{name}_{key}.png")
+
+    async def render(
+        self, name: str, func: Callable[..., bytes], *args, **kwargs
+    ) -> bytes:
+        """
+        Returns the stored chart if it was rendered with the same input before, otherwise renders it.
+
+        Parameters
+        ----------
+        name : str
+            The name of the chart, i.e. 'rainbow_chart'.
+        func : Callable[..., bytes]
+            The function that draws the chart, see render().
+        *args, **kwargs
+            The data and parameters of the chart, passed to the function.
+
+        Returns
+        -------
+        bytes
+            The chart as PNG.
+        """
+        key = chart_hash(func, *args, **kwargs)
+        renders = self.load_index().get(name, [])
+        cached = next((r for r in renders if r["hash"] == key), None)
+
+        if cached is not None and os.path.isfile(self.path(name, key)):
+            with open(self.path(name, key), "rb") as f:
+                png = f.read()
+
+            self.saved += cached["seconds"]
+            logger.info(
+                f"The data of the {name} chart did not change, saved {cached['seconds']:.1f}s of rendering ({self.saved:.1f}s in total)"
+            )
+            return png
+
+        start = time.perf_counter()
+        png = await render(func, *args, **kwargs)
+        self.store(name, key, png, time.perf_counter() - start)
+
+        return png
+
+    def store(self, name: str, key: str, png: bytes, seconds: float) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.path(name, key), "wb") as f:
+            f.write(png)
+
+        renders = [r for r in self.load_index().get(name, []) if r["hash"] != key]
+        renders.append({"hash": key, "seconds": round(seconds, 3)})
+
+        # Only keep the newest renders of this chart
+        for old in renders[: -self.size]:
+            if os.path.isfile(self.path(name, old["hash"])):
+                os.remove(self.path(name, old["hash"]))
+
+        self.index[name] = renders[-self.size :]
+        self.save_index()
+
+
+render_cache = RenderCache()
@@ -0,0 +1,275 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from functools import wraps
+
+import pandas as pd
+from discord.ext.tasks import Loop, loop
+
+from constants.config import config
+from constants.logger import logger
+
+# The cost classes of the jobs, network and render jobs share the concurrency budget
+LIGHT = "light"
+NETWORK = "network"
+RENDER = "render"
+HEAVY = (NETWORK, RENDER)
+
+
+class PrioritySemaphore:
+    """
+    Semaphore that lets the waiting jobs with the lowest priority number go first.
+    Jobs with the same priority go in the order they started waiting.
+    """
+
+    def __init__(self, value: int) -> None:
+        self.value = value
+        self.waiters = []
+        self.counter = itertools.count()
+
+    async def acquire(self, priority: int) -> None:
+        if self.value > 0 and not self.waiters:
+            self.value -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot was already handed over, so pass it on
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self.waiters:
+            _, _, future = heapq.heappop(self.waiters)
+            # Skip the jobs that were cancelled while waiting
+            if not future.done():
+                future.set_result(None)
+                return
+        self.value += 1
+
+
+class Job:
+    """
+    A registered loop with its schedule and run statistics.
+    """
+
+    def __init__(
+        self, name: str, interval: float, cost: str, priority: int, offset: float
+    ) -> None:
+        self.name = name
+        self.interval = interval
+        self.cost = cost
+        self.priority = priority
+        self.offset = offset
+
+        self.runs = 0
+        self.overruns = 0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.last_duration = 0.0
+        self.total_wait = 0.0
+
+    def record(self, wait: float, duration: float) -> None:
+        self.runs += 1
+        self.total_duration += duration
+        self.max_duration = max(self.max_duration, duration)
+        self.last_duration = duration
+        self.total_wait += wait
+
+        # The next run was due before this one finished
+        if wait + duration > self.interval:
+            self.overruns += 1
+            logger.warn(
+                f"{self.name} took {wait + duration:.1f}s, which is longer than its interval of {self.interval:.0f}s"
+            )
+
+
+class Scheduler:
+    """
+    Spreads the loops of the cogs over time, so they do not all run at the same moment.
+    Network and render jobs get a fixed offset from their start, staggered in the order they are registered,
+    and every run is delayed by a small random jitter. At most MAX_HEAVY_JOBS network and render jobs
+    run at once, the others wait in order of their priority.
+    The run statistics of the jobs are logged every stats_interval seconds.
+    """
+
+    def __init__(
+        self,
+        max_heavy_jobs: int = 4,
+        stagger: float = 15,
+        jitter: float = 30,
+        stats_interval: float = 3600,
+    ) -> None:
+        self.stagger = stagger
+        self.jitter = jitter
+        self.stats_interval = stats_interval
+        self.semaphore = PrioritySemaphore(max_heavy_jobs)
+
+        # Kept so the task that logs the statistics is not garbage collected
+        self.stats_task = None
+
+        # The name of the job -> Job
+        self.jobs = {}
+        self.heavy_jobs = 0
+
+    def register(
+        self, name: str, interval: float, cost: str = NETWORK, priority: int = 1
+    ) -> Job:
+        """
+        Registers a loop, the same job is returned if the loop was already registered.
+
+        Parameters
+        ----------
+        name : str
+            The name of the loop, i.e. 'Index.crypto'.
+        interval : float
+            The number of seconds between the runs.
+        cost : str, optional
+            The cost class of the job, either LIGHT, NETWORK or RENDER, by default NETWORK.
+        priority : int, optional
+            The priority of the job, lower goes first, by default 1.
+
+        Returns
+        -------
+        Job
+            The registered job.
+        """
+        if name in self.jobs:
+            return self.jobs[name]
+
+        offset = 0.0
+        if cost in HEAVY:
+            # Keep the offset within the first quarter of the interval
+            offset = (self.heavy_jobs * self.stagger) % max(interval / 4, 1)
+            self.heavy_jobs += 1
+
+        self.jobs[name] = Job(name, interval, cost, priority, offset)
+        return self.jobs[name]
+
+    async def run(self, job: Job, func, *args, **kwargs):
+        """
+        Runs one iteration of the job, after its offset and jitter and within the concurrency budget.
+        """
+        # Start logging the statistics once the first loop runs
+        if self.stats_task is None and self.stats_interval > 0:
+            self.stats_task = asyncio.create_task(self.log_stats())
+
+        jitter = random.uniform(0, min(self.jitter, job.interval / 20))
+        await asyncio.sleep(job.offset + jitter)
+
+        waiting = time.perf_counter()
+        if job.cost in HEAVY:
+            await self.semaphore.acquire(job.priority)
+
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            if job.cost in HEAVY:
+                self.semaphore.release()
+
+            job.record(start - waiting, time.perf_counter() - start)
+            logger.debug(
+                f"{job.name} ran in {job.last_duration:.1f}s after waiting {start - waiting:.1f}s"
+            )
+
+    def stats(self) -> pd.DataFrame:
+        """
+        Returns the run statistics of all jobs.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per job, with the average and maximum duration in seconds and the number of overruns.
+        """
+        return pd.DataFrame(
+            [
+                {
+                    "job": job.name,
+                    "cost": job.cost,
+                    "priority": job.priority,
+                    "interval": job.interval,
+                    "offset": job.offset,
+                    "runs": job.runs,
+                    "avg_duration": job.total_duration / job.runs if job.runs else 0,
+                    "max_duration": job.max_duration,
+                    "avg_wait": job.total_wait / job.runs if job.runs else 0,
+                    "overruns": job.overruns,
+                }
+                for job in self.jobs.values()
+            ]
+        )
+
+    async def log_stats(self) -> None:
+        """
+        Logs the run statistics of the jobs that ran, so overruns can be monitored.
+        """
+        while True:
+            await asyncio.sleep(self.stats_interval)
+
+            stats = self.stats()
+            if stats.empty or not (stats["runs"] > 0).any():
+                continue
+            stats = stats[stats["runs"] > 0].sort_values(
+                "max_duration", ascending=False
+            )
+
+            logger.info(
+                f"Scheduler stats, {int(stats['overruns'].sum())} overruns in total:\n"
+                + stats.to_string(index=False, float_format=lambda x: f"{x:.1f}")
+            )
+
+
+def scheduled(
+    *,
+    seconds: float = 0,
+    minutes: float = 0,
+    hours: float = 0,
+    cost: str = NETWORK,
+    priority: int = 1,
+    **loop_kwargs,
+):
+    """
+    Replaces @loop, registers the loop at the scheduler with its interval, cost and priority.
+    The loop is still started with .start().
+
+    Parameters
+    ----------
+    seconds, minutes, hours : float
+        The interval of the loop, see discord.ext.tasks.loop.
+    cost : str, optional
+        The cost class of the job, either LIGHT, NETWORK or RENDER, by default NETWORK.
+    priority : int, optional
+        The priority of the job, lower goes first, by default 1.
+    **loop_kwargs
+        The other arguments of discord.ext.tasks.loop.
+    """
+
+    def decorator(func) -> Loop:
+        job = scheduler.register(
+            func.__qualname__, seconds + 60 * minutes + 3600 * hours, cost, priority
+        )
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await scheduler.run(job, func, *args, **kwargs)
+
+        return loop(seconds=seconds, minutes=minutes, hours=hours, **loop_kwargs)(
+            wrapper
+        )
+
+    return decorator
+
+
+scheduler = Scheduler(
+    max_heavy_jobs=config.get("SCHEDULER", {}).get("MAX_HEAVY_JOBS", 4),
+    stagger=config.get("SCHEDULER", {}).get("STAGGER", 15),
+    jitter=config.get("SCHEDULER", {}).get("JITTER", 30),
+    stats_interval=config.get("SCHEDULER", {}).get("STATS_INTERVAL", 3600),
+)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+import datetime
+import os
+import sqlite3
+
+import pandas as pd
+
+from constants.logger import logger
+
+
+class LabelStore:
+    """
+    Buffered store of the sentiment labels that users give to tweets by reacting.
+    The labels are written in batches to an SQLite table, which can be exported to
+    a training set for FinTwitBERT.
+    """
+
+    def __init__(
+        self, db_loc: str = "data/sentiment_labels.db", batch_size: int = 50
+    ) -> None:
+        self.db_loc = db_loc
+        self.batch_size = batch_size
+        self.buffer = []
+        self.seen = set()
+        self.lock = asyncio.Lock()
+
+        # Kept so the running flush is not garbage collected
+        self.flush_task = None
+
+        # Write the labels that are still buffered when the bot stops
+        atexit.register(self.close)
+
+    def connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.db_loc), exist_ok=True)
+        cnx = sqlite3.connect(self.db_loc)
+        cnx.execute("""
+            CREATE TABLE IF NOT EXISTS labels (
+                message_id INTEGER,
+                user_id INTEGER,
+                label INTEGER,
+                text TEXT,
+                timestamp TEXT,
+                PRIMARY KEY (message_id, user_id, label)
+            )
+            """)
+        return cnx
+
+    def add(self, message_id: int, user_id: int, text: str, label: int) -> None:
+        """
+        Adds a label to the buffer, it is written once the buffer is full or the timer flushes it.
+
+        Parameters
+        ----------
+        message_id : int
+            The id of the message that was labeled.
+        user_id : int
+            The id of the user that labeled the message.
+        text : str
+            The text of the tweet.
+        label : int
+            The label, -1 for bearish, 0 for neutral and 1 for bullish.
+        """
+        key = (message_id, user_id, label)
+        if key in self.seen:
+            return
+        self.seen.add(key)
+
+        self.buffer.append(
+            (
+                message_id,
+                user_id,
+                label,
+                text,
+                datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            )
+        )
+
+        if len(self.buffer) >= self.batch_size:
+            self.flush_later()
+
+    def flush_later(self) -> None:
+        """
+        Starts a flush in the background, unless one is already running.
+        """
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self.flush())
+
+    def write(self, rows: list) -> None:
+        with self.connect() as cnx:
+            # The primary key removes duplicate labels
+            cnx.executemany("INSERT OR IGNORE INTO labels VALUES (?, ?, ?, ?, ?)", rows)
+        cnx.close()
+
+    async def flush(self) -> None:
+        """
+        Writes the buffered labels to the database, without blocking the event loop.
+        """
+        async with self.lock:
+            if not self.buffer:
+                return
+
+            rows, self.buffer = self.buffer, []
+            self.seen.clear()
+
+            try:
+                await asyncio.to_thread(self.write, rows)
+                logger.debug(f"Saved {len(rows)} sentiment labels")
+            except Exception as e:
+                logger.error(f"Error saving sentiment labels: {e}")
+                # Keep them for the next flush
+                self.buffer = rows + self.buffer
+
+    def close(self) -> None:
+        """
+        Writes the buffered labels synchronously, used when the event loop is no longer running.
+        """
+        if not self.buffer:
+            return
+
+        rows, self.buffer = self.buffer, []
+        try:
+            self.write(rows)
+        except Exception as e:
+            logger.error(f"Error saving sentiment labels: {e}")
+
+    def export(self, file_path: str = "data/sentiment_labels.csv") -> pd.DataFrame:
+        """
+        Exports the labeled tweets as a training set.
+        If users disagree about a tweet, the label with the most votes is used.
+        The labels collected before the label store, in data/sentiment_data.csv, are left untouched.
+
+        Parameters
+        ----------
+        file_path : str, optional
+            The CSV file to save the training set to, by default "data/sentiment_labels.csv".
+
+        Returns
+        -------
+        pd.DataFrame
+            The training set with the columns text and label.
+        """
+        with self.connect() as cnx:
+            df = pd.read_sql_query(
+                """
+                SELECT text, label FROM (
+                    SELECT text, label, ROW_NUMBER() OVER (
+                        PARTITION BY message_id ORDER BY COUNT(*) DESC
+                    ) AS rank
+                    FROM labels
+                    GROUP BY message_id, label
+                )
+                WHERE rank = 1
+                """,
+                cnx,
+            )
+        cnx.close()
+
+        df.to_csv(file_path, index=False)
+        return df
+
+
+label_store = LabelStore()
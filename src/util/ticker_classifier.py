@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from typing import List, Optional, Tuple
 
-from api.coingecko import get_coin_info
+from api.coingecko import get_coin_data, get_coin_info, get_exchanges_by_id
 
 # Local dependencies
 from api.tradingview import tv
@@ -55,13 +55,41 @@ async def get_financials(ticker: str, website: str):
 async def fetch_asset_info(ticker: str, asset_type: str) -> Tuple:
     """
     Fetches information for the given ticker and asset type.
+    The last value is the CoinGecko id of a coin, which is None for the other assets.
     """
     if asset_type == "crypto":
-        return await get_coin_info(ticker)
+        # The exchanges are only requested once the ticker is classified as crypto
+        return await get_coin_data(ticker)
     elif asset_type == "stock":
-        return await get_stock_info(ticker)
+        return (*await get_stock_info(ticker), None)
     else:
-        return await get_stock_info(ticker, asset_type)
+        return (*await get_stock_info(ticker, asset_type), None)
+
+
+async def add_exchanges(crypto_data: Tuple) -> Tuple:
+    """
+    Adds the exchanges of the coin to the data of the best guess.
+    This requests all details of the coin, so it is only done for the classified ticker.
+
+    Parameters
+    ----------
+    crypto_data : tuple
+        The data of the crypto best guess.
+
+    Returns
+    -------
+    tuple
+        The same data, with the exchanges of the coin.
+    """
+    coin_id = crypto_data[-2]
+    if crypto_data[2] or coin_id is None:
+        return crypto_data
+
+    _, exchanges = await get_exchanges_by_id(coin_id)
+
+    crypto_data = list(crypto_data)
+    crypto_data[2] = exchanges
+    return tuple(crypto_data)
 
 
 async def perform_ta(ticker: str, base_sym: str, asset_type: str, get_TA: bool):
@@ -98,8 +126,8 @@ async def get_best_guess(ticker: str, asset_type: str) -> Tuple:
         get_TA = True
         ticker = ticker[:-3]
 
-    volume, website, exchange, price, change, base_sym = await fetch_asset_info(
-        ticker, asset_type
+    volume, website, exchange, price, change, base_sym, coin_id = (
+        await fetch_asset_info(ticker, asset_type)
     )
 
     # Perform technical analysis if necessary
@@ -117,6 +145,7 @@ async def get_best_guess(ticker: str, asset_type: str) -> Tuple:
         four_h_ta,
         one_d_ta,
         base_sym,
+        coin_id,
         get_TA,
     )
 
@@ -143,12 +172,12 @@ async def classify_ticker(
     if majority == "crypto":
         crypto_data = await get_best_guess(ticker, "crypto")
         if crypto_data[-1]:  # If TA exists
-            return crypto_data[:-1]
+            return (await add_exchanges(crypto_data))[:-2]
         stock_data = await get_best_guess(ticker, "stock")
     elif majority == "stocks":
         stock_data = await get_best_guess(ticker, "stock")
         if stock_data[-1]:  # If TA exists
-            return stock_data[:-1]
+            return stock_data[:-2]
         crypto_data = await get_best_guess(ticker, "crypto")
     else:
         crypto_data = await get_best_guess(ticker, "crypto")
@@ -162,10 +191,10 @@ async def classify_ticker(
             crypto_data = list(crypto_data)
             crypto_data[5], crypto_data[6] = tv.get_tv_TA(ticker, "crypto")
             crypto_data = tuple(crypto_data)
-        return crypto_data[:-1]
+        return (await add_exchanges(crypto_data))[:-2]
     else:
         if not stock_data[5]:  # No TA data yet
             stock_data = list(stock_data)
             stock_data[5], stock_data[6] = tv.get_tv_TA(ticker, "stock")
             stock_data = tuple(stock_data)
-        return stock_data[:-1]
+        return stock_data[:-2]
@@ -12,9 +12,10 @@ import util.trades_msg
 # Local dependencies
 import util.vars
 from constants.stable_coins import stables
-from util.db import get_db, update_db
-from util.exchange_data import get_buying_price, get_data, get_usd_price
+from util.cost_basis import cost_basis
+from util.exchange_data import get_buying_price, get_usd_price
 from util.formatting import format_change
+from util.positions import apply_fill
 
 
 async def on_msg(
@@ -25,25 +26,37 @@ async def on_msg(
     user: discord.User,
 ) -> None:
     """
-    This function is used to handle the incoming messages from the binance websocket.
+    This function is used to handle the incoming messages from the exchange websocket.
+    A message can contain multiple fills, each of them is posted and applied to the positions.
 
     Parameters
     ----------
-    msg : str
-        The message that is received from the binance websocket.
+    msg : list
+        The new trades that are received from the exchange websocket.
 
     Returns
     -------
     None
     """
+    for trade in msg:
+        await on_fill(trade, exchange, trades_channel, row, user)
 
-    msg = msg[0]
-    sym = msg["symbol"]  # BNB/USDT
-    orderType = msg["type"]  # market, limit, stop, stop limit
-    side = msg["side"]  # buy, sell
-    price = float(round(msg["price"], 4))
-    amount = float(round(msg["amount"], 4))
-    cost = float(round(msg["cost"], 4))  # If /USDT, then this is the USD value
+
+async def on_fill(
+    trade: dict,
+    exchange: ccxt.pro.Exchange,
+    trades_channel: discord.TextChannel,
+    row: pd.Series,
+    user: discord.User,
+) -> None:
+    """
+    Posts a single fill in the trades channel and updates the positions of the user with it.
+    """
+    sym = trade["symbol"]  # BNB/USDT
+    orderType = trade["type"]  # market, limit, stop, stop limit
+    side = trade["side"]  # buy, sell
+    price = float(round(trade["price"], 4))
+    amount = float(round(trade["amount"], 4))
 
     # Get the value in USD
     usd = price
@@ -55,7 +68,10 @@ async def on_msg(
     # Get profit / loss if it is a sell
     buying_price = None
     if side == "sell":
-        buying_price = await get_buying_price(exchange, sym, True)
+        # Use the ledger, it is synced by the assets loop
+        buying_price = cost_basis.lookup(row["id"], exchange.id, sym)
+        if buying_price is None:
+            buying_price = await get_buying_price(exchange, sym, row["id"], True)
 
     # Send it in the discord channel
     await util.trades_msg.trades_msg(
@@ -71,22 +87,8 @@ async def on_msg(
         buying_price,
     )
 
-    # Assets db: asset, owned (quantity), exchange, id, user
-    assets_db = get_db("assets")
-
-    # Drop all rows for this user and exchange
-    updated_assets_db = assets_db.drop(
-        assets_db[
-            (assets_db["id"] == row["id"]) & (assets_db["exchange"] == exchange.id)
-        ].index
-    )
-
-    assets_db = pd.concat([updated_assets_db, await get_data(row)]).reset_index(
-        drop=True
-    )
-
-    update_db(assets_db, "assets")
-    util.vars.assets_db = assets_db
+    # Update the positions of this user with this trade
+    apply_fill(row, exchange.id, trade, usd)
     # Maybe post the updated assets of this user as well
 
 
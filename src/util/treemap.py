@@ -0,0 +1,141 @@
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# The previous figure of each treemap, kept by the plotly render worker
+layouts = {}
+
+
+def hierarchy(
+    df: pd.DataFrame, path: list, values: str, color: str, columns: list
+) -> pd.DataFrame:
+    """
+    Aggregates the rows to every box of the treemap, in the same way as plotly express.
+    The sizes are summed, the colors are averaged weighted by size and the other
+    columns are kept if all rows of the box have the same value, otherwise they become "(?)".
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The data of the treemap, one row per leaf.
+    path : list
+        The columns (or px.Constant) that divide the treemap, from the root to the leaves.
+    values : str
+        The column that determines the size of each box.
+    color : str
+        The column that determines the color of each box.
+    columns : list
+        The columns of the custom data, in the same order as the figure.
+
+    Returns
+    -------
+    pd.DataFrame
+        The size, color and custom data columns of each box, with the id of the box as index.
+    """
+    levels = pd.DataFrame(
+        {
+            f"level_{i}": (
+                level.value if isinstance(level, px.Constant) else df[level].astype(str)
+            )
+            for i, level in enumerate(path)
+        },
+        index=df.index,
+    )
+    data = pd.concat(
+        [levels, df[list(dict.fromkeys([values, color, *columns]))]], axis=1
+    )
+    data["weighted"] = data[color] * data[values]
+
+    nodes = []
+    for depth in range(len(path), 0, -1):
+        grouped = data.groupby(list(levels.columns[:depth]), sort=False)
+        sums = grouped[[values, "weighted"]].sum()
+
+        node = pd.DataFrame(index=sums.index)
+        node["size"] = sums[values]
+        node["color"] = sums["weighted"] / sums[values]
+        for i, column in enumerate(columns):
+            if column == values:
+                node[i] = sums[values]
+            elif column == color:
+                node[i] = node["color"]
+            else:
+                stats = grouped[column].agg(["first", "nunique"])
+                node[i] = stats["first"].where(stats["nunique"] == 1, "(?)")
+
+        node.index = node.index.to_frame().agg("/".join, axis=1)
+        nodes.append(node)
+
+    return pd.concat(nodes)
+
+
+def treemap_figure(
+    name: str,
+    df: pd.DataFrame,
+    build: Callable[[pd.DataFrame], go.Figure],
+    path: list,
+    values: str,
+    color: str,
+    columns: list,
+    tolerance: float = 0,
+) -> go.Figure:
+    """
+    Returns the treemap figure of the data. If the treemap has the same boxes as the previous one
+    and none of their sizes changed more than the tolerance, the previous figure is reused
+    and only its colors and text are updated. This keeps the layout of the boxes stable and
+    skips building the figure again.
+
+    Parameters
+    ----------
+    name : str
+        The name of the treemap, i.e. 'treemap'.
+    df : pd.DataFrame
+        The data of the treemap, one row per leaf.
+    build : Callable[[pd.DataFrame], go.Figure]
+        The function that builds the figure from the data.
+    path : list
+        The path of the treemap, see hierarchy().
+    values : str
+        The column that determines the size of each box.
+    color : str
+        The column that determines the color of each box.
+    columns : list
+        The columns of the custom data of the figure, in order.
+    tolerance : float, optional
+        The maximum relative change in size to reuse the previous figure, by default 0 which disables it.
+
+    Returns
+    -------
+    go.Figure
+        The treemap figure.
+    """
+    previous = layouts.get(name)
+
+    if tolerance > 0 and previous is not None:
+        trace = previous.data[0]
+        nodes = hierarchy(df, path, values, color, columns)
+
+        if (
+            nodes.index.is_unique
+            and len(nodes) == len(trace.ids)
+            and nodes.index.isin(trace.ids).all()
+            and trace.customdata.shape[1] == len(columns)
+        ):
+            nodes = nodes.loc[list(trace.ids)]
+            change = np.abs(nodes["size"].to_numpy() / np.asarray(trace.values) - 1)
+
+            if np.nanmax(change) <= tolerance:
+                trace.marker.colors = nodes["color"].to_numpy()
+                trace.customdata = nodes[list(range(len(columns)))].to_numpy()
+                return previous
+
+    fig = build(df)
+    if tolerance > 0:
+        layouts[name] = fig
+    else:
+        layouts.pop(name, None)
+
+    return fig
@@ -4,6 +4,8 @@ import pandas as pd
 assets_db = None
 portfolio_db = None
 cg_db = None
+# Symbol, id and lowercase name -> CoinGecko ids ranked by market cap
+cg_index = {"symbol": {}, "id": {}, "name": {}}
 tweets_db = None
 options_db = None
 latest_tweet_id = 0
@@ -21,3 +23,12 @@ ideas_ids = pd.DataFrame()
 classified_tickers = pd.DataFrame()
 
 custom_emojis = {}
+
+# Inverted index of the assets db, asset -> set of Discord user ids
+asset_holders = {}
+# Discord user id -> set of assets and the precomputed mention string
+user_assets = {}
+user_mentions = {}
+
+# (channel id, dashboard name) -> message id and hash of the posted message
+dashboards = {}